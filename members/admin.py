@@ -1,9 +1,16 @@
 from django.contrib import admin
-from .models import Member
+from .models import BackgroundJob, Member
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
     list_display = ['last_name', 'first_name', 'personnel_number', 'birth_date', 'is_active']
     list_filter = ['is_active', 'issued_date']
     search_fields = ['first_name', 'last_name', 'personnel_number']
-    ordering = ['last_name', 'first_name']
+    ordering = ['sort_key', 'id']
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'rows_processed', 'total_rows', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['started_at', 'finished_at', 'created_at']
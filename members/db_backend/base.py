@@ -0,0 +1,20 @@
+# members/db_backend/base.py - SQLite-Backend mit BEGIN IMMEDIATE für transaction.atomic()
+
+from django.db.backends.sqlite3 import base
+from members.utils.sqlite import transaction_mode
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    django.db.backends.sqlite3 mit einstellbarem Transaktionsmodus.
+
+    Django 4.2 beginnt atomic()-Blöcke mit einem einfachen BEGIN (DEFERRED):
+    der Schreib-Lock wird erst beim ersten INSERT/UPDATE geholt, und wenn ein
+    anderer Worker inzwischen geschrieben hat, schlägt dieses Hochstufen sofort
+    mit "database is locked" fehl - busy_timeout greift dort nicht.
+    Mit SQLITE_TRANSACTION_MODE = 'IMMEDIATE' wird der Lock am Anfang geholt
+    und bei Bedarf bis busy_timeout darauf gewartet.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {transaction_mode()}")
@@ -1,10 +1,62 @@
+import zipfile
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.utils import timezone
 from datetime import date, timedelta
 from .models import Member
+from .utils.images import ImageTooLarge, ingest_portrait, read_image_header
+from .utils.photo_import import PhotoArchiveTooLarge, photo_entries
 import os
 
+# Unterstützte Bildformate (laut Header), MPO = JPEG-Container von Sony/Canon
+SUPPORTED_IMAGE_FORMATS = ['JPEG', 'MPO', 'PNG', 'TIFF', 'BMP']
+
+
+def clean_portrait_upload(picture):
+    """
+    Prüft ein hochgeladenes Passbild anhand des Headers und verarbeitet es
+    (ingest_portrait: ein Dekodier-Durchlauf, auch für MPO von Sony/Canon).
+    
+    Gemeinsam für Formular-Upload und Webcam-Aufnahme.
+    
+    Returns:
+        ProcessedPortrait: fertiges Passbild samt Varianten
+    """
+    # Dateigröße prüfen (max 10MB)
+    if picture.size > 10 * 1024 * 1024:
+        raise ValidationError("Bilddatei ist zu groß. Maximum: 10MB")
+    
+    try:
+        header = read_image_header(picture)
+    except ImageTooLarge as e:
+        raise ValidationError(str(e))
+    except Exception as e:
+        raise ValidationError(f"Ungültige Bilddatei: {str(e)}")
+    
+    if header['format'] not in SUPPORTED_IMAGE_FORMATS:
+        raise ValidationError(
+            f"Bildformat '{header['format']}' wird nicht unterstützt. "
+            f"Erlaubte Formate: JPEG/JPG, PNG, TIFF, BMP, MPO (Sony/Canon)"
+        )
+    
+    # NUR Mindestgröße prüfen (Maximum über das Pixel-Budget), Lage egal
+    min_width, min_height = 200, 300
+    width, height = header['portrait_size']
+    if width < min_width or height < min_height:
+        raise ValidationError(
+            f"Bild zu klein. Minimum: {min_width}x{min_height}px "
+            f"(Aktuell: {header['size'][0]}x{header['size'][1]}px). "
+            f"Das Bild wird automatisch auf 267x400px für den Dienstausweis angepasst."
+        )
+    
+    try:
+        return ingest_portrait(picture)
+    except Exception as e:
+        raise ValidationError(f"Bild konnte nicht verarbeitet werden: {str(e)}")
+
+
 class MemberForm(forms.ModelForm):
     class Meta:
         model = Member
@@ -149,106 +201,20 @@ class MemberForm(forms.ModelForm):
         return valid_until
     
     def clean_profile_picture(self):
-        """Erweiterte Validierung für Profilbilder mit MPO-Unterstützung"""
+        """
+        Prüft ein neues Profilbild anhand des Headers und verarbeitet es direkt
+        (siehe clean_portrait_upload).
+        
+        Zurückgegeben wird das fertige Passbild - Member.save() verarbeitet es
+        nicht noch einmal.
+        """
         picture = self.cleaned_data.get('profile_picture')
         
-        if picture:
-            # Dateigröße prüfen (max 10MB)
-            if picture.size > 10 * 1024 * 1024:
-                raise ValidationError("Bilddatei ist zu groß. Maximum: 10MB")
-            
-            # Bildformat prüfen
-            try:
-                from PIL import Image
-                import io
-                
-                # Bild öffnen um Format zu validieren
-                image = Image.open(io.BytesIO(picture.read()))
-                
-                # ✅ FORMAT-HANDLING: Verschiedene Formate behandeln
-                detected_format = image.format.upper() if image.format else 'UNKNOWN'
-                
-                # Unterstützte Basis-Formate
-                supported_base_formats = ['JPEG', 'JPG', 'PNG', 'TIFF', 'BMP']
-                
-                # ✅ MPO-HANDLING: Sony/Canon Multi-Picture Object Format
-                if detected_format == 'MPO':
-                    print(f"🔄 MPO-Datei erkannt, konvertiere zu JPEG...")
-                    
-                    # MPO ist ein JPEG-Container - ersten Frame extrahieren
-                    try:
-                        # Ersten Frame (Hauptbild) extrahieren
-                        image.seek(0)  # Zum ersten Frame
-                        
-                        # In RGB konvertieren (falls nötig)
-                        if image.mode in ('RGBA', 'P', 'LA'):
-                            background = Image.new('RGB', image.size, (255, 255, 255))
-                            if image.mode == 'P':
-                                image = image.convert('RGBA')
-                            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                            image = background
-                        elif image.mode != 'RGB':
-                            image = image.convert('RGB')
-                        
-                        # Als JPEG in BytesIO speichern
-                        converted_image = io.BytesIO()
-                        image.save(converted_image, format='JPEG', quality=95, optimize=True)
-                        converted_image.seek(0)
-                        
-                        # Original-Picture durch konvertiertes ersetzen
-                        picture.file = converted_image
-                        picture.name = picture.name.rsplit('.', 1)[0] + '.jpg'  # Dateiname anpassen
-                        
-                        print(f"✅ MPO erfolgreich zu JPEG konvertiert")
-                        
-                        # Format für weitere Prüfungen setzen
-                        detected_format = 'JPEG'
-                        
-                    except Exception as mpo_error:
-                        raise ValidationError(f"MPO-Konvertierung fehlgeschlagen: {str(mpo_error)}")
-                
-                # Standard-Format-Validierung
-                if detected_format in ['JPEG', 'JPG']:
-                    # JPEG/JPG sind OK
-                    pass
-                elif detected_format not in supported_base_formats:
-                    # Liste der unterstützten Formate für Benutzer
-                    supported_display = "JPEG/JPG, PNG, TIFF, BMP, MPO (Sony/Canon)"
-                    raise ValidationError(
-                        f"Bildformat '{detected_format}' wird nicht unterstützt. "
-                        f"Erlaubte Formate: {supported_display}"
-                    )
-                
-                # ✅ KORRIGIERTE ZEILE: Bedingung hinzugefügt
-                # Mindestauflösung prüfen (mit aktuellem Bild nach MPO-Konvertierung)
-                if detected_format == 'JPEG' and picture.name.endswith('.jpg'):
-                    # Nach MPO-Konvertierung: Bild neu laden
-                    picture.file.seek(0)
-                    image = Image.open(picture.file)
-                
-                # ✅ NUR Mindestgröße prüfen (Maximum entfernt, da automatisch verkleinert wird)
-                min_width, min_height = 200, 300  
-                if image.width < min_width or image.height < min_height:
-                    raise ValidationError(
-                        f"Bild zu klein. Minimum: {min_width}x{min_height}px "
-                        f"(Aktuell: {image.width}x{image.height}px). "
-                        f"Das Bild wird automatisch auf 267x400px für den Dienstausweis angepasst."
-                    )
-                
-                # ✅ OPTIONAL: Warnung bei sehr großen Bildern (aber nicht blockieren)
-                if image.width > 4000 or image.height > 4000:
-                    print(f"ℹ️ Großes Bild erkannt: {image.width}x{image.height}px - wird automatisch optimiert")
-                
-                # Cursor zurücksetzen für weitere Verarbeitung
-                picture.file.seek(0)
-                
-            except ValidationError:
-                # ValidationError weiterwerfen
-                raise
-            except Exception as e:
-                raise ValidationError(f"Ungültige Bilddatei: {str(e)}")
+        # Unverändertes Bild beim Bearbeiten: nichts zu tun
+        if not isinstance(picture, UploadedFile):
+            return picture
         
-        return picture
+        return clean_portrait_upload(picture)
     
     def clean(self):
         cleaned_data = super().clean()
@@ -260,6 +226,21 @@ class MemberForm(forms.ModelForm):
             # Automatisch aktivieren
             cleaned_data['manual_validity'] = True
         
+        # Duplikat-Prüfung über den normalisierten Namen ('Müller' = 'Mueller')
+        first_name = cleaned_data.get('first_name')
+        last_name = cleaned_data.get('last_name')
+        birth_date = cleaned_data.get('birth_date')
+        if first_name and last_name and birth_date:
+            duplicates = Member.objects.duplicates_of(first_name, last_name, birth_date)
+            if self.instance.pk:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            duplicate = duplicates.first()
+            if duplicate:
+                raise ValidationError(
+                    f"Es existiert bereits ein Mitglied {duplicate.full_name} "
+                    f"mit diesem Geburtsdatum ({duplicate.card_number})."
+                )
+        
         return cleaned_data
 
 class ImportForm(forms.Form):
@@ -285,3 +266,46 @@ class ImportForm(forms.Form):
                 raise ValidationError("Nur CSV-Dateien sind erlaubt. Bitte konvertieren Sie Excel-Dateien zu CSV.")
         
         return file
+
+
+class PhotoImportForm(forms.Form):
+    """Form für den Foto-Import (ZIP mit vorname.nachname.jpg bzw. Personalnummer.jpg)"""
+    
+    archive = forms.FileField(
+        label="ZIP-Archiv",
+        help_text="Bilddateien benannt als vorname.nachname.jpg oder Personalnummer.jpg",
+        widget=forms.FileInput(attrs={
+            'class': 'form-control d-block',
+            'accept': '.zip'
+        })
+    )
+    
+    def clean_archive(self):
+        archive = self.cleaned_data.get('archive')
+        if archive:
+            max_size = settings.PHOTO_IMPORT_MAX_SIZE
+            if archive.size > max_size:
+                raise ValidationError(f"Archiv ist zu groß. Maximale Größe: {max_size // (1024 * 1024)}MB")
+            
+            if not archive.name.lower().endswith('.zip') or not zipfile.is_zipfile(archive):
+                raise ValidationError("Nur ZIP-Archive sind erlaubt.")
+            
+            # Anzahl und entpackte Größe laut Inhaltsverzeichnis - vor dem Hochladen in den Worker
+            try:
+                with zipfile.ZipFile(archive) as zip_archive:
+                    photo_entries(zip_archive)
+            except PhotoArchiveTooLarge as e:
+                raise ValidationError(str(e))
+            archive.seek(0)
+        
+        return archive
+
+
+class WebcamPhotoForm(forms.Form):
+    """Webcam-Aufnahme als Binärdatei (Blob aus canvas.toBlob, bereits im Passbild-Format zugeschnitten)"""
+    
+    # FileField statt ImageField: der Header wird in clean_portrait_upload geprüft
+    photo = forms.FileField(label="Webcam-Aufnahme")
+    
+    def clean_photo(self):
+        return clean_portrait_upload(self.cleaned_data['photo'])
@@ -0,0 +1,242 @@
+# members/management/commands/bench.py
+
+import io
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import subprocess
+import django
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from members.utils.benchmark import (
+    build_import_csv, generate_photo_pool, run_scenario, seed_members, throwaway_database,
+)
+
+BENCH_USER = 'bench'
+
+
+def _get(path):
+    """GET-Szenario über den Test-Client, gestreamte Antworten werden vollständig gelesen"""
+    def request(client):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path}: HTTP {response.status_code}")
+        if response.streaming:
+            for _block in response.streaming_content:
+                pass
+        response.close()
+    return request
+
+
+def _csv_import(rows):
+    csv_data = build_import_csv(rows)
+
+    def request(client):
+        upload = io.BytesIO(csv_data)
+        upload.name = 'bench_import.csv'
+        # Import wieder zurückrollen - jeder Durchlauf sieht denselben Bestand
+        with transaction.atomic():
+            response = client.post('/import/', {'file': upload})
+            transaction.set_rollback(True)
+        if response.status_code != 302:
+            raise RuntimeError(f"Import: HTTP {response.status_code}")
+    return request
+
+
+def _cardpresso_export(output_dir):
+    def run(client):
+        call_command('create_cardpresso_db', output_dir=output_dir, clean=True, stdout=io.StringIO())
+    return run
+
+
+def build_scenarios(options, workdir):
+    """Name -> Funktion(client); Reihenfolge = Reihenfolge der Ausgabe"""
+    return {
+        'dashboard': _get('/'),
+        'member_list': _get('/members/'),
+        'member_list_search': _get('/members/?search=m%C3%BCller'),
+        'member_list_search_prefix': _get('/members/?search=sch'),
+        'member_list_sort_valid_until': _get('/members/?sort=valid_until'),
+        'member_list_sort_created': _get('/members/?sort=created'),
+        'member_list_filter_type': _get('/members/?member_type=FF&status=active'),
+        'filtered_valid': _get('/members/valid/'),
+        'filtered_expiring': _get('/members/expiring/'),
+        'filtered_expired': _get('/members/expired/'),
+        'filtered_active': _get('/members/active/'),
+        'filtered_inactive': _get('/members/inactive/'),
+        'card_creation_list': _get('/cards/create/'),
+        'csv_import': _csv_import(options['import_rows']),
+        'export_csv': _get('/export/?format=csv'),
+        'export_xlsx': _get('/export/?format=excel'),
+        'create_cardpresso_db': _cardpresso_export(os.path.join(workdir, 'cardpresso')),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark der Mitgliederverwaltung mit synthetischen Mitgliedern: Laufzeit (p50/p95), '
+        'SQL-Abfragen und Peak-RSS je Ansicht, Import und Export als JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10000',
+            help='Kommagetrennte Anzahl synthetischer Mitglieder (z.B. 10000,100000,500000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Durchläufe je Szenario (Standard: 5)'
+        )
+        parser.add_argument(
+            '--only',
+            help='Nur Szenarien, deren Name mit einem dieser Präfixe beginnt (kommagetrennt)'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Cache zwischen den Durchläufen nicht leeren'
+        )
+        parser.add_argument(
+            '--photos',
+            type=int,
+            default=50,
+            help='Anzahl verschiedener synthetischer Passbilder (0 = ohne Bilder)'
+        )
+        parser.add_argument(
+            '--import-rows',
+            type=int,
+            default=1000,
+            help='Zeilen der CSV-Datei für das Import-Szenario'
+        )
+        parser.add_argument(
+            '--output',
+            help='Ergebnis-Datei (Standard: bench_<Zeitstempel>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Früheres Ergebnis (JSON) zum Vergleich'
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(',') if size.strip())
+        if not sizes or options['repeat'] < 1:
+            raise CommandError('--sizes und --repeat müssen positiv sein')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        output = options['output'] or f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        workdir = tempfile.mkdtemp(prefix='members_bench_media_')
+        results = []
+
+        # Eigener Cache und eigene Ablage - der Betrieb bleibt unberührt
+        isolated = override_settings(
+            MEDIA_ROOT=os.path.join(workdir, 'media'),
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ALLOWED_HOSTS=['testserver'],
+        )
+        try:
+            with isolated, throwaway_database():
+                user = User.objects.create_superuser(BENCH_USER, password=None)
+
+                photos = []
+                if options['photos']:
+                    self.stdout.write(f"🖼️  Erzeuge {options['photos']} synthetische Passbilder...")
+                    photos = generate_photo_pool(options['photos'])
+
+                scenarios = build_scenarios(options, workdir)
+                if options['only']:
+                    prefixes = tuple(prefix.strip() for prefix in options['only'].split(','))
+                    scenarios = {name: func for name, func in scenarios.items() if name.startswith(prefixes)}
+
+                seeded = 0
+                for size in sizes:
+                    self.stdout.write(f"🔄 Erzeuge {size} synthetische Mitglieder...")
+                    seeded += seed_members(size - seeded, seed=size, photos=photos)
+
+                    for name, func in scenarios.items():
+                        result = self.run_scenario(func, user, options)
+                        result.update({'members': size, 'scenario': name})
+                        results.append(result)
+                        self.write_result(result, baseline)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'revision': _git_revision(),
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'cpu_count': os.cpu_count(),
+                'sizes': sizes,
+                'repeat': options['repeat'],
+                'warm_cache': options['warm_cache'],
+                'photos': options['photos'],
+                'import_rows': options['import_rows'],
+            },
+            'results': results,
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Ergebnis gespeichert: {output}"))
+
+    def run_scenario(self, func, user, options):
+        def before_each():
+            if not options['warm_cache']:
+                cache.clear()
+
+        def scenario():
+            func(client)
+
+        client = Client()
+        client.force_login(user)
+        return run_scenario(scenario, options['repeat'], before_each)
+
+    def write_result(self, result, baseline):
+        line = (
+            f"   {result['scenario']:<30} p50 {result['p50_ms'] or 0:>9.1f} ms  "
+            f"p95 {result['p95_ms'] or 0:>9.1f} ms  {result['queries'] or 0:>4} Abfragen  "
+            f"Peak-RSS {result['peak_rss_mb']:>7.1f} MB"
+        )
+        previous = self.find_previous(baseline, result)
+        if previous and previous.get('p50_ms') and result['p50_ms']:
+            change = (result['p50_ms'] / previous['p50_ms'] - 1) * 100
+            line += f"  ({change:+.0f}% p50, {(result['queries'] or 0) - (previous['queries'] or 0):+d} Abfragen)"
+        if result['error']:
+            line += f"  ❌ {result['error']}"
+        self.stdout.write(line)
+
+    @staticmethod
+    def find_previous(baseline, result):
+        if not baseline:
+            return None
+        for previous in baseline.get('results', []):
+            if previous['members'] == result['members'] and previous['scenario'] == result['scenario']:
+                return previous
+        return None
@@ -0,0 +1,89 @@
+# members/management/commands/bench_xlsx_export.py
+
+import io
+import json
+import shutil
+from django.core.management.base import BaseCommand
+from members.models import Member
+from members.utils.benchmark import measure_in_subprocess, seed_members, throwaway_database
+from members.utils.export import build_xlsx, iter_export_rows
+
+
+def legacy_xlsx_export():
+    """Bisherige Implementierung: Model-Instanzen -> Liste von Dicts -> DataFrame -> ExcelWriter"""
+    import pandas as pd
+
+    export_data = []
+    for member in Member.objects.all().order_by('last_name', 'first_name'):
+        export_data.append({
+            'Vorname': member.first_name,
+            'Nachname': member.last_name,
+            'Geburtsdatum': member.birth_date.strftime('%d.%m.%Y'),
+            'Personalnummer': member.personnel_number or '',
+            'Mitarbeitertyp': member.get_member_type_display(),
+            'Mitarbeitertyp_Code': member.member_type,
+            'Ausweisnummer': member.card_number,
+            'Ausweisnummer_Praefix': member.card_number_prefix or '',
+            'Ausgestellt_am': member.issued_date.strftime('%d.%m.%Y') if member.issued_date else '',
+            'Gueltig_bis': member.valid_until.strftime('%d.%m.%Y') if member.valid_until else '',
+            'Manuelle_Gueltigkeit': 'Ja' if member.manual_validity else 'Nein',
+            'Aktiv': 'Ja' if member.is_active else 'Nein',
+            'Erstellt_am': member.created_at.strftime('%d.%m.%Y %H:%M'),
+        })
+
+    df = pd.DataFrame(export_data)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Mitglieder', index=False)
+
+
+def streaming_xlsx_export():
+    """Neue Implementierung: values_list-Cursor -> write-only Arbeitsmappe -> temporäre Datei"""
+    members = Member.objects.all().order_by('last_name', 'first_name')
+    with build_xlsx(iter_export_rows(members)) as output:
+        # Auslieferung wie FileResponse simulieren
+        with open('/dev/null', 'wb') as sink:
+            shutil.copyfileobj(output, sink)
+
+
+class Command(BaseCommand):
+    help = 'Vergleicht Laufzeit und Peak-RSS des Excel-Exports (pandas vs. write-only) mit synthetischen Daten'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10000,100000',
+            help='Kommagetrennte Anzahl synthetischer Mitglieder'
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Bisherige pandas-Implementierung nicht messen'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        results = []
+
+        with throwaway_database():
+            seeded = 0
+            for size in sorted(sizes):
+                self.stdout.write(f"🔄 Erzeuge {size} synthetische Mitglieder...")
+                seeded += seed_members(size - seeded, seed=size)
+
+                implementations = [('write_only', streaming_xlsx_export)]
+                if not options['skip_legacy']:
+                    implementations.insert(0, ('pandas', legacy_xlsx_export))
+
+                for name, func in implementations:
+                    result = measure_in_subprocess(func)
+                    result.update({'members': size, 'implementation': name})
+                    results.append(result)
+                    self.stdout.write(
+                        f"   {name:<12} {result['wall_time_s']:>8.2f}s  "
+                        f"Peak-RSS {result['peak_rss_mb']:>7.1f} MB "
+                        f"(+{result['peak_rss_delta_mb']} MB)"
+                        + (f"  ❌ {result['error']}" if result['error'] else '')
+                    )
+
+        self.stdout.write(json.dumps(results, indent=2))
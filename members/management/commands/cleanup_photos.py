@@ -0,0 +1,47 @@
+# members/management/commands/cleanup_photos.py
+
+import os
+from django.core.management.base import BaseCommand
+from members.models import Member
+
+
+class Command(BaseCommand):
+    help = 'Löscht Profilbilder (samt Anzeige-Varianten), auf die kein Mitglied mehr verweist'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Nur auflisten, nichts löschen'
+        )
+
+    def handle(self, *args, **options):
+        storage = Member._meta.get_field('profile_picture').storage
+        root = os.path.join(storage.location, 'profile_pics')
+
+        referenced = set(
+            Member.objects
+            .exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+            .iterator()
+        )
+
+        orphans = []
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), storage.location).replace(os.sep, '/')
+                if name not in referenced:
+                    orphans.append(name)
+
+        if options['dry_run']:
+            for name in sorted(orphans):
+                self.stdout.write(f"   {name}")
+            self.stdout.write(f"🔍 {len(orphans)} Bilder ohne Verweis")
+            return
+
+        # release_photo prüft unter der Sperre der Ablage erneut und lässt
+        # gerade gespeicherte Dateien stehen
+        removed = sum(1 for name in orphans if Member.release_photo(name))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {removed} Bilder ohne Verweis gelöscht, {len(orphans) - removed} vorerst behalten"
+        ))
@@ -1,16 +1,37 @@
 # members/management/commands/create_cardpresso_db.py
 
 import os
-import sqlite3
+import json
+import time
 import shutil
 from datetime import datetime
-from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from members.models import Member
+from members.utils.cardpresso_export import (
+    EXPORT_FIELDS, PROFILES, CardpressoExporter, file_sha256, write_export_manifest, write_json_atomic,
+)
+from members.utils.storage import is_content_addressed
+
+# Manifest für den inkrementellen Abgleich (im Projektverzeichnis)
+MANIFEST_NAME = 'sync_manifest.json'
+
+
+def parse_member_ids(value):
+    """Kommagetrennte Mitglieder-IDs (oder Liste) -> Liste von ints"""
+    if isinstance(value, str):
+        value = value.split(',')
+    try:
+        return [int(str(member_id).strip()) for member_id in value if str(member_id).strip()]
+    except ValueError:
+        raise CommandError(f"Ungültige Mitglieder-IDs: {value}")
+
 
 class Command(BaseCommand):
     help = 'Erstellt erweiterte Cardpresso-SQLite-Datenbank mit korrekter Struktur'
     
+    # Nur programmatisch über call_command(..., queryset=..., progress=...) nutzbar
+    stealth_options = ('queryset', 'progress')
+    
     def add_arguments(self, parser):
         parser.add_argument(
             '--output-dir',
@@ -22,17 +43,63 @@ class Command(BaseCommand):
             action='store_true',
             help='Lösche existierendes Verzeichnis vor Erstellung'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Bestehendes Projekt abgleichen: nur geänderte Zeilen und Fotos schreiben'
+        )
+        parser.add_argument(
+            '--member-ids',
+            type=parse_member_ids,
+            help='Nur diese Mitglieder exportieren (kommagetrennte IDs)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=sorted(PROFILES),
+            default='indexed',
+            help='Tabellen-Layout der Cardpresso-Datenbank (Standard: indexed)'
+        )
+        parser.add_argument(
+            '--transcode',
+            action='store_true',
+            help='Fotos als Baseline-JPEG (300 DPI) statt als Kopie ablegen'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Prozesse für --transcode (Standard: Anzahl CPU-Kerne)'
+        )
+    
+    def get_members(self, options):
+        """Zu exportierende Mitglieder - alle oder per ID-Liste/Queryset eingeschränkt"""
+        members = options.get('queryset')
+        if members is None:
+            members = Member.objects.all()
+        if options.get('member_ids') is not None:
+            members = members.filter(id__in=options['member_ids'])
+        return members
     
     def handle(self, *args, **options):
         output_dir = options['output_dir']
         clean = options['clean']
         
+        if options['incremental']:
+            if clean:
+                self.stdout.write("ℹ️  --clean wird im inkrementellen Modus ignoriert")
+            return self.sync_incremental(output_dir, options)
+        
         self.stdout.write("🔄 Erstelle erweiterte Cardpresso-Datenbank...")
         
+        progress = options.get('progress')
+        
         # 1. Verzeichnisstruktur erstellen
-        if clean and os.path.exists(output_dir):
-            self.stdout.write(f"🗑️  Lösche existierendes Verzeichnis: {output_dir}")
-            shutil.rmtree(output_dir)
+        # Mit --clean wird in ein Staging-Verzeichnis gebaut und erst am Ende
+        # ausgetauscht - ein abgebrochener Export hinterlässt kein halbes Projekt
+        target_dir = output_dir
+        if clean:
+            output_dir = f"{target_dir}.partial"
+            if os.path.exists(output_dir):
+                shutil.rmtree(output_dir)
         
         # Verzeichnisse erstellen
         database_dir = os.path.join(output_dir, 'database')
@@ -43,173 +110,77 @@ class Command(BaseCommand):
         
         self.stdout.write(f"📁 Verzeichnisse erstellt: {output_dir}")
         
-        # 2. SQLite-Datenbank erstellen
+        # 2. Fotos und Zeilen exportieren - Datenbank in einer Staging-Datei,
+        # die bestehende wird erst ersetzt, wenn die neue vollständig ist
         db_path = os.path.join(database_dir, 'cardpresso_indexed.sqlite')
+        exporter = CardpressoExporter(
+            options['profile'], db_path, images_dir=images_dir,
+            transcode=options['transcode'], workers=options.get('workers'),
+        )
         
-        if os.path.exists(db_path):
-            os.remove(db_path)
-            self.stdout.write("🗑️  Alte Datenbank gelöscht")
-        
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # 3. Erweiterte Tabelle mit ALLEN Spalten erstellen (GENAU WIE IM ORIGINAL)
-        self.stdout.write("📊 Erstelle Tabelle mit erweiterter Struktur...")
-        cursor.execute('''
-            CREATE TABLE members (
-                id INTEGER PRIMARY KEY,
-                personalnummer TEXT,
-                vorname TEXT,
-                nachname TEXT,
-                vollname TEXT,
-                telefon TEXT,
-                geburtsdatum TEXT,
-                ausweisnummer TEXT,
-                kartenprefix TEXT,
-                kartennummer TEXT,
-                ausstellungsdatum TEXT,
-                gueltig_bis TEXT,
-                mitgliedertyp TEXT,
-                aktiv TEXT,
-                photo TEXT
-            )
-        ''')
-        
-        # 4. Mitglieder aus Django-Modell exportieren
-        count = 0
-        foto_count = 0
-        
+        self.stdout.write(f"📊 Tabellen-Layout: {exporter.profile.description}")
         self.stdout.write("👥 Exportiere Mitglieder...")
         
         try:
-            for member in Member.objects.all():
-                photo_name = ""
-                
-                # Foto-Verarbeitung (erweitert wie im Original)
-                if member.profile_picture and os.path.exists(member.profile_picture.path):
-                    original_filename = os.path.basename(member.profile_picture.path)
-                    photo_name = os.path.splitext(original_filename)[0]
-                    
-                    source_path = member.profile_picture.path
-                    target_path = os.path.join(images_dir, original_filename)
-                    
-                    try:
-                        shutil.copy2(source_path, target_path)
-                        foto_count += 1
-                        self.stdout.write(f"📸 Foto kopiert: {original_filename}")
-                    except Exception as e:
-                        self.stdout.write(f"❌ Fehler bei {original_filename}: {e}")
-                        photo_name = ""
-                else:
-                    # Suche nach Bildern im Format vorname.nachname (wie im Original)
-                    if member.first_name and member.last_name:
-                        possible_names = [
-                            f"{member.first_name.lower()}.{member.last_name.lower()}",
-                            f"{member.first_name}.{member.last_name}",
-                        ]
-                        
-                        for base_name in possible_names:
-                            for ext in ['.jpg', '.jpeg', '.png']:
-                                test_filename = f"{base_name}{ext}"
-                                # Prüfe in MEDIA_ROOT/profile_pics/
-                                test_path = os.path.join(settings.MEDIA_ROOT, 'profile_pics', test_filename)
-                                
-                                if os.path.exists(test_path):
-                                    photo_name = base_name
-                                    target_path = os.path.join(images_dir, test_filename)
-                                    
-                                    try:
-                                        shutil.copy2(test_path, target_path)
-                                        foto_count += 1
-                                        self.stdout.write(f"📸 Foto gefunden und kopiert: {test_filename}")
-                                        break
-                                    except Exception as e:
-                                        self.stdout.write(f"❌ Fehler beim Kopieren von {test_filename}: {e}")
-                            
-                            if photo_name:
-                                break
-                
-                # Vollständige Ausweisnummer erstellen (wie im Original)
-                ausweisnummer = f"{member.card_number_prefix or ''}{member.card_number or ''}".strip()
-                
-                # Vollname erstellen
-                vollname = f"{member.first_name or ''} {member.last_name or ''}".strip()
-                
-                # Daten in SQLite einfügen (ERWEITERT mit ALLEN Spalten wie im Original!)
-                cursor.execute('''
-                    INSERT INTO members 
-                    (id, personalnummer, vorname, nachname, vollname, telefon, geburtsdatum,
-                     ausweisnummer, kartenprefix, kartennummer, ausstellungsdatum, gueltig_bis,
-                     mitgliedertyp, aktiv, photo)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    member.id,
-                    member.personnel_number or '',
-                    member.first_name or '',
-                    member.last_name or '',
-                    vollname,
-                    '123-456-789',  # Dummy-Telefon (falls nicht vorhanden) - wie im Original
-                    member.birth_date.strftime('%d.%m.%Y') if member.birth_date else '',
-                    ausweisnummer,  # Vollständige Ausweisnummer
-                    member.card_number_prefix or '',
-                    member.card_number or '',
-                    member.issued_date.strftime('%d.%m.%Y') if member.issued_date else '',
-                    member.valid_until.strftime('%d.%m.%Y') if member.valid_until else '',
-                    member.get_member_type_display() if hasattr(member, 'get_member_type_display') else member.member_type,
-                    'JA' if member.is_active else 'NEIN',
-                    photo_name
-                ))
-                count += 1
-                
+            inspect = self.inspect_table if exporter.profile.name == 'indexed' else None
+            exporter.run(self.get_members(options), progress=progress, inspect=inspect)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"❌ Fehler beim Exportieren der Mitglieder: {e}"))
-            conn.close()
-            return
+            if clean:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            raise CommandError(f"Fehler beim Exportieren der Mitglieder: {e}")
         
-        conn.commit()
+        for error in exporter.errors:
+            self.stdout.write(f"❌ Fehler bei {error}")
+        count = exporter.rows
+        foto_count = exporter.photos
         
-        # 5. Erfolgs-Meldung und Statistiken (wie im Original)
-        self.stdout.write(self.style.SUCCESS(f"\n✅ Erweiterte Cardpresso-Datenbank erstellt!"))
-        self.stdout.write(f"📊 {count} Mitglieder exportiert")
-        self.stdout.write(f"📸 {foto_count} Fotos kopiert")
+        # Vollständiger Neuaufbau: ein altes Sync-Manifest passt nicht mehr
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
         
-        # 6. Beispiel-Daten anzeigen (wie im Original)
-        cursor.execute("""
-            SELECT vollname, ausweisnummer, ausstellungsdatum, gueltig_bis, photo 
-            FROM members 
-            WHERE ausweisnummer != '' OR photo != '' 
-            LIMIT 5
-        """)
+        # Kennzahlen für Status-Abfragen (Pfade relativ, überstehen den Austausch)
+        exporter.write_manifest(output_dir)
         
-        self.stdout.write(f"\n📋 Beispiel-Daten:")
-        self.stdout.write(f"{'Name':<20} {'Ausweis':<15} {'Ausgestellt':<12} {'Gültig bis':<12} {'Foto'}")
-        self.stdout.write("-" * 80)
-        
-        for row in cursor.fetchall():
-            name = (row[0] or '')[:19]
-            ausweis = (row[1] or '')[:14] 
-            ausgestellt = (row[2] or '')[:11]
-            gueltig = (row[3] or '')[:11]
-            foto = '✅' if row[4] else '❌'
-            self.stdout.write(f"{name:<20} {ausweis:<15} {ausgestellt:<12} {gueltig:<12} {foto}")
-        
-        # 7. Statistiken (wie im Original)
-        cursor.execute("SELECT COUNT(*) FROM members WHERE ausweisnummer != ''")
-        mit_ausweis = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM members WHERE photo != ''")
-        mit_foto = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Erweiterte Cardpresso-Datenbank erstellt!"))
+        self.stdout.write(f"📊 {count} Mitglieder exportiert")
+        self.stdout.write(f"📸 {foto_count} Fotos ({exporter.copied} neu geschrieben)")
         
-        cursor.execute("SELECT COUNT(*) FROM members WHERE gueltig_bis != ''")
-        mit_gueltigkeitsdatum = cursor.fetchone()[0]
+        self.stdout.write(f"⏱️  {exporter.format_timings()}")
         
-        self.stdout.write(f"\n📊 Statistiken:")
-        self.stdout.write(f"  👤 Mitglieder gesamt: {count}")
-        self.stdout.write(f"  🆔 Mit Ausweisnummer: {mit_ausweis}")
-        self.stdout.write(f"  📸 Mit Foto: {mit_foto}")
-        self.stdout.write(f"  📅 Mit Gültigkeitsdatum: {mit_gueltigkeitsdatum}")
+        # 6. Beispiel-Daten und Statistiken (nur für das indexed-Layout)
+        if exporter.inspected:
+            sample_rows, mit_ausweis, mit_foto, mit_gueltigkeitsdatum = exporter.inspected
+            
+            self.stdout.write(f"\n📋 Beispiel-Daten:")
+            self.stdout.write(f"{'Name':<20} {'Ausweis':<15} {'Ausgestellt':<12} {'Gültig bis':<12} {'Foto'}")
+            self.stdout.write("-" * 80)
+            
+            for row in sample_rows:
+                name = (row[0] or '')[:19]
+                ausweis = (row[1] or '')[:14] 
+                ausgestellt = (row[2] or '')[:11]
+                gueltig = (row[3] or '')[:11]
+                foto = '✅' if row[4] else '❌'
+                self.stdout.write(f"{name:<20} {ausweis:<15} {ausgestellt:<12} {gueltig:<12} {foto}")
+            
+            # 7. Statistiken (wie im Original)
+            self.stdout.write(f"\n📊 Statistiken:")
+            self.stdout.write(f"  👤 Mitglieder gesamt: {count}")
+            self.stdout.write(f"  🆔 Mit Ausweisnummer: {mit_ausweis}")
+            self.stdout.write(f"  📸 Mit Foto: {mit_foto}")
+            self.stdout.write(f"  📅 Mit Gültigkeitsdatum: {mit_gueltigkeitsdatum}")
         
-        conn.close()
+        # Fertiges Projekt an den Zielort verschieben
+        if clean:
+            if os.path.exists(target_dir):
+                self.stdout.write(f"🗑️  Lösche existierendes Verzeichnis: {target_dir}")
+                shutil.rmtree(target_dir)
+            os.replace(output_dir, target_dir)
+            output_dir = target_dir
+            db_path = os.path.join(output_dir, 'database', 'cardpresso_indexed.sqlite')
+            images_dir = os.path.join(output_dir, 'images')
         
         # 8. Abschlussinformationen (wie im Original)
         self.stdout.write(self.style.SUCCESS(f"\n🎯 Cardpresso-Projekt bereit:"))
@@ -232,4 +203,155 @@ class Command(BaseCommand):
         self.stdout.write(f"   2. Datenbank verbinden: {os.path.abspath(db_path)}")
         self.stdout.write(f"   3. Tabelle auswählen: members")
         self.stdout.write(f"   4. Spalten zuordnen nach Bedarf")
-        self.stdout.write(f"   5. Bildpfad: {os.path.abspath(images_dir)}/")
\ No newline at end of file
+        self.stdout.write(f"   5. Bildpfad: {os.path.abspath(images_dir)}/")
+    
+    @staticmethod
+    def inspect_table(writer):
+        """Beispielzeilen und Zähler der fertigen Tabelle (vor dem Austausch)"""
+        sample_rows = writer.execute("""
+            SELECT vollname, ausweisnummer, ausstellungsdatum, gueltig_bis, photo 
+            FROM members 
+            WHERE ausweisnummer != '' OR photo != '' 
+            LIMIT 5
+        """).fetchall()
+        mit_ausweis = writer.execute("SELECT COUNT(*) FROM members WHERE ausweisnummer != ''").fetchone()[0]
+        mit_foto = writer.execute("SELECT COUNT(*) FROM members WHERE photo != ''").fetchone()[0]
+        mit_gueltigkeitsdatum = writer.execute("SELECT COUNT(*) FROM members WHERE gueltig_bis != ''").fetchone()[0]
+        return sample_rows, mit_ausweis, mit_foto, mit_gueltigkeitsdatum
+    
+    def sync_incremental(self, output_dir, options):
+        """
+        Gleicht ein bestehendes Cardpresso-Projekt mit der Datenbank ab.
+        
+        Ein Manifest merkt sich pro Mitglied updated_at und Größe, mtime und
+        SHA-256 des Fotos. Nur geänderte Zeilen werden geschrieben, nur
+        geänderte Fotos kopiert und gelöschte Mitglieder entfernt - die
+        Laufzeit hängt von der Anzahl der Änderungen ab, nicht vom Bestand.
+        """
+        self.stdout.write("🔄 Gleiche Cardpresso-Projekt inkrementell ab...")
+        started = time.perf_counter()
+        
+        database_dir = os.path.join(output_dir, 'database')
+        images_dir = os.path.join(output_dir, 'images')
+        os.makedirs(database_dir, exist_ok=True)
+        os.makedirs(images_dir, exist_ok=True)
+        
+        db_path = os.path.join(database_dir, 'cardpresso_indexed.sqlite')
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        profile = PROFILES[options['profile']]
+        exporter = CardpressoExporter(profile, db_path, images_dir=images_dir, transcode=options['transcode'])
+        
+        manifest = {}
+        if os.path.exists(manifest_path) and os.path.exists(db_path):
+            with open(manifest_path, encoding='utf-8') as handle:
+                data = json.load(handle)
+            # Manifest eines anderen Layouts: Tabelle neu aufbauen
+            if data.get('profile', 'indexed') == profile.name:
+                manifest = data.get('members', {})
+        
+        upserts = []
+        new_manifest = {}
+        stale_photos = set()
+        copied = 0
+        
+        # Bei eingeschränkter Auswahl bleiben alle übrigen Einträge unberührt
+        scoped = options.get('queryset') is not None or options.get('member_ids') is not None
+        requested_ids = set(str(member_id) for member_id in options.get('member_ids') or [])
+        seen_ids = set()
+        if scoped:
+            new_manifest.update(manifest)
+        
+        rows = self.get_members(options).values(*EXPORT_FIELDS).order_by('id').iterator(chunk_size=2000)
+        for row in rows:
+            key = str(row['id'])
+            seen_ids.add(key)
+            previous = manifest.get(key, {})
+            entry = {
+                'updated_at': row['updated_at'].isoformat() if row['updated_at'] else '',
+                'photo': '',
+            }
+            photo_changed = False
+            
+            # Nachschlagen im PhotoIndex (ein scandir-Durchlauf) statt os.stat je Mitglied
+            source = exporter.resolve_photo(row)
+            photo = exporter.export_photo(row, source)
+            if photo:
+                stat = source.stat()
+                entry.update({
+                    'photo': photo.filename,
+                    'source': photo.source,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'sha256': previous.get('sha256', ''),
+                })
+                
+                same_stat = all(previous.get(field) == entry[field] for field in ('source', 'size', 'mtime_ns'))
+                if is_content_addressed(photo.source) and os.path.exists(photo.path):
+                    # Der Dateiname ist der Hash - vorhandene Kopie ist aktuell
+                    entry['sha256'] = os.path.splitext(source.name)[0]
+                elif not same_stat or not os.path.exists(photo.path):
+                    # Nur hashen, wenn sich Quelle, Größe oder Zeitstempel geändert haben
+                    entry['sha256'] = file_sha256(photo.source)
+                    if entry['sha256'] != previous.get('sha256') or not os.path.exists(photo.path):
+                        exporter.write_photo(photo)
+                        photo_changed = True
+                        copied += 1
+            
+            new_manifest[key] = entry
+            
+            if (previous.get('updated_at') == entry['updated_at']
+                    and previous.get('photo') == entry['photo']
+                    and not photo_changed):
+                continue
+            
+            if previous.get('photo') and previous['photo'] != entry['photo']:
+                stale_photos.add(previous['photo'])
+            
+            upserts.append(profile.build_row(row, photo))
+        
+        if scoped:
+            # Angeforderte IDs, die es nicht mehr gibt, gelten als gelöscht
+            for key in requested_ids - seen_ids:
+                new_manifest.pop(key, None)
+        
+        removed_ids = [int(key) for key in manifest if key not in new_manifest]
+        stale_photos.update(manifest[key].get('photo') for key in manifest if key not in new_manifest)
+        
+        # Auf einer Kopie abgleichen und atomar austauschen - Cardpresso sperrt
+        # die Datenbank nicht und sieht keinen halben Abgleich. Ohne passendes
+        # Manifest wird die Tabelle neu aufgebaut.
+        if upserts or removed_ids or not manifest:
+            with profile.writer(db_path, upsert=True, from_target=bool(manifest)) as writer:
+                writer.add_many(upserts)
+                if removed_ids:
+                    writer.executemany("DELETE FROM members WHERE id = ?", [(member_id,) for member_id in removed_ids])
+        
+        # Fotos entfernen, die kein Mitglied mehr verwendet
+        used_photos = {entry['photo'] for entry in new_manifest.values()}
+        for filename in stale_photos - used_photos:
+            if filename and os.path.exists(os.path.join(images_dir, filename)):
+                os.remove(os.path.join(images_dir, filename))
+        
+        # Manifest atomar ersetzen
+        write_json_atomic(manifest_path, {
+            'synced_at': datetime.now().isoformat(),
+            'profile': profile.name,
+            'members': new_manifest,
+        })
+        
+        # Kennzahlen des abgeglichenen Projekts (aus dem Sync-Manifest, ohne Scan)
+        member_ids = [int(key) for key in new_manifest]
+        image_paths = {os.path.join(images_dir, entry['photo']) for entry in new_manifest.values() if entry['photo']}
+        write_export_manifest(
+            output_dir, db_path, profile.name, len(new_manifest),
+            (min(member_ids), max(member_ids)) if member_ids else (None, None),
+            sorted(image_paths), time.perf_counter() - started,
+            photo_count=sum(1 for entry in new_manifest.values() if entry['photo']),
+            images_written=copied, rows_written=len(upserts), members_removed=len(removed_ids),
+        )
+        
+        self.stdout.write(self.style.SUCCESS(f"\n✅ Cardpresso-Projekt abgeglichen: {os.path.abspath(output_dir)}/"))
+        self.stdout.write(f"   ✏️  {len(upserts)} Zeilen geschrieben")
+        self.stdout.write(f"   📸 {copied} Fotos kopiert")
+        self.stdout.write(f"   🗑️  {len(removed_ids)} Mitglieder entfernt")
+        self.stdout.write(f"   ⏭️  {len(new_manifest) - len(upserts)} unverändert")
@@ -0,0 +1,58 @@
+# members/management/commands/generate_image_variants.py
+
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from members.models import Member
+from members.utils.images import IMAGE_VARIANTS, VARIANT_DIR, save_variants
+
+
+class Command(BaseCommand):
+    help = 'Erzeugt fehlende Anzeige-Varianten (Thumbnails, WebP) der Passbilder'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Varianten ohne zugehöriges Mitglied bzw. alter Größen löschen'
+        )
+
+    def handle(self, *args, **options):
+        members = (
+            Member.objects
+            .exclude(profile_picture='').exclude(photo_hash='')
+            .only('id', 'profile_picture', 'photo_hash')
+        )
+
+        created = skipped = 0
+        hashes = set()
+        for member in members.iterator():
+            hashes.add(member.photo_hash)
+            if not os.path.exists(member.profile_picture.path):
+                self.stdout.write(self.style.WARNING(f"⚠️  Bild fehlt: {member.profile_picture.name}"))
+                skipped += 1
+                continue
+            with open(member.profile_picture.path, 'rb') as f:
+                created += save_variants(member.photo_hash, f.read())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(hashes)} Passbilder geprüft, {created} Varianten erzeugt, {skipped} übersprungen"
+        ))
+
+        if options['prune']:
+            removed = self.prune(hashes)
+            self.stdout.write(f"🗑️  {removed} verwaiste Varianten gelöscht")
+
+    def prune(self, hashes):
+        """Löscht Variantendateien, deren Hash oder Variantenname nicht mehr verwendet wird"""
+        root = os.path.join(settings.MEDIA_ROOT, VARIANT_DIR)
+        removed = 0
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                stem = os.path.splitext(filename)[0]
+                photo_hash, _sep, variant = stem.partition('_')
+                if photo_hash in hashes and variant in IMAGE_VARIANTS:
+                    continue
+                os.remove(os.path.join(dirpath, filename))
+                removed += 1
+        return removed
@@ -0,0 +1,59 @@
+# members/management/commands/import_photos.py
+
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from members.utils.photo_import import PhotoArchiveTooLarge, PhotoImporter, collect_photo_files, extract_photo_zip
+
+
+class Command(BaseCommand):
+    help = 'Importiert Passbilder (vorname.nachname.jpg oder Personalnummer.jpg) aus einem Verzeichnis oder ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Verzeichnis oder ZIP-Archiv mit Bilddateien')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Anzahl paralleler Prozesse (Standard: alle Kerne)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Nur Zuordnung prüfen, nichts speichern'
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        importer = PhotoImporter(workers=options['workers'])
+
+        if os.path.isdir(source):
+            paths = collect_photo_files(source)
+            self.stdout.write(f"🔄 {len(paths)} Bilder in {source}, {importer.workers} Prozesse...")
+            importer.run(paths, dry_run=options['dry_run'])
+        elif source.lower().endswith('.zip') and os.path.isfile(source):
+            with tempfile.TemporaryDirectory(prefix='photo_import_') as tmp_dir:
+                try:
+                    paths, importer.skipped = extract_photo_zip(source, tmp_dir)
+                except PhotoArchiveTooLarge as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"🔄 {len(paths)} Bilder in {source}, {importer.workers} Prozesse...")
+                importer.run(paths, dry_run=options['dry_run'])
+        else:
+            raise CommandError(f"Weder Verzeichnis noch ZIP-Archiv: {source}")
+
+        if options['dry_run']:
+            self.stdout.write(f"🔎 Probelauf: {importer.matched} Bilder zuordenbar")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {importer.attached} Passbilder zugewiesen"))
+
+        for label, filenames in (('Ohne Zuordnung', importer.unmatched),
+                                 ('Mehrdeutiger Name', importer.ambiguous),
+                                 ('Übersprungen', importer.skipped),
+                                 ('Fehler', importer.errors)):
+            if filenames:
+                self.stdout.write(self.style.WARNING(f"⚠️  {label} ({len(filenames)}):"))
+                for filename in filenames:
+                    self.stdout.write(f"   - {filename}")
+
+        self.stdout.write(f"⏱️  {importer.format_timings()}")
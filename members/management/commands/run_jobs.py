@@ -0,0 +1,47 @@
+# members/management/commands/run_jobs.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from members.utils.jobs import claim_next_job, recover_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Worker für Hintergrund-Aufträge (Cardpresso-Exporte usw.)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Alle wartenden Aufträge abarbeiten und beenden'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Sekunden zwischen zwei Abfragen der Auftragstabelle'
+        )
+
+    def handle(self, *args, **options):
+        recovered = recover_stale_jobs()
+        if recovered:
+            self.stdout.write(f"⚠️  {recovered} abgebrochene Aufträge als fehlgeschlagen markiert")
+
+        self.stdout.write("🔄 Worker gestartet - warte auf Aufträge...")
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"▶️  {job}")
+            job = run_job(job)
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"✅ {job}: {job.result_path}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"❌ {job}: {job.error}"))
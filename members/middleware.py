@@ -0,0 +1,102 @@
+# members/middleware.py - Laufzeit, SQL-Abfragen und Antwortgröße je View erfassen
+
+import time
+import logging
+from django.conf import settings
+from django.db import connection
+from members.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class QueryCounter:
+    """execute_wrapper: zählt Abfragen und summiert ihre Laufzeit (auch mit DEBUG=False)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Erfasst je URL-Name (z.B. members:dashboard) Laufzeit, Anzahl und Dauer
+    der SQL-Abfragen sowie die Antwortgröße in Histogrammen.
+
+    Gestreamte Antworten (CSV-Export, FileResponse) werden erst gemessen,
+    wenn der Server sie vollständig ausgeliefert hat - die Abfragen laufen
+    dort während des Streamens.
+
+    Über settings.METRICS_QUERY_BUDGETS ({'members:dashboard': 10, ...})
+    wird bei Überschreitung eine Warnung geloggt.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        # Reste eines nie geschlossenen Streams entfernen
+        connection.execute_wrappers[:] = [
+            wrapper for wrapper in connection.execute_wrappers if not isinstance(wrapper, QueryCounter)
+        ]
+        counter = QueryCounter()
+        started = time.perf_counter()
+        connection.execute_wrappers.append(counter)
+        try:
+            response = self.get_response(request)
+        except Exception:
+            connection.execute_wrappers.remove(counter)
+            raise
+
+        if response.streaming:
+            size = [0]
+
+            def count_bytes(content):
+                for chunk in content:
+                    size[0] += len(chunk)
+                    yield chunk
+
+            response.streaming_content = count_bytes(response.streaming_content)
+            # Läuft in response.close(), nachdem der Server alles gesendet hat
+            response._resource_closers.append(
+                lambda: self.record(request, response, counter, started, size[0])
+            )
+        else:
+            self.record(request, response, counter, started, len(response.content))
+        return response
+
+    def record(self, request, response, counter, started, size):
+        if counter in connection.execute_wrappers:
+            connection.execute_wrappers.remove(counter)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else UNRESOLVED_VIEW
+
+        registry.inc('members_http_requests_total', view, request.method, response.status_code)
+        registry.observe('members_http_request_duration_seconds', view, duration)
+        registry.observe('members_db_queries_per_request', view, counter.count)
+        registry.observe('members_db_duration_seconds', view, counter.duration)
+        registry.observe('members_http_response_size_bytes', view, size)
+
+        budget = getattr(settings, 'METRICS_QUERY_BUDGETS', {}).get(view)
+        if budget is not None and counter.count > budget:
+            registry.inc('members_query_budget_exceeded_total', view)
+            logger.warning(
+                f"Abfrage-Budget überschritten: {view} mit {counter.count} Abfragen "
+                f"(Budget {budget}, {counter.duration * 1000:.0f} ms DB, {request.get_full_path()})"
+            )
+
+        registry.flush()
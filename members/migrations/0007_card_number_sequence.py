@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_make_dates_optional'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(blank=True, max_length=10, unique=True, verbose_name='Präfix')),
+                ('next_value', models.PositiveIntegerField(default=0, verbose_name='Nächster Zählerwert')),
+            ],
+            options={
+                'verbose_name': 'Ausweisnummern-Sequenz',
+                'verbose_name_plural': 'Ausweisnummern-Sequenzen',
+            },
+        ),
+    ]
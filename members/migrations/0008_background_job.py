@@ -0,0 +1,40 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('members', '0007_card_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('cardpresso_export', 'Cardpresso-Export')], max_length=50, verbose_name='Art')),
+                ('status', models.CharField(choices=[('pending', 'Wartend'), ('running', 'Läuft'), ('done', 'Fertig'), ('failed', 'Fehlgeschlagen')], default='pending', max_length=20, verbose_name='Status')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parameter')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Zeilen gesamt')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='Zeilen verarbeitet')),
+                ('images_processed', models.PositiveIntegerField(default=0, verbose_name='Bilder verarbeitet')),
+                ('result_path', models.CharField(blank=True, max_length=500, verbose_name='Ergebnis-Pfad')),
+                ('error', models.TextField(blank=True, verbose_name='Fehler')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Erstellt von')),
+            ],
+            options={
+                'verbose_name': 'Hintergrund-Auftrag',
+                'verbose_name_plural': 'Hintergrund-Aufträge',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='members_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:40
+
+import hashlib
+import os
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hash_existing_photos(apps, schema_editor):
+    """Vorhandene Profilbilder wurden bereits bei jedem Speichern verarbeitet"""
+    Member = apps.get_model('members', 'Member')
+    for member in Member.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True).only('pk', 'profile_picture'):
+        path = os.path.join(settings.MEDIA_ROOT, member.profile_picture.name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        Member.objects.filter(pk=member.pk).update(photo_hash=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0008_background_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='photo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('cardpresso_export', 'Cardpresso-Export'), ('photo_process', 'Passbild-Verarbeitung')], max_length=50, verbose_name='Art'),
+        ),
+        migrations.RunPython(hash_existing_photos, migrations.RunPython.noop),
+    ]
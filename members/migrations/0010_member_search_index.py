@@ -0,0 +1,95 @@
+# Volltext-Suchindex (SQLite FTS5) für Mitglieder, synchron gehalten per Trigger
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def _translit(column):
+    """SQL-Ausdruck: Umlaute und ß in ASCII-Umschreibung (Müller -> Mueller)"""
+    expression = column
+    for char, replacement in [('ä', 'ae'), ('ö', 'oe'), ('ü', 'ue'), ('Ä', 'Ae'),
+                              ('Ö', 'Oe'), ('Ü', 'Ue'), ('ß', 'ss')]:
+        expression = f"replace({expression}, '{char}', '{replacement}')"
+    return expression
+
+
+NAMES_TRANSLIT = _translit("new.first_name || ' ' || new.last_name")
+
+INDEX_VALUES = (
+    f"new.id, new.first_name, new.last_name, {NAMES_TRANSLIT}, "
+    "coalesce(new.personnel_number, ''), new.card_number, "
+    "substr(new.card_number, length(coalesce(new.card_number_prefix, '')) + 1)"
+)
+
+INDEX_COLUMNS = "rowid, first_name, last_name, names_translit, personnel_number, card_number, card_digits"
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE members_member_fts USING fts5(
+        first_name, last_name, names_translit, personnel_number, card_number, card_digits,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER members_member_fts_insert AFTER INSERT ON members_member BEGIN
+        INSERT INTO members_member_fts({INDEX_COLUMNS}) VALUES ({INDEX_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER members_member_fts_update
+    AFTER UPDATE OF first_name, last_name, personnel_number, card_number, card_number_prefix
+    ON members_member BEGIN
+        DELETE FROM members_member_fts WHERE rowid = old.id;
+        INSERT INTO members_member_fts({INDEX_COLUMNS}) VALUES ({INDEX_VALUES});
+    END
+    """,
+    """
+    CREATE TRIGGER members_member_fts_delete AFTER DELETE ON members_member BEGIN
+        DELETE FROM members_member_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    INSERT INTO members_member_fts({INDEX_COLUMNS})
+    SELECT {INDEX_VALUES.replace('new.', '')} FROM members_member
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS members_member_fts_insert",
+    "DROP TRIGGER IF EXISTS members_member_fts_update",
+    "DROP TRIGGER IF EXISTS members_member_fts_delete",
+    "DROP TABLE IF EXISTS members_member_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Nur SQLite mit FTS5 - sonst sucht members.utils.search per icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.members_fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.members_fts5_probe")
+        except OperationalError:
+            return
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0009_member_photo_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
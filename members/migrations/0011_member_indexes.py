@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0010_member_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['valid_until'], name='members_active_valid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['valid_until'], name='members_valid_until_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['created_at'], name='members_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True), ('profile_picture__gt', '')), fields=['issued_date', 'valid_until'], name='members_card_issued_idx'),
+        ),
+    ]
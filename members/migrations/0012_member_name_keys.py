@@ -0,0 +1,100 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:46
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Eingefrorene Kopie von members.utils.names (Stand dieser Migration) - die
+# Migration muss unabhängig von späteren Änderungen am Laufzeitmodul bleiben
+GERMAN_TRANSLIT = str.maketrans({
+    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
+    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue', 'ẞ': 'ss',
+})
+NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+SEPARATOR_RE = re.compile(r'[\s\-]+')
+SORT_SEPARATOR = '\t'
+
+BATCH_SIZE = 500
+
+
+def transliterate(text):
+    text = (text or '').strip().translate(GERMAN_TRANSLIT)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def name_key(first_name, last_name):
+    first = NON_ALNUM_RE.sub('', transliterate(first_name))
+    last = NON_ALNUM_RE.sub('', transliterate(last_name))
+    return f'{last}|{first}'
+
+
+def sort_key(first_name, last_name):
+    first = SEPARATOR_RE.sub(' ', transliterate(first_name))
+    last = SEPARATOR_RE.sub(' ', transliterate(last_name))
+    return f'{last}{SORT_SEPARATOR}{first}'
+
+
+def backfill_name_keys(apps, schema_editor):
+    """Schlüssel blockweise setzen - nie den ganzen Bestand im Speicher"""
+    Member = apps.get_model('members', 'Member')
+    batch = []
+    for member in Member.objects.only('id', 'first_name', 'last_name').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        member.name_key = name_key(member.first_name, member.last_name)
+        member.sort_key = sort_key(member.first_name, member.last_name)
+        batch.append(member)
+        if len(batch) >= BATCH_SIZE:
+            Member.objects.bulk_update(batch, ['name_key', 'sort_key'])
+            batch = []
+    if batch:
+        Member.objects.bulk_update(batch, ['name_key', 'sort_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0011_member_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='member',
+            options={'ordering': ['sort_key', 'id'], 'verbose_name': 'Mitglied', 'verbose_name_plural': 'Mitglieder'},
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='sort_key',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['sort_key', 'id'], name='members_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['name_key', 'birth_date'], name='members_identity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['sort_key', 'id'], name='members_active_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['sort_key', 'id'], name='members_inactive_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['member_type', 'sort_key', 'id'], name='members_type_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True), ('profile_picture__gt', '')), fields=['sort_key', 'id'], name='members_card_eligible_idx'),
+        ),
+    ]
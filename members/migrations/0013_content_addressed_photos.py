@@ -0,0 +1,50 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:49
+
+import os
+from django.conf import settings
+from django.core.files import File
+from django.db import migrations, models
+import members.models
+import members.utils.storage
+
+
+def move_to_content_addressed(apps, schema_editor):
+    """
+    Vorhandene Bilder (vorname.nachname.ext) unter ihren Inhalts-Hash verschieben.
+
+    Identische Dateien werden dabei zusammengelegt. Die alten Dateien bleiben
+    stehen - gelöscht wird erst nach dem Commit mit `manage.py cleanup_photos`,
+    ein Rollback findet sonst die Bilder nicht mehr vor.
+    """
+    from members.utils.storage import is_content_addressed
+
+    Member = apps.get_model('members', 'Member')
+    storage = Member._meta.get_field('profile_picture').storage
+
+    members = Member.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+    for member in members.only('pk', 'profile_picture'):
+        old_name = member.profile_picture.name
+        if is_content_addressed(old_name):
+            continue
+        path = os.path.join(settings.MEDIA_ROOT, old_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            new_name = storage.save(f"profile_pics/{os.path.basename(old_name)}", File(f))
+        Member.objects.filter(pk=member.pk).update(profile_picture=new_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_member_name_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=members.utils.storage.ContentAddressedStorage(), upload_to=members.models.member_image_path, verbose_name='Profilbild'),
+        ),
+        migrations.RunPython(move_to_content_addressed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0013_content_addressed_photos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='result',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Ergebnis'),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('cardpresso_export', 'Cardpresso-Export'), ('photo_process', 'Passbild-Verarbeitung'), ('photo_import', 'Foto-Import')], max_length=50, verbose_name='Art'),
+        ),
+    ]
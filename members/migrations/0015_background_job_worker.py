@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0014_photo_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Worker'),
+        ),
+    ]
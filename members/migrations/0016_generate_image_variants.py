@@ -0,0 +1,58 @@
+# Anzeige-Varianten für Bestandsbilder erzeugen: 0009 setzt photo_hash für
+# vorhandene Passbilder, die Listen verlinken ab dann auf die Varianten -
+# ohne diesen Schritt zeigte jede Seite nach dem Update fehlende Bilder
+
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+from members.utils.images import IMAGE_VARIANTS, save_variants, variant_path
+
+logger = logging.getLogger(__name__)
+
+
+def generate_missing_variants(apps, schema_editor):
+    Member = apps.get_model('members', 'Member')
+    members = (
+        Member.objects
+        .exclude(profile_picture='').exclude(profile_picture__isnull=True).exclude(photo_hash='')
+        .values_list('profile_picture', 'photo_hash')
+        .distinct()
+    )
+
+    done = set()
+    for name, photo_hash in members.iterator():
+        if photo_hash in done:
+            continue
+        done.add(photo_hash)
+
+        if all(
+            default_storage.exists(variant_path(photo_hash, variant, ext))
+            for variant in IMAGE_VARIANTS for ext in ('webp', 'jpg')
+        ):
+            continue
+
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'rb') as f:
+                save_variants(photo_hash, f.read())
+        except Exception:
+            # Ein defektes Bild darf das Update nicht abbrechen -
+            # generate_image_variants meldet es später erneut
+            logger.exception(f"Bildvarianten für {name} nicht erzeugt")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0015_background_job_worker'),
+    ]
+
+    operations = [
+        migrations.RunPython(generate_missing_variants, migrations.RunPython.noop),
+    ]
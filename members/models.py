@@ -1,16 +1,102 @@
 # members/models.py
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 from datetime import date, timedelta
+import io
 import os
-import random
+import logging
 from PIL import Image
+from .utils.cache import bump_data_version
+from .utils.card_numbers import card_number_allocator
+from .utils.images import (
+    ProcessedPortrait, content_hash, delete_variants, ingest_portrait, store_variants, variant_path,
+)
+from .utils.names import name_key, sort_key
+from .utils.search import search_members
+from .utils.storage import ContentAddressedStorage, is_content_addressed
+
+logger = logging.getLogger(__name__)
 
 def member_image_path(instance, filename):
+    # Der Dateiname wird von ContentAddressedStorage durch den Inhalts-Hash
+    # ersetzt - hier zählen nur Verzeichnis und Endung
     ext = filename.split('.')[-1].lower()
-    filename = f"{instance.first_name.lower()}.{instance.last_name.lower()}.{ext}"
-    return os.path.join('profile_pics', filename)
+    return os.path.join('profile_pics', f"upload.{ext}")
+
+# Tage vor Ablauf, ab denen ein Ausweis als "läuft bald ab" gilt
+EXPIRY_WARNING_DAYS = 30
+
+
+class MemberQuerySet(models.QuerySet):
+    """
+    Status-Filter der Listen- und Dashboard-Ansichten
+    
+    Die Abfrageformen sind auf die Indizes in Member.Meta abgestimmt -
+    bei Änderungen EXPLAIN QUERY PLAN prüfen (members/tests.py).
+    """
+    
+    def active(self):
+        return self.filter(is_active=True)
+    
+    def duplicates_of(self, first_name, last_name, birth_date):
+        """Mitglieder mit gleichem normalisiertem Namen und Geburtsdatum (Index-Lookup)"""
+        return self.filter(name_key=name_key(first_name, last_name), birth_date=birth_date)
+    
+    def valid(self, today=None):
+        """Aktive Mitglieder mit gültigem Ausweis"""
+        return self.active().filter(valid_until__gt=today or date.today())
+    
+    def expiring(self, today=None, days=EXPIRY_WARNING_DAYS):
+        """Aktive Mitglieder, deren Ausweis in den nächsten `days` Tagen abläuft"""
+        today = today or date.today()
+        return self.active().filter(valid_until__gt=today, valid_until__lte=today + timedelta(days=days))
+    
+    def expired(self, today=None):
+        """Aktive Mitglieder mit abgelaufenem Ausweis"""
+        return self.active().filter(valid_until__lte=today or date.today())
+    
+    def eligible_for_card(self):
+        """Aktive Mitglieder mit Profilbild (bereit für die Ausweis-Erstellung)"""
+        # profile_picture > '' entspricht "nicht NULL und nicht leer" und
+        # passt exakt zur Bedingung des Teilindex members_card_eligible_idx
+        return self.active().filter(profile_picture__gt='')
+    
+    def search(self, term):
+        """Volltextsuche über Name, Personal- und Ausweisnummer"""
+        return search_members(self, term)
+    
+    def issue_cards(self, issue_date):
+        """
+        Stellt Ausweise für alle Mitglieder im Queryset mit einem einzigen UPDATE aus
+        
+        Das Gültigkeitsdatum wird per CASE nach Mitarbeitertyp berechnet,
+        manuell gesetzte Gültigkeiten bleiben erhalten. save() und Signale
+        laufen dabei nicht - Profilbilder werden nicht angefasst.
+        
+        Returns:
+            int: Anzahl aktualisierter Mitglieder
+        """
+        valid_until = models.Case(
+            models.When(manual_validity=True, then=models.F('valid_until')),
+            models.When(
+                member_type__in=Member.SHORT_VALIDITY_TYPES,
+                then=models.Value(Member.compute_valid_until('EXTERN', issue_date)),
+            ),
+            default=models.Value(Member.compute_valid_until('FF', issue_date)),
+            output_field=models.DateField(),
+        )
+        
+        updated = self.update(
+            issued_date=issue_date,
+            valid_until=valid_until,
+            updated_at=timezone.now(),  # auto_now greift bei update() nicht
+        )
+        if updated:
+            bump_data_version()
+        return updated
+
 
 class Member(models.Model):
     # Mitarbeitertypen
@@ -23,6 +109,9 @@ class Member(models.Model):
         ('PRAKTIKANT', 'Praktikant'),
     ]
     
+    # Mitarbeitertypen mit 1 Jahr Ausweis-Gültigkeit (sonst 5 Jahre)
+    SHORT_VALIDITY_TYPES = ['EXTERN', 'PRAKTIKANT']
+    
     # Ausweisnummer-Präfixe
     PREFIX_CHOICES = [
         ('', 'Kein Präfix'),
@@ -83,20 +172,76 @@ class Member(models.Model):
     # Profilbild
     profile_picture = models.ImageField(
         upload_to=member_image_path,
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
         verbose_name="Profilbild"
     )
     
+    # Normalisierte Namen (members.utils.names), gepflegt in save()
+    name_key = models.CharField(max_length=255, blank=True, editable=False)
+    sort_key = models.CharField(max_length=255, blank=True, editable=False)
+    
+    # SHA-256 des fertig verarbeiteten Profilbilds
+    photo_hash = models.CharField(max_length=64, blank=True, editable=False)
+    
     # Meta-Daten
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, verbose_name="Aktiv")
     
+    objects = MemberQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Mitglied"
         verbose_name_plural = "Mitglieder"
-        ordering = ['last_name', 'first_name']
+        ordering = ['sort_key', 'id']
+        # Abgestimmt auf die Abfragen in MemberQuerySet und den Listen-Views.
+        # Boolesche Filter rendert Django als nacktes "is_active" - das nutzt
+        # SQLite nur über Teilindizes mit derselben Bedingung, nicht als Indexspalte.
+        indexes = [
+            # Standard-Sortierung aller Listen (DIN 5007-2)
+            models.Index(fields=['sort_key', 'id'], name='members_sort_idx'),
+            # Duplikat-Erkennung (Import, Formular)
+            models.Index(fields=['name_key', 'birth_date'], name='members_identity_idx'),
+            # Aktive/inaktive Mitglieder, sortiert nach Name
+            models.Index(
+                fields=['sort_key', 'id'],
+                name='members_active_sort_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['sort_key', 'id'],
+                name='members_inactive_sort_idx',
+                condition=models.Q(is_active=False),
+            ),
+            # Filter nach Mitarbeitertyp, sortiert nach Name
+            models.Index(fields=['member_type', 'sort_key', 'id'], name='members_type_sort_idx'),
+            # Gültig / läuft bald ab / abgelaufen (Listen und Dashboard)
+            models.Index(
+                fields=['valid_until'],
+                name='members_active_valid_idx',
+                condition=models.Q(is_active=True),
+            ),
+            # Sortierung nach Gültigkeit und Statusfilter der Gesamtliste
+            models.Index(fields=['valid_until'], name='members_valid_until_idx'),
+            # Sortierung nach Erstellungsdatum (Liste, neueste Mitglieder im Dashboard)
+            models.Index(fields=['created_at'], name='members_created_idx'),
+            # Ausweis-Erstellung: nur aktive Mitglieder mit Profilbild
+            models.Index(
+                fields=['sort_key', 'id'],
+                name='members_card_eligible_idx',
+                condition=models.Q(is_active=True, profile_picture__gt=''),
+            ),
+            models.Index(
+                fields=['issued_date', 'valid_until'],
+                name='members_card_issued_idx',
+                condition=models.Q(is_active=True, profile_picture__gt=''),
+            ),
+        ]
+    
+    # Name des Profilbilds beim Laden aus der Datenbank
+    _loaded_picture_name = None
     
     def __str__(self):
         return f"{self.last_name}, {self.first_name} ({self.card_number})"
@@ -108,185 +253,159 @@ class Member(models.Model):
         # Diese Konvertierung ist nicht nötig, da Django und unser Import bereits 
         # echte date-Objekte liefern sollten
         
+        self.set_name_keys()
+        
         # Ausweisnummer generieren falls noch nicht vorhanden
         if not self.card_number:
             self.card_number = self.generate_card_number()
         
         # Gültigkeit automatisch setzen nur wenn issued_date vorhanden ist
         if self.issued_date and not self.manual_validity and not self.valid_until:
-            if self.member_type in ['EXTERN', 'PRAKTIKANT']:
-                # Für Externe und Praktikanten: 1 Jahr
-                self.valid_until = self.issued_date + timedelta(days=365)
-            else:
-                # Für reguläre Mitarbeiter: 5 Jahre
-                self.valid_until = self.issued_date + timedelta(days=5*365)
+            self.valid_until = self.compute_valid_until(self.member_type, self.issued_date)
         
-        super().save(*args, **kwargs)
+        # Vor dem Speichern prüfen - danach ist die Datei bereits committed
+        photo_changed = self._photo_changed()
+        portrait = self._processed_portrait() if photo_changed else None
+        if photo_changed or not self.profile_picture:
+            self.photo_hash = portrait.photo_hash if portrait else ''
+        previous_picture = getattr(self, '_loaded_picture_name', None)
         
-        # Bildgröße anpassen nach dem Speichern
-        if self.profile_picture:
-            self.resize_image()
-    
-    def generate_card_number(self):
-        """Generiert eine eindeutige Ausweisnummer"""
-        # 6-stellige Zufallszahl
-        random_number = str(random.randint(100000, 999999))
+        super().save(*args, **kwargs)
+        self._loaded_picture_name = self.profile_picture.name
         
-        # Mit oder ohne Präfix
-        if self.card_number_prefix:
-            card_number = f"{self.card_number_prefix}{random_number}"
-        else:
-            card_number = random_number
+        # Ersetztes Bild löschen, sofern kein anderes Mitglied darauf verweist
+        if previous_picture and previous_picture != self.profile_picture.name:
+            transaction.on_commit(lambda: Member.release_photo(previous_picture))
         
-        # Prüfen ob Nummer bereits existiert
-        while Member.objects.filter(card_number=card_number).exists():
-            random_number = str(random.randint(100000, 999999))
-            if self.card_number_prefix:
-                card_number = f"{self.card_number_prefix}{random_number}"
+        # Bildverarbeitung nur bei neuem Bild, optional im Hintergrund
+        if portrait:
+            # Bereits im Formular bzw. Webcam-Pfad verarbeitet (ingest_portrait)
+            store_variants(self.photo_hash, portrait.variants)
+        elif photo_changed:
+            if settings.PHOTO_PROCESSING_ASYNC:
+                from .utils.jobs import enqueue_job
+                transaction.on_commit(lambda: enqueue_job('photo_process', member_id=self.pk))
             else:
-                card_number = random_number
-        
-        return card_number
+                self.resize_image()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bildname beim Laden merken, um neue Bilder zu erkennen
+        if 'profile_picture' in field_names:
+            instance._loaded_picture_name = values[field_names.index('profile_picture')] or None
+        return instance
+    
+    def set_name_keys(self):
+        """Normalisierte Namensschlüssel setzen (auch vor bulk_create aufrufen)"""
+        self.name_key = name_key(self.first_name, self.last_name)
+        self.sort_key = sort_key(self.first_name, self.last_name)
+    
+    @staticmethod
+    def compute_valid_until(member_type, issued_date):
+        """Standard-Gültigkeit eines Ausweises ab Ausstellungsdatum"""
+        if member_type in Member.SHORT_VALIDITY_TYPES:
+            # Für Externe und Praktikanten: 1 Jahr
+            return issued_date + timedelta(days=365)
+        # Für reguläre Mitarbeiter: 5 Jahre
+        return issued_date + timedelta(days=5*365)
+    
+    def generate_card_number(self):
+        """Vergibt eine eindeutige Ausweisnummer über den zentralen Allocator"""
+        return card_number_allocator.allocate_one(self.card_number_prefix)
     
-    # Verbesserte resize_image Methode für members/models.py
-
     def resize_image(self):
-    """
-    Passt Profilbild für Dienstausweis-Druck an:
-    - Exakte Größe: 267x400 Pixel (Passbild-Format im Hochformat)
-    - 300 DPI für Druckqualität
-    - Optimierte Kompression für Druck
-    - EXIF-Orientierung KORREKT handhaben
-    """
-    try:
-        from PIL import Image, ExifTags
-        import os
+        """
+        Passt Profilbild für Dienstausweis-Druck an (267x400 Pixel, 300 DPI)
         
-        if not self.profile_picture or not os.path.exists(self.profile_picture.path):
-            return
-            
-        # Bild öffnen
-        with Image.open(self.profile_picture.path) as img:
-            
-            # ✅ KORRIGIERTE EXIF-Orientierung - NUR bei falscher Orientierung rotieren
-            try:
-                # EXIF-Daten lesen
-                exif_dict = img._getexif()
-                if exif_dict is not None:
-                    for tag, value in exif_dict.items():
-                        if tag in ExifTags.TAGS and ExifTags.TAGS[tag] == 'Orientation':
-                            print(f"🔍 EXIF-Orientierung gefunden: {value}")
-                            
-                            # NUR rotieren wenn das Bild wirklich falsch orientiert ist
-                            if value == 3:  # 180° gedreht
-                                img = img.rotate(180, expand=True)
-                                print("🔄 Bild um 180° gedreht")
-                            elif value == 6:  # 90° im Uhrzeigersinn gedreht (von Kamera falsch gespeichert)
-                                img = img.rotate(270, expand=True)  # Gegen den Uhrzeigersinn zurückdrehen
-                                print("🔄 Bild um 270° gedreht (EXIF-Korrektur)")
-                            elif value == 8:  # 90° gegen Uhrzeigersinn gedreht (von Kamera falsch gespeichert)
-                                img = img.rotate(90, expand=True)   # Im Uhrzeigersinn zurückdrehen
-                                print("🔄 Bild um 90° gedreht (EXIF-Korrektur)")
-                            elif value == 1:  # Normale Orientierung
-                                print("✅ Bild hat bereits korrekte Orientierung")
-                            else:
-                                print(f"ℹ️ Unbekannte EXIF-Orientierung: {value} - keine Rotation")
-                            break
-                else:
-                    print("ℹ️ Keine EXIF-Orientierungsdaten gefunden")
-                    
-            except (AttributeError, KeyError, TypeError, OSError) as e:
-                print(f"ℹ️ EXIF-Verarbeitung übersprungen: {e}")
-                pass
-            
-            # Zielgröße für Dienstausweis (HOCHFORMAT Passbild)
-            target_width = 267   # Breite
-            target_height = 400  # Höhe (länger = Hochformat)
-            target_size = (target_width, target_height)
-            
-            print(f"📐 Originalgröße: {img.size[0]}x{img.size[1]}px")
-            print(f"🎯 Zielgröße: {target_width}x{target_height}px (Hochformat)")
-            
-            # Original-Abmessungen nach EXIF-Korrektur
-            original_width, original_height = img.size
-            
-            # ✅ PRÜFUNG: Ist das Bild im Querformat? Dann automatisch um 90° drehen
-            if original_width > original_height:
-                print("🔄 Querformat erkannt - drehe zu Hochformat")
-                img = img.rotate(90, expand=True)
-                original_width, original_height = img.size
-                print(f"📐 Nach Hochformat-Korrektur: {original_width}x{original_height}px")
-            
-            # Seitenverhältnis berechnen
-            original_ratio = original_width / original_height
-            target_ratio = target_width / target_height
-            
-            print(f"📊 Original-Verhältnis: {original_ratio:.3f}")
-            print(f"📊 Ziel-Verhältnis: {target_ratio:.3f}")
-            
-            # Bild zuschneiden um das richtige Seitenverhältnis zu erhalten
-            if original_ratio > target_ratio:
-                # Bild ist zu breit - an den Seiten beschneiden
-                new_width = int(original_height * target_ratio)
-                left = (original_width - new_width) // 2
-                right = left + new_width
-                img = img.crop((left, 0, right, original_height))
-                print(f"✂️ Seitlich beschnitten: {new_width}x{original_height}px")
-            elif original_ratio < target_ratio:
-                # Bild ist zu hoch - oben/unten beschneiden  
-                new_height = int(original_width / target_ratio)
-                top = (original_height - new_height) // 2
-                bottom = top + new_height
-                img = img.crop((0, top, original_width, bottom))
-                print(f"✂️ Vertikal beschnitten: {original_width}x{new_height}px")
-            else:
-                print("✅ Seitenverhältnis bereits korrekt")
-            
-            # Auf finale Größe skalieren mit hochwertiger Interpolation
-            img = img.resize(target_size, Image.Resampling.LANCZOS)
-            print(f"🔧 Skaliert auf: {img.size[0]}x{img.size[1]}px")
-            
-            # In RGB konvertieren falls nötig (für JPEG)
-            if img.mode in ('RGBA', 'P', 'LA'):
-                # Weißer Hintergrund für Transparenz
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-                print("🎨 RGB-Konvertierung mit weißem Hintergrund")
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-                print("🎨 RGB-Konvertierung")
+        Der Hash des fertigen Bildes wird gespeichert - ein erneuter Aufruf
+        für ein bereits verarbeitetes Bild ändert nichts.
+        """
+        try:
+            if not self.profile_picture or not os.path.exists(self.profile_picture.path):
+                return False
             
-            # DPI für Druckqualität setzen (300 DPI)
-            dpi = (300, 300)
+            with open(self.profile_picture.path, 'rb') as f:
+                current = f.read()
+            if self.photo_hash and content_hash(current) == self.photo_hash:
+                return False
             
-            # Optimierte JPEG-Einstellungen für Druck
-            save_kwargs = {
-                'format': 'JPEG',
-                'quality': 95,  # Höhere Qualität für Druck
-                'optimize': True,
-                'dpi': dpi,
-                'progressive': True,  # Progressive JPEG für bessere Kompression
-                'subsampling': 0,  # Keine Farbunterabtastung für beste Qualität
-            }
+            portrait = ingest_portrait(io.BytesIO(current))
             
-            # Bild speichern
-            img.save(self.profile_picture.path, **save_kwargs)
+            # Das fertige Bild ist eine neue Datei (Inhalts-Hash als Name),
+            # das Original kann von anderen Mitgliedern mitbenutzt werden
+            original_name = self.profile_picture.name
+            self.profile_picture.save(portrait.name, portrait, save=False)
+            self.photo_hash = portrait.photo_hash
+            self._loaded_picture_name = self.profile_picture.name
             
-            # Erfolgsmeldung
-            print(f"✅ Passbild erstellt für {self.full_name}:")
-            print(f"   📐 Größe: {target_width}x{target_height}px (Hochformat)")
-            print(f"   🖨️ DPI: {dpi[0]}")
-            print(f"   📁 Format: JPEG (95% Qualität)")
-            print(f"   🎯 Bereit für Dienstausweis-Druck")
+            # update() statt save(): kein erneuter Durchlauf von save()/Signalen
+            Member.objects.filter(pk=self.pk).update(
+                profile_picture=self.profile_picture.name,
+                photo_hash=self.photo_hash,
+            )
+            store_variants(self.photo_hash, portrait.variants)
+            if original_name != self.profile_picture.name:
+                transaction.on_commit(lambda: Member.release_photo(original_name))
+            logger.debug(f"Passbild erstellt für {self.full_name}")
+            return True
             
-    except Exception as e:
-        print(f"❌ Fehler bei Bildverarbeitung für {self}: {str(e)}")
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Bildverarbeitung fehlgeschlagen für Mitglied {self.pk}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Bildverarbeitung fehlgeschlagen für Mitglied {self.pk}: {str(e)}")
+            return False
+    
+    @staticmethod
+    def release_photo(name):
+        """
+        Löscht eine Bilddatei samt Anzeige-Varianten, wenn kein Mitglied mehr
+        darauf verweist.
+        
+        Identische Bilder werden nur einmal gespeichert - deshalb nie
+        direkt über profile_picture.delete() löschen. Prüfung und Löschen
+        laufen unter der Sperre der Ablage; eine gerade gespeicherte oder
+        wiederverwendete Datei bleibt stehen, weil der Datensatz dazu noch
+        nicht committed sein kann (später: cleanup_photos).
+        """
+        if not name:
+            return False
+        storage = Member._meta.get_field('profile_picture').storage
+        # Inhaltsadressiert: Dateiname = photo_hash, Varianten hängen daran
+        photo_hash = os.path.splitext(os.path.basename(name))[0] if is_content_addressed(name) else ''
+        
+        with storage.lock():
+            if Member.objects.filter(profile_picture=name).exists():
+                return False
+            if storage.exists(name):
+                if storage.recently_saved(name):
+                    logger.debug(f"Bild gerade erst gespeichert, bleibt vorerst stehen: {name}")
+                    return False
+                storage.delete(name)
+                logger.debug(f"Nicht mehr verwendetes Bild gelöscht: {name}")
+            if photo_hash:
+                delete_variants(photo_hash)
+        return True
+    
+    def photo_variant_name(self, variant, ext):
+        """Dateiname einer Anzeige-Variante (None ohne verarbeitetes Bild)"""
+        if not self.profile_picture or not self.photo_hash:
+            return None
+        return variant_path(self.photo_hash, variant, ext)
+    
+    def _processed_portrait(self):
+        """Neu zugewiesenes, bereits verarbeitetes Passbild (ProcessedPortrait) oder None"""
+        picture = self.profile_picture
+        if picture and not picture._committed and isinstance(picture.file, ProcessedPortrait):
+            return picture.file
+        return None
+    
+    def _photo_changed(self):
+        """Wurde seit dem Laden ein neues Profilbild zugewiesen?"""
+        if not self.profile_picture:
+            return False
+        return (
+            not self.profile_picture._committed
+            or self.profile_picture.name != self._loaded_picture_name
+        )
 
     def get_image_info(self):
         """
@@ -320,53 +439,6 @@ class Member(models.Model):
         except Exception as e:
             return {'error': str(e)}
 
-    # Zusätzliche Validierung im MemberForm
-    def clean_profile_picture(self):
-        """Erweiterte Validierung für Profilbilder"""
-        picture = self.cleaned_data.get('profile_picture')
-        
-        if picture:
-            # Dateigröße prüfen (max 10MB)
-            if picture.size > 10 * 1024 * 1024:
-                raise ValidationError("Bilddatei ist zu groß. Maximum: 10MB")
-            
-            # Bildformat prüfen
-            try:
-                from PIL import Image
-                import io
-                
-                # Bild öffnen um Format zu validieren
-                image = Image.open(io.BytesIO(picture.read()))
-                
-                # Unterstützte Formate
-                supported_formats = ['JPEG', 'JPG', 'PNG', 'TIFF', 'BMP']
-                if image.format not in supported_formats:
-                    raise ValidationError(f"Unsupported format. Erlaubt: {', '.join(supported_formats)}")
-                
-                # Mindestauflösung prüfen (sollte mindestens Zielgröße haben)
-                min_width, min_height = 200, 300  # Etwas niedriger für Flexibilität
-                if image.width < min_width or image.height < min_height:
-                    raise ValidationError(
-                        f"Bild zu klein. Minimum: {min_width}x{min_height}px "
-                        f"(Aktuell: {image.width}x{image.height}px)"
-                    )
-                
-                # Maximalgröße prüfen (sehr große Bilder vermeiden)
-                max_width, max_height = 4000, 6000
-                if image.width > max_width or image.height > max_height:
-                    raise ValidationError(
-                        f"Bild zu groß. Maximum: {max_width}x{max_height}px "
-                        f"(Aktuell: {image.width}x{image.height}px)"
-                    )
-                
-                # Cursor zurücksetzen für weitere Verarbeitung
-                picture.seek(0)
-                
-            except Exception as e:
-                raise ValidationError(f"Ungültige Bilddatei: {str(e)}")
-        
-        return picture
-    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -416,3 +488,107 @@ class Member(models.Model):
             'PRAKTIKANT': '🎓',
         }
         return f"{icons.get(self.member_type, '👤')} {self.get_member_type_display()}"
+
+
+class CardNumberSequence(models.Model):
+    """Zählerstand der Ausweisnummern-Vergabe pro Präfix (siehe CardNumberAllocator)"""
+    prefix = models.CharField(max_length=10, unique=True, blank=True, verbose_name="Präfix")
+    next_value = models.PositiveIntegerField(default=0, verbose_name="Nächster Zählerwert")
+    
+    class Meta:
+        verbose_name = "Ausweisnummern-Sequenz"
+        verbose_name_plural = "Ausweisnummern-Sequenzen"
+    
+    def __str__(self):
+        return f"{self.prefix or '(ohne Präfix)'}: {self.next_value}"
+
+
+class BackgroundJob(models.Model):
+    """Hintergrund-Auftrag, abgearbeitet vom Worker (manage.py run_jobs)"""
+    KIND_CHOICES = [
+        ('cardpresso_export', 'Cardpresso-Export'),
+        ('photo_process', 'Passbild-Verarbeitung'),
+        ('photo_import', 'Foto-Import'),
+    ]
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Wartend'),
+        (STATUS_RUNNING, 'Läuft'),
+        (STATUS_DONE, 'Fertig'),
+        (STATUS_FAILED, 'Fehlgeschlagen'),
+    ]
+    
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES, verbose_name="Art")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Status")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parameter")
+    
+    # Fortschritt
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Zeilen gesamt")
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name="Zeilen verarbeitet")
+    images_processed = models.PositiveIntegerField(default=0, verbose_name="Bilder verarbeitet")
+    
+    # Ergebnis
+    result_path = models.CharField(max_length=500, blank=True, verbose_name="Ergebnis-Pfad")
+    result = models.JSONField(default=dict, blank=True, verbose_name="Ergebnis")
+    error = models.TextField(blank=True, verbose_name="Fehler")
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name="Erstellt von"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    # Worker, der den Auftrag ausführt ("host:pid"), und sein letztes Lebenszeichen
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Hintergrund-Auftrag"
+        verbose_name_plural = "Hintergrund-Aufträge"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='members_job_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def progress_percent(self):
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.rows_processed * 100 / self.total_rows))
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+    
+    def to_status_dict(self):
+        """Status für AJAX-Abfragen"""
+        return {
+            'job_id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'progress': self.progress_percent,
+            'total_rows': self.total_rows,
+            'rows_processed': self.rows_processed,
+            'images_processed': self.images_processed,
+            'path': self.result_path or None,
+            'result': self.result,
+            'error': self.error or None,
+            'created': self.created_at.isoformat() if self.created_at else None,
+            'started': self.started_at.isoformat() if self.started_at else None,
+            'finished': self.finished_at.isoformat() if self.finished_at else None,
+        }
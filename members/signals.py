@@ -0,0 +1,38 @@
+# members/signals.py - Signal-Handler für Member-Änderungen
+
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.dispatch import receiver
+from .models import Member
+from .utils.cache import bump_data_version
+from .utils.search import ensure_search_index
+from .utils.sqlite import apply_sqlite_profile
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_member_caches(sender, instance, **kwargs):
+    """Jede Änderung an einem Mitglied macht abgeleitete Cache-Einträge ungültig"""
+    bump_data_version()
+
+
+@receiver(post_delete, sender=Member)
+def release_member_photo(sender, instance, **kwargs):
+    """Profilbild eines gelöschten Mitglieds entfernen, falls nicht mehrfach genutzt"""
+    if instance.profile_picture:
+        name = instance.profile_picture.name
+        transaction.on_commit(lambda: Member.release_photo(name))
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Betriebsprofil (WAL, busy_timeout, ...) auf jede neue SQLite-Verbindung anwenden"""
+    apply_sqlite_profile(connection)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using='default', **kwargs):
+    """Suchindex neu anlegen, wenn eine Migration seine Trigger verworfen hat"""
+    if sender.name == 'members':
+        ensure_search_index(using)
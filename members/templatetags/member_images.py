@@ -0,0 +1,33 @@
+# members/templatetags/member_images.py - Passbilder als WebP/JPEG-Variante ausliefern
+
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def member_photo(member, variant='thumb', **attrs):
+    """
+    <picture> mit WebP-Variante und JPEG-Fallback für das Passbild.
+
+    Die Varianten werden beim Speichern eines verarbeiteten Bildes synchron
+    geschrieben - photo_hash genügt als Nachweis, ohne Dateisystem-Probe je
+    Zeile. Für Bestandsbilder erzeugt sie die Migration 0016.
+    Ohne photo_hash (Bild noch nicht verarbeitet) wird das Original ausgeliefert.
+
+    Beispiel: {% member_photo member 'thumb' class='rounded border' alt=member.full_name %}
+    """
+    img_attrs = format_html_join('', ' {}="{}"', attrs.items())
+
+    jpeg_name = member.photo_variant_name(variant, 'jpg')
+    if not jpeg_name:
+        return format_html('<img src="{}"{}>', member.profile_picture.url, img_attrs)
+
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp"><img src="{}"{}></picture>',
+        default_storage.url(member.photo_variant_name(variant, 'webp')),
+        default_storage.url(jpeg_name),
+        img_attrs,
+    )
@@ -1,3 +1,1298 @@
-from django.test import TestCase
+import io
+import os
+import hashlib
+import sys
+import json
+import sqlite3
+import zipfile
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from importlib import import_module
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.apps import apps
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import BackgroundJob, CardNumberSequence, Member
+from .utils.benchmark import seed_members
+from .utils.cache import get_data_version
+from .utils.cardpresso import CardpressoManager
+from .utils.cardpresso_export import (
+    INDEXED_PROFILE, LEGACY_PROFILE, CardpressoExporter, PhotoIndex, write_export_manifest,
+)
+from .utils.cardpresso_writer import CardpressoWriter
+from .utils.card_numbers import CardNumberAllocator
+from .utils.importer import MemberImporter, detect_encoding
+from .utils.names import name_key, sort_key
+from .utils.metrics import RETIRED_FILE, MetricsRegistry, render_prometheus, retire_dead_workers
+from .utils.pagination import KeysetPaginator
+from .utils.jobs import JOB_HANDLERS, STALE_AFTER, claim_next_job, current_worker, recover_stale_jobs, run_job
+from .utils.images import IMAGE_VARIANTS, ingest_portrait, variant_path
+from .utils.photo_import import PhotoArchiveTooLarge, extract_photo_zip
+from .utils.search import FTS_TRIGGERS, ensure_search_index, fts_available, search_members
+from .utils.stats import get_dashboard_stats
+
+
+class QueryPlanTests(TestCase):
+    """
+    Jede Abfrage der Listen-Views muss einen Index nutzen (EXPLAIN QUERY PLAN).
+
+    Schlägt fehl, sobald SQLite für members_member auf einen vollständigen
+    Tabellen-Scan ("SCAN members_member" ohne "USING ... INDEX") zurückfällt.
+    """
+
+    URLS = [
+        ('members:member_list', ''),
+        ('members:member_list', '?status=active'),
+        ('members:member_list', '?status=inactive'),
+        ('members:member_list', '?status=expired'),
+        ('members:member_list', '?status=expiring'),
+        ('members:member_list', '?member_type=FF'),
+        ('members:member_list', '?sort=valid_until'),
+        ('members:member_list', '?sort=card_number'),
+        ('members:member_list', '?sort=created'),
+        ('members:member_list_valid', ''),
+        ('members:member_list_expiring', ''),
+        ('members:member_list_expired', ''),
+        ('members:member_list_active', ''),
+        ('members:member_list_inactive', ''),
+        ('members:card_creation_list', ''),
+        ('members:card_creation_list', '?status=new'),
+        ('members:card_creation_list', '?status=renewal'),
+        ('members:card_creation_list', '?status=expired'),
+        ('members:card_creation_list', '?status=expiring'),
+        ('members:card_creation_list', '?member_type=BF'),
+        ('members:dashboard', ''),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_members(200)
+        cls.user = User.objects.create_user('tester', password='test')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN ist SQLite-spezifisch')
+        # Keine gecachten Zähler aus anderen Tests (TestCase committet nie)
+        cache.clear()
+        self.client.force_login(self.user)
+        # Die Dashboard-Zähler sind eine bewusste Aggregation über alle
+        # Mitglieder in einem Durchlauf (gecached) - hier nicht geprüft
+        get_dashboard_stats(date.today())
+
+    def query_plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[3] for row in cursor.fetchall()]
+
+    def test_views_do_not_scan_member_table(self):
+        for name, query in self.URLS:
+            url = reverse(name) + query
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+                for captured in context.captured_queries:
+                    sql = captured['sql']
+                    if not sql.startswith('SELECT') or 'members_member' not in sql:
+                        continue
+                    # captured_queries enthält das SQL mit eingesetzten Werten
+                    plan = self.query_plan(sql, [])
+                    full_scans = [
+                        step for step in plan
+                        if step.startswith('SCAN members_member') and 'INDEX' not in step
+                    ]
+                    self.assertFalse(full_scans, f'{url}: {sql}\n{plan}')
+
+
+# Kleiner Seiten-Cache: die Schreib-Transaktion muss Seiten auslagern, wie
+# bei einem großen Import - im Rollback-Journal braucht sie dafür den
+# exklusiven Lock
+@override_settings(SQLITE_CACHE_SIZE=50, SQLITE_BUSY_TIMEOUT=500)
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """
+    Mit dem SQLite-Betriebsprofil (WAL) lesen andere Verbindungen weiter,
+    während eine große Schreib-Transaktion offen ist.
+    """
+
+    ALIAS = 'concurrency'
+    ROWS = 50000
+    INITIAL_ROWS = 100
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite-spezifisch')
+        tmpdir = tempfile.mkdtemp(prefix='members_concurrency_')
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        # Eigene Datei-Datenbank (die Test-Datenbank liegt im Speicher);
+        # connections[ALIAS] liefert je Thread eine eigene Verbindung
+        connections.settings[self.ALIAS] = {
+            **connection.settings_dict,
+            'NAME': os.path.join(tmpdir, 'concurrency.sqlite3'),
+        }
+        self.addCleanup(connections.settings.pop, self.ALIAS)
+        self.addCleanup(connections.__delitem__, self.ALIAS)
+        self.addCleanup(lambda: connections[self.ALIAS].close())
+
+    def create_table(self):
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE bulk (id INTEGER PRIMARY KEY, payload TEXT)')
+            cursor.executemany('INSERT INTO bulk (payload) VALUES (%s)', [('vorher',)] * self.INITIAL_ROWS)
+
+    def count_rows(self):
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM bulk')
+            return cursor.fetchone()[0]
+
+    def read_during_bulk_write(self, reads=5):
+        """
+        Liest, während ein zweiter Thread ROWS Zeilen in einer offenen
+        transaction.atomic() geschrieben hat.
+
+        Returns:
+            list: (Anzahl oder Exception, Dauer in Sekunden) je Lesevorgang
+        """
+        self.create_table()
+        written = threading.Event()
+        reads_done = threading.Event()
+        errors = []
+
+        def bulk_write():
+            try:
+                with transaction.atomic(using=self.ALIAS):
+                    with connections[self.ALIAS].cursor() as cursor:
+                        cursor.executemany('INSERT INTO bulk (payload) VALUES (%s)', [('neu',)] * self.ROWS)
+                    written.set()
+                    # Transaktion offen halten, bis der Leser fertig ist
+                    reads_done.wait(timeout=30)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                written.set()
+                connections[self.ALIAS].close()
+
+        writer = threading.Thread(target=bulk_write)
+        writer.start()
+        results = []
+        try:
+            self.assertTrue(written.wait(timeout=30))
+            for _ in range(reads):
+                started = time.perf_counter()
+                try:
+                    outcome = self.count_rows()
+                except OperationalError as e:
+                    outcome = e
+                results.append((outcome, time.perf_counter() - started))
+        finally:
+            reads_done.set()
+            writer.join(timeout=30)
+        self.assertEqual(errors, [])
+        return results
+
+    def test_profile_is_applied(self):
+        with connections[self.ALIAS].cursor() as cursor:
+            values = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {pragma}')
+                values[pragma] = cursor.fetchone()[0]
+        self.assertEqual(values, {
+            'journal_mode': 'wal',
+            'synchronous': 1,  # NORMAL
+            'busy_timeout': 500,
+            'cache_size': 50,
+            'temp_store': 2,  # MEMORY
+        })
+
+    def test_atomic_begins_immediate(self):
+        with CaptureQueriesContext(connections[self.ALIAS]) as context:
+            with transaction.atomic(using=self.ALIAS):
+                pass
+        self.assertEqual(context.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_readers_not_blocked_during_bulk_write(self):
+        results = self.read_during_bulk_write()
+
+        # Leser sehen sofort den bestätigten Stand - kein Warten auf busy_timeout
+        self.assertEqual([count for count, _duration in results], [self.INITIAL_ROWS] * len(results))
+        self.assertLess(max(duration for _count, duration in results), 0.25)
+        # Nach dem COMMIT ist alles sichtbar
+        self.assertEqual(self.count_rows(), self.INITIAL_ROWS + self.ROWS)
+
+    @override_settings(SQLITE_JOURNAL_MODE='DELETE')
+    def test_rollback_journal_blocks_readers(self):
+        """Gegenprobe: ohne WAL wartet der Leser busy_timeout ab und scheitert"""
+        results = self.read_during_bulk_write(reads=1)
+
+        outcome, duration = results[0]
+        self.assertIsInstance(outcome, OperationalError)
+        self.assertGreaterEqual(duration, 0.4)
+
+
+class MemberImporterTests(TestCase):
+    """CSV-Import: Kodierungserkennung, Duplikate und gebündeltes Speichern"""
+
+    HEADER = 'Vorname,Nachname,Geburtsdatum,Mitarbeitertyp_Code,Ausweisnummer_Praefix\n'
+
+    def run_import(self, text, encoding='utf-8', **kwargs):
+        return MemberImporter(**kwargs).run(io.BytesIO((self.HEADER + text).encode(encoding)))
+
+    def test_utf8_with_bom(self):
+        data = b'\xef\xbb\xbf' + (self.HEADER + 'Jürgen,Müller,02.06.1977,FF,\n').encode('utf-8')
+        self.assertEqual(detect_encoding(io.BytesIO(data)), 'utf-8')
+
+        importer = MemberImporter().run(io.BytesIO(data))
+        self.assertEqual(importer.errors, [])
+        member = Member.objects.get()
+        self.assertEqual((member.first_name, member.last_name), ('Jürgen', 'Müller'))
+
+    def test_latin1_after_multibyte_lines(self):
+        """Die ganze Datei wird als ISO-8859-1 gelesen, nicht ab der ersten ungültigen Zeile"""
+        # 'Ã¼' ist in ISO-8859-1 zugleich gültiges UTF-8 für 'ü'
+        text = 'JÃ¼rgen,Meier,02.06.1977,FF,\nAnna,Größer,03.07.1980,FF,\n'
+        data = (self.HEADER + text).encode('iso-8859-1')
+        self.assertEqual(detect_encoding(io.BytesIO(data)), 'iso-8859-1')
+
+        importer = MemberImporter().run(io.BytesIO(data))
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(
+            sorted(Member.objects.values_list('first_name', 'last_name')),
+            [('Anna', 'Größer'), ('JÃ¼rgen', 'Meier')],
+        )
+
+    def test_duplicates_against_database_and_file(self):
+        self.run_import('Jürgen,Müller,02.06.1977,FF,\n')
+        importer = self.run_import(
+            'Juergen,Mueller,02.06.1977,FF,\n'   # Transliteration = bestehendes Mitglied
+            'Erika,Schmidt,01.01.1980,FF,\n'
+            'erika,SCHMIDT,01.01.1980,FF,\n'     # Duplikat innerhalb der Datei
+            'Erika,Schmidt,02.01.1980,FF,\n'     # anderes Geburtsdatum
+        )
+        self.assertEqual(importer.successful_imports, 2)
+        self.assertEqual(importer.failed_imports, 2)
+        self.assertTrue(all('Duplikat' in error for error in importer.errors))
+        self.assertEqual(Member.objects.count(), 3)
+
+    def test_bulk_insert_in_batches(self):
+        rows = ''.join(f'Vorname{i},Nachname{i},01.01.1980,FF,{"T" if i % 2 else ""}\n' for i in range(25))
+        with CaptureQueriesContext(connection) as context:
+            importer = self.run_import(rows, batch_size=10)
+        self.assertEqual(importer.successful_imports, 25)
+        inserts = [q for q in context.captured_queries if q['sql'].startswith('INSERT INTO "members_member"')]
+        self.assertEqual(len(inserts), 3)
+
+        members = list(Member.objects.all())
+        self.assertEqual(len(members), 25)
+        self.assertTrue(all(member.name_key and member.card_number for member in members))
+        self.assertEqual(len({(m.card_number_prefix, m.card_number) for m in members}), 25)
+
+
+class CardNumberAllocatorTests(TestCase):
+    """Ausweisnummern: eindeutig, ohne Kollision mit Altbeständen, getrennt pro Präfix"""
+
+    def setUp(self):
+        # Eigene Instanz - der Prozess-Pool des Singletons überlebt den Rollback nicht
+        self.allocator = CardNumberAllocator()
+
+    def create_member(self, card_number, prefix=''):
+        return Member.objects.create(
+            first_name='Alt', last_name=card_number, birth_date=date(1980, 1, 1),
+            card_number_prefix=prefix, card_number=card_number,
+        )
+
+    def test_numbers_are_unique(self):
+        numbers = self.allocator.allocate('', 5000)
+        numbers += [self.allocator.allocate_one('') for _ in range(50)]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        self.assertTrue(all(len(number) == 6 and number.isdigit() for number in numbers))
+        self.assertEqual(CardNumberSequence.objects.get(prefix='').next_value, 5050)
+
+    def test_skips_legacy_numbers(self):
+        # Altbestand belegt genau die Nummern, die der Zähler als nächstes liefert
+        legacy = [self.allocator._format('', counter) for counter in (0, 2, 3)]
+        for number in legacy:
+            self.create_member(number)
+
+        numbers = self.allocator.allocate('', 4)
+        self.assertEqual(len(numbers), 4)
+        self.assertFalse(set(numbers) & set(legacy))
+        self.assertEqual(numbers[0], self.allocator._format('', 1))
+
+    def test_prefixes_have_separate_sequences(self):
+        plain = self.allocator.allocate('', 3)
+        ff = self.allocator.allocate('FF', 3)
+
+        self.assertTrue(all(number.startswith('FF') and len(number) == 8 for number in ff))
+        # Gleicher Zählerstand, gleiche Ziffern - der Präfix macht sie eindeutig
+        self.assertEqual([number[2:] for number in ff], plain)
+        self.assertEqual(
+            dict(CardNumberSequence.objects.values_list('prefix', 'next_value')),
+            {'': 3, 'FF': 3},
+        )
+        # Altbestand mit anderem Präfix blockiert nichts
+        self.create_member(self.allocator._format('JF', 0), prefix='JF')
+        self.assertEqual(self.allocator.allocate('', 1), [self.allocator._format('', 3)])
+
+    def test_member_save_uses_allocator_prefix(self):
+        member = Member.objects.create(
+            first_name='Neu', last_name='Mitglied', birth_date=date(1990, 5, 5), card_number_prefix='FF',
+        )
+        self.assertTrue(member.card_number.startswith('FF'))
+        self.assertEqual(CardNumberSequence.objects.get(prefix='FF').next_value, 1)
+
+
+class IssueCardsTests(TestCase):
+    """MemberQuerySet.issue_cards: Gültigkeit per CASE in einem einzigen UPDATE"""
+
+    def setUp(self):
+        cache.clear()
+        self.issue_date = date(2026, 3, 1)
+        self.manual_until = date(2030, 12, 31)
+        self.members = {
+            member_type: Member.objects.create(
+                first_name=member_type.title(), last_name='Ausweis', birth_date=date(1990, 1, 1),
+                member_type=member_type,
+            )
+            for member_type in ('FF', 'BF', 'EXTERN', 'PRAKTIKANT')
+        }
+        self.manual = Member.objects.create(
+            first_name='Manuell', last_name='Ausweis', birth_date=date(1990, 1, 1), member_type='EXTERN',
+            manual_validity=True, valid_until=self.manual_until,
+        )
+        self.untouched = Member.objects.create(
+            first_name='Nicht', last_name='Ausgewählt', birth_date=date(1990, 1, 1),
+        )
+        # Veraltetes updated_at, damit die Aktualisierung sichtbar wird
+        self.old_timestamp = timezone.now() - timedelta(days=30)
+        Member.objects.update(updated_at=self.old_timestamp)
+
+    def test_validity_by_member_type(self):
+        selected = Member.objects.exclude(pk=self.untouched.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            version = get_data_version()
+            self.assertEqual(selected.issue_cards(self.issue_date), 5)
+            # Neue Datenversion erst nach dem Commit
+            self.assertEqual(get_data_version(), version)
+        self.assertNotEqual(get_data_version(), version)
+
+        valid_until = dict(Member.objects.values_list('member_type', 'valid_until').exclude(
+            pk__in=[self.manual.pk, self.untouched.pk]
+        ))
+        self.assertEqual(valid_until, {
+            'FF': self.issue_date + timedelta(days=5 * 365),
+            'BF': self.issue_date + timedelta(days=5 * 365),
+            'EXTERN': self.issue_date + timedelta(days=365),
+            'PRAKTIKANT': self.issue_date + timedelta(days=365),
+        })
+
+        self.manual.refresh_from_db()
+        self.assertEqual(self.manual.valid_until, self.manual_until)
+        self.assertEqual(self.manual.issued_date, self.issue_date)
+
+        for member in selected:
+            self.assertEqual(member.issued_date, self.issue_date)
+            self.assertGreater(member.updated_at, self.old_timestamp)
+
+        self.untouched.refresh_from_db()
+        self.assertIsNone(self.untouched.issued_date)
+        self.assertEqual(self.untouched.updated_at, self.old_timestamp)
+
+    def test_empty_queryset_keeps_data_version(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(Member.objects.none().issue_cards(self.issue_date), 0)
+        self.assertEqual(callbacks, [])
+
+
+class BackgroundJobTests(TestCase):
+    """Worker-Aufträge: Beanspruchen, Ausführen und Aufräumen nach Abbrüchen"""
+
+    def create_job(self, **fields):
+        fields.setdefault('kind', 'photo_process')
+        return BackgroundJob.objects.create(**fields)
+
+    def create_running(self, worker, heartbeat_at=None):
+        return self.create_job(
+            status=BackgroundJob.STATUS_RUNNING, worker=worker,
+            started_at=heartbeat_at or timezone.now(), heartbeat_at=heartbeat_at or timezone.now(),
+        )
+
+    def test_claim_takes_oldest_pending_job_and_records_owner(self):
+        first = self.create_job()
+        second = self.create_job()
+        self.create_job(status=BackgroundJob.STATUS_DONE)
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, BackgroundJob.STATUS_RUNNING)
+        self.assertEqual(claimed.worker, current_worker())
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNotNone(claimed.heartbeat_at)
+
+        self.assertEqual(claim_next_job().pk, second.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_run_job_stores_result_and_progress(self):
+        def handler(job, progress):
+            progress(rows=3, total=3)
+            job.result = {'rows': 3}
+            return '/tmp/ergebnis.db'
+
+        with mock.patch.dict(JOB_HANDLERS, {'test_ok': handler}):
+            self.create_job(kind='test_ok')
+            job = run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.STATUS_DONE)
+        self.assertEqual(job.result_path, '/tmp/ergebnis.db')
+        self.assertEqual(job.result, {'rows': 3})
+        self.assertEqual((job.rows_processed, job.total_rows), (3, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_run_job_records_failure(self):
+        def handler(job, progress):
+            raise RuntimeError('Ausgabeverzeichnis fehlt')
+
+        with mock.patch.dict(JOB_HANDLERS, {'test_fail': handler}):
+            self.create_job(kind='test_fail')
+            with self.assertLogs('members.utils.jobs', 'ERROR'):
+                job = run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'Ausgabeverzeichnis fehlt')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_recover_fails_only_orphaned_jobs(self):
+        host = current_worker().rpartition(':')[0]
+        finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                  capture_output=True, text=True, check=True)
+        stale = timezone.now() - STALE_AFTER - timedelta(minutes=1)
+
+        live = self.create_running(f'{host}:{os.getppid()}')
+        other_host = self.create_running('anderer-host:4711')
+        dead = self.create_running(f'{host}:{finished.stdout.strip()}')
+        own_pid = self.create_running(current_worker())
+        silent = self.create_running('anderer-host:4712', heartbeat_at=stale)
+        legacy = self.create_running('')
+        pending = self.create_job()
+
+        self.assertEqual(recover_stale_jobs(), 4)
+
+        statuses = dict(BackgroundJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[live.pk], BackgroundJob.STATUS_RUNNING)
+        self.assertEqual(statuses[other_host.pk], BackgroundJob.STATUS_RUNNING)
+        self.assertEqual(statuses[pending.pk], BackgroundJob.STATUS_PENDING)
+        for job in (dead, own_pid, silent, legacy):
+            self.assertEqual(statuses[job.pk], BackgroundJob.STATUS_FAILED)
+
+    def test_run_jobs_once_keeps_jobs_of_running_workers(self):
+        host = current_worker().rpartition(':')[0]
+        live = self.create_running(f'{host}:{os.getppid()}')
+
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+
+        live.refresh_from_db()
+        self.assertEqual(live.status, BackgroundJob.STATUS_RUNNING)
+
+
+class IncrementalCardpressoSyncTests(TestCase):
+    """create_cardpresso_db --incremental schreibt nur geänderte Zeilen und Fotos"""
+
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp(prefix='members_cardpresso_')
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        self.media_root = os.path.join(tmpdir, 'media')
+        self.project_dir = os.path.join(tmpdir, 'project')
+        os.makedirs(os.path.join(self.media_root, 'profile_pics'))
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.members = [
+            Member.objects.create(first_name=f'Vorname{i}', last_name=f'Nachname{i}', birth_date=date(1980, 1, i + 1))
+            for i in range(3)
+        ]
+        for member in self.members:
+            self.set_photo(member, f'm{member.pk}.jpg', b'foto-%d' % member.pk)
+
+    def set_photo(self, member, filename, content):
+        name = f'profile_pics/{filename}'
+        with open(os.path.join(self.media_root, name), 'wb') as handle:
+            handle.write(content)
+        # update() statt save(): keine Bildverarbeitung, die Bytes sind kein echtes JPEG
+        Member.objects.filter(pk=member.pk).update(profile_picture=name)
+
+    def sync(self):
+        call_command('create_cardpresso_db', output_dir=self.project_dir, incremental=True, stdout=io.StringIO())
+        with open(os.path.join(self.project_dir, 'export_manifest.json'), encoding='utf-8') as handle:
+            return json.load(handle)
+
+    def snapshot(self):
+        """Zeilen der Cardpresso-Tabelle und (mtime, Inhalt) der exportierten Fotos"""
+        db_path = os.path.join(self.project_dir, 'database', 'cardpresso_indexed.sqlite')
+        db = sqlite3.connect(db_path)
+        try:
+            rows = {row[0]: row for row in db.execute('SELECT * FROM members')}
+        finally:
+            db.close()
+        images_dir = os.path.join(self.project_dir, 'images')
+        images = {}
+        for entry in os.scandir(images_dir):
+            with open(entry.path, 'rb') as handle:
+                images[entry.name] = (entry.stat().st_mtime_ns, handle.read())
+        return rows, images
+
+    def test_only_changed_member_is_rewritten(self):
+        first = self.sync()
+        self.assertEqual(first['rows_written'], 3)
+        rows_before, images_before = self.snapshot()
+        self.assertEqual(len(images_before), 3)
+
+        changed = self.members[1]
+        # update() setzt updated_at nicht selbst
+        Member.objects.filter(pk=changed.pk).update(last_name='Geändert', updated_at=timezone.now())
+        self.set_photo(changed, f'm{changed.pk}_neu.jpg', b'neues-foto')
+
+        second = self.sync()
+        self.assertEqual((second['rows_written'], second['images_written'], second['members_removed']), (1, 1, 0))
+        rows_after, images_after = self.snapshot()
+
+        changed_rows = {pk for pk in rows_before if rows_before[pk] != rows_after[pk]}
+        self.assertEqual(changed_rows, {changed.pk})
+        self.assertEqual(rows_after[changed.pk][3], 'Geändert')
+
+        # Altes Foto des geänderten Mitglieds entfernt, die übrigen unangetastet
+        self.assertNotIn(f'm{changed.pk}.jpg', images_after)
+        self.assertEqual(images_after[f'm{changed.pk}_neu.jpg'][1], b'neues-foto')
+        for member in (self.members[0], self.members[2]):
+            filename = f'm{member.pk}.jpg'
+            self.assertEqual(images_after[filename], images_before[filename])
+
+        # Keine Staging-Reste
+        leftovers = [
+            os.path.join(root, name)
+            for root, _dirs, files in os.walk(os.path.dirname(self.project_dir))
+            for name in files if name.endswith(('.partial', '.tmp'))
+        ]
+        self.assertEqual(leftovers, [])
+
+
+class CardpressoExporterTests(TestCase):
+    """CardpressoExporter.run je Profil: Tabellen-Layout, Werte und Fotos"""
+
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp(prefix='members_export_')
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        self.media_root = os.path.join(tmpdir, 'media')
+        self.project_dir = os.path.join(tmpdir, 'project')
+        os.makedirs(os.path.join(self.media_root, 'profile_pics'))
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # Inhaltsadressiertes Profilbild, von zwei Mitgliedern gemeinsam genutzt
+        self.photo_hash = hashlib.sha256(b'passbild').hexdigest()
+        self.picture = f'profile_pics/{self.photo_hash[:2]}/{self.photo_hash}.jpg'
+        self.write_file(self.picture, b'passbild')
+        # Alter Dateiname vorname.nachname (nur über den Namens-Fallback)
+        self.write_file('profile_pics/max.mustermann.jpg', b'altes-foto')
+
+        self.anna = self.create_member('Anna', 'Meier', card_number_prefix='FF', issued_date=date(2026, 3, 1))
+        self.ben = self.create_member('Ben', 'Meier', is_active=False)
+        self.max = self.create_member('Max', 'Mustermann')
+        self.ohne = self.create_member('Ohne', 'Foto')
+        # update() statt save(): keine Bildverarbeitung, die Bytes sind kein echtes JPEG
+        Member.objects.filter(pk__in=[self.anna.pk, self.ben.pk]).update(profile_picture=self.picture)
+        self.anna.refresh_from_db()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+
+    def create_member(self, first_name, last_name, **fields):
+        return Member.objects.create(
+            first_name=first_name, last_name=last_name, birth_date=date(1980, 2, 29), **fields
+        )
+
+    def export(self, profile, db_name):
+        db_path = os.path.join(self.project_dir, 'database', db_name)
+        exporter = CardpressoExporter(
+            profile, db_path, images_dir=os.path.join(self.project_dir, 'images'), workers=1,
+        ).run()
+        db = sqlite3.connect(db_path)
+        db.row_factory = sqlite3.Row
+        try:
+            columns = [row['name'] for row in db.execute('PRAGMA table_info(members)')]
+            indexes = {row['name'] for row in db.execute('PRAGMA index_list(members)')}
+            rows = {row['id']: dict(row) for row in db.execute('SELECT * FROM members')}
+        finally:
+            db.close()
+        return exporter, columns, indexes, rows
+
+    def images(self):
+        return sorted(os.listdir(os.path.join(self.project_dir, 'images')))
+
+    def test_indexed_profile(self):
+        exporter, columns, indexes, rows = self.export(INDEXED_PROFILE, 'cardpresso_indexed.sqlite')
+
+        self.assertEqual(columns, [name for name, _sql_type, _value in INDEXED_PROFILE.columns])
+        self.assertTrue({'idx_members_ausweisnummer', 'idx_members_name', 'idx_members_personalnummer'} <= indexes)
+        self.assertEqual((exporter.rows, exporter.photos, exporter.copied, exporter.errors), (4, 3, 2, []))
+
+        anna = rows[self.anna.pk]
+        self.assertEqual(anna['vollname'], 'Anna Meier')
+        self.assertEqual(anna['geburtsdatum'], '29.02.1980')
+        self.assertEqual(anna['ausstellungsdatum'], '01.03.2026')
+        self.assertEqual(anna['gueltig_bis'], self.anna.valid_until.strftime('%d.%m.%Y'))
+        # Wie im ursprünglichen Export: Präfix + card_number
+        self.assertEqual(anna['ausweisnummer'], f'FF{self.anna.card_number}')
+        self.assertEqual((anna['kartenprefix'], anna['kartennummer']), ('FF', self.anna.card_number))
+        self.assertEqual(anna['mitgliedertyp'], 'Freiwillige Feuerwehr')
+        self.assertEqual(anna['aktiv'], 'JA')
+        self.assertEqual(rows[self.ben.pk]['aktiv'], 'NEIN')
+
+        # Foto-Spalte: Dateiname ohne Endung; gemeinsames Foto nur einmal abgelegt
+        self.assertEqual(anna['photo'], self.photo_hash)
+        self.assertEqual(rows[self.ben.pk]['photo'], self.photo_hash)
+        self.assertEqual(rows[self.max.pk]['photo'], 'max.mustermann')
+        self.assertEqual(rows[self.ohne.pk]['photo'], '')
+        self.assertEqual(self.images(), sorted([f'{self.photo_hash}.jpg', 'max.mustermann.jpg']))
+
+    def test_legacy_profile(self):
+        exporter, columns, indexes, rows = self.export(LEGACY_PROFILE, 'cardpresso.sqlite')
+
+        self.assertEqual(columns, [name for name, _sql_type, _value in LEGACY_PROFILE.columns])
+        self.assertTrue({'idx_members_vollkartennummer', 'idx_members_name'} <= indexes)
+        # Ohne Namens-Fallback: das alte Foto von Max wird nicht gefunden
+        self.assertEqual((exporter.rows, exporter.photos, exporter.copied, exporter.errors), (4, 2, 2, []))
+
+        anna = rows[self.anna.pk]
+        self.assertEqual(anna['geburtsdatum'], '1980-02-29')
+        self.assertEqual(anna['ausstellungsdatum'], '2026-03-01')
+        self.assertEqual(anna['vollkartennummer'], f'FF{self.anna.card_number}')
+        self.assertEqual(anna['aktiv'], 'Ja')
+        self.assertEqual(rows[self.ben.pk]['aktiv'], 'Nein')
+        self.assertEqual(anna['erstellt_am'], self.anna.created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+        # Foto je Mitglied unter eigenem Namen, Pfad absolut
+        filenames = {pk: f'member_{pk}_{self.photo_hash}.jpg' for pk in (self.anna.pk, self.ben.pk)}
+        for pk, filename in filenames.items():
+            self.assertEqual(rows[pk]['foto_dateiname'], filename)
+            self.assertEqual(rows[pk]['foto_pfad'], os.path.join(os.path.abspath(self.project_dir), 'images', filename))
+        self.assertEqual((rows[self.max.pk]['foto_pfad'], rows[self.max.pk]['foto_dateiname']), ('', ''))
+        self.assertEqual(self.images(), sorted(filenames.values()))
+
+    def test_photo_index_matches_picture_and_old_names(self):
+        self.write_file('profile_pics/Erika.Muster.png', b'png')
+        index = PhotoIndex()
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.resolve(self.picture, 'Anna', 'Meier').path,
+                         os.path.join(self.media_root, self.picture))
+        self.assertEqual(index.resolve('', 'Max', 'Mustermann').name, 'max.mustermann.jpg')
+        self.assertEqual(index.resolve(None, 'Erika', 'Muster').name, 'Erika.Muster.png')
+        self.assertIsNone(index.resolve('', 'Max', 'Mustermann', name_fallback=False))
+        self.assertIsNone(index.resolve('profile_pics/fehlt.jpg', 'Ohne', 'Foto'))
+
+class CardpressoWriterTests(SimpleTestCase):
+    """Staging-Datei: die Zieldatei wird nur durch einen vollständigen Build ersetzt"""
+
+    CREATE_SQL = 'CREATE TABLE members (id INTEGER PRIMARY KEY, name TEXT)'
+    INSERT_SQL = 'INSERT INTO members (id, name) VALUES (?, ?)'
+    INDEXES = ('CREATE INDEX members_name ON members (name)',)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='members_writer_')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.target = os.path.join(directory, 'database', 'cardpresso_indexed.sqlite')
+
+    def writer(self, indexes=INDEXES):
+        return CardpressoWriter(self.target, self.CREATE_SQL, self.INSERT_SQL, indexes, batch_size=2)
+
+    def rows(self):
+        db = sqlite3.connect(self.target)
+        try:
+            return db.execute('SELECT id, name FROM members ORDER BY id').fetchall()
+        finally:
+            db.close()
+
+    def build_previous(self):
+        with self.writer() as writer:
+            writer.add_many([(1, 'Alt'), (2, 'Bestand')])
+        self.assertEqual(self.rows(), [(1, 'Alt'), (2, 'Bestand')])
+
+    def test_complete_build_replaces_target(self):
+        self.build_previous()
+        with self.writer() as writer:
+            writer.add_many([(1, 'Neu'), (2, 'Zwei'), (3, 'Drei')])
+
+        self.assertEqual(self.rows(), [(1, 'Neu'), (2, 'Zwei'), (3, 'Drei')])
+        self.assertEqual(writer.rows_written, 3)
+        self.assertFalse(os.path.exists(f'{self.target}.partial'))
+
+    def test_failure_mid_load_keeps_previous_database(self):
+        self.build_previous()
+
+        with self.assertLogs('members.utils.cardpresso_writer', 'WARNING'):
+            with self.assertRaises(RuntimeError):
+                with self.writer() as writer:
+                    writer.add_many([(1, 'Neu'), (2, 'Zwei'), (3, 'Drei')])
+                    # Die ersten Zeilen liegen schon in der Staging-Datei
+                    self.assertTrue(os.path.exists(f'{self.target}.partial'))
+                    raise RuntimeError('Foto nicht lesbar')
+
+        self.assertEqual(self.rows(), [(1, 'Alt'), (2, 'Bestand')])
+        self.assertFalse(os.path.exists(f'{self.target}.partial'))
+
+    def test_sqlite_error_while_loading_or_committing_keeps_previous_database(self):
+        self.build_previous()
+
+        for indexes, rows in [
+            (self.INDEXES, [(1, 'Neu'), (1, 'Doppelt')]),          # beim Laden
+            (('CREATE INDEX kaputt ON members (fehlt)',), [(1, 'Neu')]),  # beim Abschließen
+        ]:
+            with self.subTest(indexes=indexes):
+                with self.assertLogs('members.utils.cardpresso_writer', 'WARNING'):
+                    with self.assertRaises(sqlite3.Error):
+                        with self.writer(indexes) as writer:
+                            writer.add_many(rows)
+
+                self.assertEqual(self.rows(), [(1, 'Alt'), (2, 'Bestand')])
+                self.assertFalse(os.path.exists(f'{self.target}.partial'))
+
+class CardpressoIndexTests(SimpleTestCase):
+    """Export-Verzeichnis cardpresso_exports.json und Kennzahlen aus dem Manifest"""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='members_cardpresso_index_')
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        output = override_settings(CARDPRESSO_OUTPUT_DIR=self.output_dir)
+        output.enable()
+        self.addCleanup(output.disable)
+
+    def make_export(self, name, images):
+        project_dir = os.path.join(self.output_dir, name)
+        os.makedirs(os.path.join(project_dir, 'database'))
+        os.makedirs(os.path.join(project_dir, 'images'))
+        db_path = os.path.join(project_dir, 'database', 'cardpresso_indexed.sqlite')
+        with open(db_path, 'wb') as handle:
+            handle.write(b'\0' * 2048)
+        image_paths = []
+        for filename in images:
+            image_paths.append(os.path.join(project_dir, 'images', filename))
+            with open(image_paths[-1], 'wb') as handle:
+                handle.write(b'\xff' * 100)
+        write_export_manifest(project_dir, db_path, 'indexed', 3, (1, 3), image_paths, 0.25)
+        return project_dir, db_path
+
+    def test_parallel_registrations_all_survive(self):
+        paths = [os.path.join(self.output_dir, f'cardpresso_batch_{i}') for i in range(20)]
+        barrier = threading.Barrier(len(paths))
+
+        def register(path):
+            # Jeder Thread mit eigenem Manager, wie Worker und View
+            barrier.wait()
+            CardpressoManager()._register_export(path, {'member_count': 1})
+
+        threads = [threading.Thread(target=register, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(os.path.join(self.output_dir, 'cardpresso_exports.json'), encoding='utf-8') as handle:
+            registered = {entry['path'] for entry in json.load(handle)['exports']}
+        self.assertEqual(registered, set(paths))
+
+    def test_stats_come_from_manifest_without_scanning_images(self):
+        project_dir, db_path = self.make_export('cardpresso_full_1', ['1.jpg', '2.jpg'])
+        # Nicht im Manifest - würde nur eine Verzeichnissuche zählen
+        open(os.path.join(project_dir, 'images', 'fremd.jpg'), 'wb').close()
+        manager = CardpressoManager()
+
+        with mock.patch.object(CardpressoManager, '_scan_stats', side_effect=AssertionError), \
+                mock.patch('os.listdir', side_effect=AssertionError), \
+                mock.patch('os.walk', side_effect=AssertionError):
+            stats = manager._collect_stats(project_dir, db_path, os.path.join(project_dir, 'images'))
+
+        self.assertEqual(stats['member_count'], 3)
+        self.assertEqual(stats['image_count'], 2)
+        self.assertTrue(stats['has_images'])
+        self.assertEqual(stats['db_size_kb'], 2.0)
+        self.assertEqual(stats['total_size_kb'], round((2048 + 200) / 1024, 2))
+
+        # Eingetragener Export: get_latest_database liest nur das Verzeichnis
+        manager._register_export(project_dir, stats)
+        with mock.patch.object(CardpressoManager, '_scan_stats', side_effect=AssertionError), \
+                mock.patch('os.listdir', side_effect=AssertionError):
+            latest = manager.get_latest_database()
+        self.assertEqual(latest['path'], project_dir)
+        self.assertEqual(latest['stats']['image_count'], 2)
+
+class MemberSearchTests(TestCase):
+    """Suche über den FTS5-Index: Präfixe, Umlaute, Umschreibung und Trigger"""
+
+    def setUp(self):
+        if not fts_available():
+            self.skipTest('FTS5-Index nicht vorhanden')
+        self.mueller = Member.objects.create(
+            first_name='Jürgen', last_name='Müller', birth_date=date(1977, 6, 2),
+            personnel_number='P-4711', card_number_prefix='FF',
+        )
+        self.meier = Member.objects.create(
+            first_name='Anna', last_name='Meier', birth_date=date(1980, 1, 1), card_number='123456',
+        )
+
+    def search(self, term):
+        return set(search_members(Member.objects.all(), term).values_list('pk', flat=True))
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual(self.search('mül'), {self.mueller.pk})
+        self.assertEqual(self.search('jü mül'), {self.mueller.pk})
+        self.assertEqual(self.search('anna mül'), set())
+        self.assertEqual(self.search('4711'), {self.mueller.pk})
+
+    def test_umlauts_and_transliteration(self):
+        for term in ('müller', 'muller', 'mueller', 'MUELLER', 'juergen'):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), {self.mueller.pk})
+
+    def test_card_number_with_and_without_prefix(self):
+        digits = self.mueller.card_number[len('FF'):]
+        self.assertEqual(self.search(self.mueller.card_number), {self.mueller.pk})
+        self.assertEqual(self.search(digits), {self.mueller.pk})
+
+    def test_fts_syntax_is_not_interpreted(self):
+        # Anführungszeichen, Klammern und * wären sonst FTS5-Syntax (bzw. ein Syntaxfehler)
+        self.assertEqual(self.search('"mül*)'), {self.mueller.pk})
+        self.assertEqual(self.search('(meier) "anna'), {self.meier.pk})
+
+    def test_index_follows_update_and_delete(self):
+        self.meier.last_name = 'Schäfer'
+        self.meier.save()
+        self.assertEqual(self.search('meier'), set())
+        self.assertEqual(self.search('schaefer'), {self.meier.pk})
+
+        # Auch Massen-Updates am ORM vorbei (Trigger statt Signal)
+        Member.objects.filter(pk=self.mueller.pk).update(last_name='Groß')
+        self.assertEqual(self.search('müller'), set())
+        self.assertEqual(self.search('gross'), {self.mueller.pk})
+
+        self.meier.delete()
+        self.assertEqual(self.search('schäfer'), set())
+
+    def test_missing_triggers_are_recreated(self):
+        # So sieht die Datenbank nach einem Tabellenumbau durch eine Migration aus
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER members_member_fts_update')
+        Member.objects.filter(pk=self.meier.pk).update(last_name='Schäfer')
+
+        self.assertTrue(ensure_search_index())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            self.assertTrue(set(FTS_TRIGGERS) <= {row[0] for row in cursor.fetchall()})
+        # Neu aufgebaut, also auch mit den Änderungen aus der Zeit ohne Trigger
+        self.assertEqual(self.search('schaefer'), {self.meier.pk})
+        self.assertEqual(self.search('meier'), set())
+
+        # Vollständiger Index bleibt unangetastet
+        self.assertFalse(ensure_search_index())
+
+
+class NameKeyTests(SimpleTestCase):
+    """Namensschlüssel nach DIN 5007 Variante 2 (ä = ae, ö = oe, ü = ue, ß = ss)"""
+
+    def test_name_key_identifies_spelling_variants(self):
+        expected = name_key('Jürgen', 'Müller')
+        self.assertEqual(expected, 'mueller|juergen')
+        for first, last in [('Juergen', 'Mueller'), ('JÜRGEN', 'MÜLLER'), (' jürgen ', 'müller')]:
+            with self.subTest(first=first, last=last):
+                self.assertEqual(name_key(first, last), expected)
+        self.assertEqual(name_key('Anna', 'Weiß-Müller'), name_key('Anna', 'Weiss Mueller'))
+        self.assertEqual(name_key('Anna', 'Straße'), name_key('Anna', 'STRASSE'))
+        # Andere diakritische Zeichen werden entfernt, nicht umschrieben
+        self.assertEqual(name_key('René', 'Çelik'), 'celik|rene')
+        self.assertEqual(name_key(None, ''), '|')
+
+    def test_sort_key_orders_like_telephone_directory(self):
+        names = ['Müller', 'Mueller', 'Muller', 'Mülheim', 'Mai', 'Maier', 'Mayer', 'Meier', 'Möller', 'Moll']
+        ordered = sorted(names, key=lambda last: (sort_key('Anna', last), last))
+        # Möller = "Moeller" vor "Moll", Mülheim = "Muelheim" vor Müller = Mueller
+        self.assertEqual(
+            ordered,
+            ['Mai', 'Maier', 'Mayer', 'Meier', 'Möller', 'Moll', 'Mülheim', 'Mueller', 'Müller', 'Muller'],
+        )
+        self.assertEqual(sort_key('Jürgen', 'Müller'), sort_key('Juergen', 'Mueller'))
+
+    def test_sort_key_last_name_before_first_name(self):
+        # Der Trenner sortiert vor allen Buchstaben: "Berg" vor "Bergmann"
+        self.assertLess(sort_key('Zoe', 'Berg'), sort_key('Anna', 'Bergmann'))
+        self.assertLess(sort_key('Anna', 'Schmidt'), sort_key('Bernd', 'Schmidt'))
+        self.assertEqual(sort_key('Anna-Lena', 'Graf  von-Weiß'), 'graf von weiss\tanna lena')
+
+
+class KeysetPaginationTests(TestCase):
+    """Keyset-Pagination: Cursor vorwärts/rückwärts, NULL-Werte, manipulierte Cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(23):
+            Member.objects.create(
+                # Doppelte Namen und Daten: die id entscheidet
+                first_name=f'Vorname{i % 3}', last_name=['Müller', 'Mueller', 'Abel', 'Zander'][i % 4],
+                birth_date=date(1980, 1, 1),
+                valid_until=None if i % 3 == 0 else date(2030, 1 + i % 2, 1),
+            )
+
+    def walk_forward(self, paginator):
+        pages, token = [], None
+        while True:
+            rows, has_next, has_previous = paginator.page(token)
+            self.assertEqual(has_previous, token is not None)
+            pages.append([member.pk for member in rows])
+            if not has_next:
+                return pages
+            token = paginator.make_cursor(rows[-1], 'next')
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPaginator(Member.objects.all(), 'name', per_page=5)
+        expected = list(Member.objects.order_by('sort_key', 'id').values_list('pk', flat=True))
+
+        pages = self.walk_forward(paginator)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(sum(pages, []), expected)
+
+        # Von der letzten Seite mit den prev-Cursorn zurück bis zur ersten
+        last = Member.objects.get(pk=pages[-1][0])
+        token = paginator.make_cursor(last, 'prev')
+        for page in reversed(pages[:-1]):
+            rows, has_next, has_previous = paginator.page(token)
+            self.assertEqual([member.pk for member in rows], page)
+            self.assertTrue(has_next)
+            self.assertEqual(has_previous, page != pages[0])
+            token = paginator.make_cursor(rows[0], 'prev')
+
+    def test_null_valid_until_sorts_first(self):
+        paginator = KeysetPaginator(Member.objects.all(), 'valid_until', per_page=4)
+        pages = self.walk_forward(paginator)
+        ordered = [Member.objects.get(pk=pk) for pk in sum(pages, [])]
+
+        self.assertEqual(len(ordered), 23)
+        nulls = [member for member in ordered if member.valid_until is None]
+        # Alle NULL-Werte vorne (wie SQLite), danach aufsteigend, bei Gleichstand nach id
+        self.assertEqual(ordered[:len(nulls)], nulls)
+        keys = [(member.valid_until or date.min, member.pk) for member in ordered]
+        self.assertEqual(keys, sorted(keys))
+        # Seitengrenze mitten in den NULL-Werten und am Übergang zu echten Daten
+        self.assertGreater(len(nulls), 4)
+
+    def test_descending_sort_round_trip(self):
+        paginator = KeysetPaginator(Member.objects.all(), 'created', per_page=6)
+        expected = list(Member.objects.order_by('-created_at', 'id').values_list('pk', flat=True))
+        self.assertEqual(sum(self.walk_forward(paginator), []), expected)
+
+    def test_tampered_or_foreign_cursor_shows_first_page(self):
+        paginator = KeysetPaginator(Member.objects.all(), 'name', per_page=5)
+        first_page, _has_next, _has_previous = paginator.page()
+        token = paginator.make_cursor(first_page[-1], 'next')
+
+        tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+        for bad in (tampered, 'kein-cursor', ''):
+            with self.subTest(token=bad):
+                rows, _has_next, has_previous = paginator.page(bad)
+                self.assertEqual(rows, first_page)
+                self.assertFalse(has_previous)
+
+        # Gültig signiert, aber für eine andere Sortierung
+        other = KeysetPaginator(Member.objects.all(), 'valid_until', per_page=5)
+        rows, _has_next, has_previous = other.page(token)
+        self.assertEqual(rows, other.page()[0])
+        self.assertFalse(has_previous)
+
+
+class ContentAddressedPhotoTests(TestCase):
+    """Inhaltsadressierte Passbilder: Deduplizierung und Freigabe per Verweiszählung"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(prefix='members_photos_')
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.storage = Member._meta.get_field('profile_picture').storage
+
+    def jpeg(self, color):
+        from PIL import Image
+
+        output = io.BytesIO()
+        Image.new('RGB', (300, 450), color).save(output, format='JPEG')
+        return output.getvalue()
+
+    def create_member(self, last_name, color):
+        member = Member(first_name='Foto', last_name=last_name, birth_date=date(1980, 1, 1))
+        member.profile_picture = ingest_portrait(io.BytesIO(self.jpeg(color)))
+        member.save()
+        return member
+
+    def save_photo(self, color):
+        portrait = ingest_portrait(io.BytesIO(self.jpeg(color)))
+        return self.storage.save(f'profile_pics/{portrait.name}', portrait)
+
+    def stored_files(self, directory):
+        root = os.path.join(self.media_root, directory)
+        return sorted(
+            os.path.relpath(os.path.join(dirpath, name), self.media_root)
+            for dirpath, _dirnames, names in os.walk(root) for name in names
+        )
+
+    def variant_files(self, photo_hash):
+        return [
+            os.path.join(self.media_root, variant_path(photo_hash, variant, ext))
+            for variant in IMAGE_VARIANTS for ext in ('webp', 'jpg')
+        ]
+
+    def age(self, name):
+        """Datei älter machen als die Schonfrist von release_photo"""
+        path = self.storage.path(name)
+        old = time.time() - 24 * 3600
+        os.utime(path, (old, old))
+
+    def test_identical_photos_are_stored_once(self):
+        first = self.create_member('Eins', 'red')
+        second = self.create_member('Zwei', 'red')
+        third = self.create_member('Drei', 'blue')
+
+        self.assertEqual(first.profile_picture.name, second.profile_picture.name)
+        self.assertNotEqual(first.profile_picture.name, third.profile_picture.name)
+        self.assertEqual(len(self.stored_files('profile_pics')), 2)
+        # Dateiname = Hash des fertigen Passbilds, Varianten hängen daran
+        self.assertIn(first.photo_hash, first.profile_picture.name)
+        self.assertTrue(all(os.path.exists(path) for path in self.variant_files(first.photo_hash)))
+
+    def test_photo_is_released_with_last_reference(self):
+        first = self.create_member('Eins', 'red')
+        second = self.create_member('Zwei', 'red')
+        name, photo_hash = first.profile_picture.name, first.photo_hash
+        self.age(name)
+
+        # Erstes Mitglied bekommt ein neues Bild - das alte nutzt noch das zweite
+        with self.captureOnCommitCallbacks(execute=True):
+            first.profile_picture = ingest_portrait(io.BytesIO(self.jpeg('green')))
+            first.save()
+        self.assertTrue(self.storage.exists(name))
+
+        # Letzter Verweis gelöscht: Bild und Varianten weg
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(any(os.path.exists(path) for path in self.variant_files(photo_hash)))
+        self.assertTrue(self.storage.exists(first.profile_picture.name))
+
+    def test_recently_reused_photo_is_kept(self):
+        member = self.create_member('Eins', 'red')
+        name = member.profile_picture.name
+        Member.objects.filter(pk=member.pk).update(profile_picture='')
+        self.age(name)
+
+        # Ein paralleles Speichern desselben Inhalts (Datensatz noch nicht
+        # committed) frischt den Zeitstempel auf - die Freigabe löscht nicht
+        self.assertEqual(self.save_photo('red'), name)
+        self.assertFalse(Member.release_photo(name))
+        self.assertTrue(self.storage.exists(name))
+
+        self.age(name)
+        self.assertTrue(Member.release_photo(name))
+        self.assertFalse(self.storage.exists(name))
+
+        # Erneutes Speichern legt die gelöschte Datei wieder an
+        self.assertEqual(self.save_photo('red'), name)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_migration_generates_missing_variants(self):
+        migration = import_module('members.migrations.0016_generate_image_variants')
+        member = self.create_member('Bestand', 'green')
+        for path in self.variant_files(member.photo_hash):
+            os.remove(path)
+
+        migration.generate_missing_variants(apps, None)
+        self.assertTrue(all(os.path.exists(path) for path in self.variant_files(member.photo_hash)))
+
+    def test_cleanup_photos_removes_unreferenced_files(self):
+        member = self.create_member('Eins', 'red')
+        legacy = os.path.join(self.media_root, 'profile_pics', 'foto.eins.jpg')
+        with open(legacy, 'wb') as handle:
+            handle.write(self.jpeg('red'))
+        self.age('profile_pics/foto.eins.jpg')
+
+        call_command('cleanup_photos', stdout=io.StringIO())
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(self.stored_files('profile_pics'), [member.profile_picture.name])
+
+
+class PhotoZipExtractTests(SimpleTestCase):
+    """Entpacken des Foto-Imports: Grenzen und gleichnamige Einträge"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='members_zip_')
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.target_dir = os.path.join(self.tmpdir, 'out')
+        os.makedirs(self.target_dir)
+
+    def make_zip(self, entries):
+        path = os.path.join(self.tmpdir, 'fotos.zip')
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in entries:
+                archive.writestr(name, data)
+        return path
+
+    def test_flat_extract_reports_duplicate_basenames(self):
+        zip_path = self.make_zip([
+            ('klasse_a/anna.meier.jpg', b'a' * 10),
+            ('klasse_b/anna.meier.jpg', b'b' * 10),
+            ('__MACOSX/._anna.meier.jpg', b'x'),
+            ('notizen.txt', b'x'),
+            ('12345.png', b'c'),
+        ])
+        paths, skipped = extract_photo_zip(zip_path, self.target_dir, max_files=10, max_size=1000)
+
+        self.assertEqual([os.path.basename(path) for path in paths], ['12345.png', 'anna.meier.jpg'])
+        self.assertEqual(skipped, ['klasse_b/anna.meier.jpg: gleicher Dateiname wie klasse_a/anna.meier.jpg'])
+        # Das erste Bild wurde nicht überschrieben
+        with open(os.path.join(self.target_dir, 'anna.meier.jpg'), 'rb') as handle:
+            self.assertEqual(handle.read(), b'a' * 10)
+
+    def test_limits_are_checked_before_extracting(self):
+        # Gut komprimierbar: klein im Archiv, groß entpackt
+        zip_path = self.make_zip([(f'{i}.jpg', b'\0' * 600) for i in range(3)])
+
+        with self.assertRaises(PhotoArchiveTooLarge):
+            extract_photo_zip(zip_path, self.target_dir, max_files=2, max_size=10 ** 6)
+        with self.assertRaises(PhotoArchiveTooLarge):
+            extract_photo_zip(zip_path, self.target_dir, max_files=10, max_size=1000)
+        self.assertEqual(os.listdir(self.target_dir), [])
+
+        paths, skipped = extract_photo_zip(zip_path, self.target_dir, max_files=3, max_size=1800)
+        self.assertEqual((len(paths), skipped), (3, []))
+
+
+class RequestMetricsTests(TestCase):
+    """Metriken je Worker-Datei, Zusammenfassen beendeter Worker und Middleware"""
+
+    REQUESTS_TOTAL = 'members_http_requests_total{view="%s",method="GET",status="200"} %d'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('metrics', password='test')
+
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp(prefix='members_metrics_')
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        metrics_settings = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=self.metrics_dir, METRICS_FLUSH_INTERVAL=0,
+        )
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+
+        # Eigener Stand je Test statt des prozessweiten Registers
+        self.registry = MetricsRegistry()
+        for target in ('members.utils.metrics.registry', 'members.middleware.registry'):
+            patcher = mock.patch(target, self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_worker(self):
+        """Noch laufender Fremdprozess als zweiter Worker"""
+        process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+        self.addCleanup(process.wait)
+        self.addCleanup(process.kill)
+        return process.pid
+
+    def finished_pid(self):
+        finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                  capture_output=True, text=True, check=True)
+        return int(finished.stdout)
+
+    def write_worker_file(self, pid, view, count):
+        path = os.path.join(self.metrics_dir, f'metrics_{pid}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'counters': {'members_http_requests_total': {f'{view}\tGET\t200': count}}}, f)
+        return path
+
+    def worker_files(self):
+        return sorted(name for name in os.listdir(self.metrics_dir) if name.startswith('metrics_'))
+
+    def test_middleware_counts_requests_across_worker_files(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        # Zweiter gunicorn-Worker mit eigener Datei
+        self.write_worker_file(self.start_worker(), 'login', 3)
+
+        output = render_prometheus()
+        self.assertIn(self.REQUESTS_TOTAL % ('login', 5), output)
+        self.assertIn('members_http_request_duration_seconds_count{view="login"} 2', output)
+        self.assertIn(f'metrics_{os.getpid()}.json', self.worker_files())
+
+    def test_streaming_response_is_recorded_when_closed(self):
+        Member.objects.create(first_name='Anna', last_name='Meier', birth_date=date(1980, 1, 1))
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('members:export_data'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertNotIn('members:export_data', render_prometheus())
+
+        body = b''.join(response.streaming_content)
+        response.close()
+
+        output = render_prometheus()
+        self.assertIn(self.REQUESTS_TOTAL % ('members:export_data', 1), output)
+        self.assertIn('members_http_response_size_bytes_sum{view="members:export_data"} %d' % len(body), output)
+
+    def test_dead_workers_are_folded_into_retired_file(self):
+        self.write_worker_file(self.finished_pid(), 'login', 2)
+        self.write_worker_file(self.start_worker(), 'login', 3)
+
+        self.assertIn(self.REQUESTS_TOTAL % ('login', 5), render_prometheus())
+        self.assertEqual(len(self.worker_files()), 2)
+        self.assertIn(RETIRED_FILE, self.worker_files())
+
+        # Erneuter Abruf zählt die übernommene Datei nicht doppelt
+        self.assertIn(self.REQUESTS_TOTAL % ('login', 5), render_prometheus())
+
+    def test_crash_between_write_and_delete_is_not_counted_twice(self):
+        dead = self.write_worker_file(self.finished_pid(), 'login', 2)
+
+        # Summe geschrieben, Löschen schlägt fehl - wie ein Abbruch dazwischen
+        with mock.patch('members.utils.metrics.os.remove', side_effect=OSError):
+            self.assertEqual(retire_dead_workers(self.metrics_dir), 1)
+        self.assertTrue(os.path.exists(dead))
+
+        self.assertEqual(retire_dead_workers(self.metrics_dir), 0)
+        self.assertFalse(os.path.exists(dead))
+        self.assertIn(self.REQUESTS_TOTAL % ('login', 2), render_prometheus())
+
+    def test_reused_pid_does_not_overwrite_previous_worker(self):
+        # Datei eines beendeten Workers, dessen PID dieser Prozess geerbt hat
+        self.write_worker_file(os.getpid(), 'login', 4)
+
+        self.registry.inc('members_http_requests_total', 'login', 'GET', 200)
+        self.registry.flush(force=True)
+
+        self.assertIn(self.REQUESTS_TOTAL % ('login', 5), render_prometheus())
+        with open(os.path.join(self.metrics_dir, f'metrics_{os.getpid()}.json'), encoding='utf-8') as f:
+            own = json.load(f)
+        self.assertEqual(own['counters']['members_http_requests_total'], {'login\tGET\t200': 1})
@@ -10,6 +10,7 @@ urlpatterns = [
     path('members/add/', views.member_add, name='member_add'),
     path('members/<int:pk>/', views.member_detail, name='member_detail'),
     path('members/<int:pk>/edit/', views.member_edit, name='member_edit'),
+    path('members/<int:pk>/webcam/', views.member_webcam_photo, name='member_webcam_photo'),
     path('members/<int:pk>/delete/', views.member_delete, name='member_delete'),
     
     # Spezielle gefilterte Ansichten für Dashboard-Kacheln
@@ -24,6 +25,8 @@ urlpatterns = [
     path('import/', views.import_data, name='import_data'),
     path('export/', views.export_data, name='export_data'),
     path('download-template/', views.download_template, name='download_template'),
+    path('photos/import/', views.photo_import, name='photo_import'),
+    path('jobs/<int:pk>/status/', views.job_status, name='job_status'),
     
     # ✨ NEUE AUSWEIS-ERSTELLUNG URLS
     path('cards/create/', views.card_creation_list, name='card_creation_list'),
@@ -32,4 +35,7 @@ urlpatterns = [
     path('cards/check/<int:pk>/', views.check_member_eligibility, name='check_member_eligibility'),
     path('cardpresso-status/', views.cardpresso_status, name='cardpresso_status'),
     path('create-cardpresso-manual/', views.create_cardpresso_manual, name='create_cardpresso_manual'),
+    
+    # Betrieb: Request-Metriken für Prometheus
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
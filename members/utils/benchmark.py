@@ -0,0 +1,290 @@
+# members/utils/benchmark.py - Hilfsfunktionen für Benchmarks mit synthetischen Mitgliedern
+
+import io
+import os
+import csv
+import time
+import random
+import shutil
+import logging
+import resource
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from datetime import date, timedelta
+from django.db import connection, connections
+from members.models import Member
+from members.utils.card_numbers import card_number_allocator
+from members.utils.images import ingest_portrait, store_variants
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = [
+    'Anna', 'Bernd', 'Claudia', 'Dieter', 'Elke', 'Frank', 'Gabriele', 'Günther',
+    'Heike', 'Jürgen', 'Karin', 'Klaus', 'Lena', 'Lukas', 'Maria', 'Markus',
+    'Monika', 'Nils', 'Petra', 'Ralf', 'Sabine', 'Stefan', 'Sören', 'Tobias',
+    'Ursula', 'Uwe', 'Vanessa', 'Werner', 'Jörg', 'Zoë',
+]
+
+LAST_NAMES = [
+    'Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner',
+    'Becker', 'Schulz', 'Hoffmann', 'Schäfer', 'Koch', 'Bauer', 'Richter',
+    'Klein', 'Wolf', 'Schröder', 'Neumann', 'Schwarz', 'Zimmermann', 'Braun',
+    'Krüger', 'Hofmann', 'Hartmann', 'Lange', 'Schmitt', 'Werner', 'Krause',
+    'Meier', 'Lehmann', 'Großmann', 'Weiß', 'Jäger', 'Köhler', 'Böhm',
+]
+
+# Verteilung der Mitarbeitertypen (Gewichte)
+MEMBER_TYPE_WEIGHTS = {
+    'FF': 50, 'BF': 20, 'JF': 10, 'STADT': 12, 'EXTERN': 5, 'PRAKTIKANT': 3,
+}
+
+PREFIX_BY_TYPE = {'FF': 'FF', 'JF': 'JF'}
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Legt eine temporäre SQLite-Datenbank an, migriert sie und
+    leitet die Default-Verbindung für die Dauer des Blocks darauf um.
+    """
+    tmpdir = tempfile.mkdtemp(prefix='members_bench_')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield test_settings['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _synthetic_photo(rng, size=(1200, 1600)):
+    """Kamerabild-ähnliches JPEG: Hintergrund, Kopf und Schultern in Zufallsfarben"""
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    img = Image.new('RGB', size, tuple(rng.randint(150, 230) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    skin = (rng.randint(170, 240), rng.randint(120, 190), rng.randint(90, 160))
+    draw.ellipse((width * 0.3, height * 0.15, width * 0.7, height * 0.6), fill=skin)
+    draw.rectangle((width * 0.15, height * 0.65, width * 0.85, height), fill=tuple(rng.randint(0, 90) for _ in range(3)))
+    for _ in range(200):
+        # Rauschen, damit der JPEG-Encoder realistisch arbeitet
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.point((x, y), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=90)
+    output.seek(0)
+    return output
+
+
+def generate_photo_pool(count, seed=42):
+    """
+    Erzeugt `count` verschiedene Passbilder (inkl. Varianten) in der Ablage.
+
+    Die Mitglieder teilen sich die Bilder - bei inhaltsadressierter Ablage
+    verhält sich das wie viele Mitglieder mit wenigen Dateien.
+
+    Returns:
+        list: (Dateiname, Hash) je Bild
+    """
+    rng = random.Random(seed)
+    storage = Member._meta.get_field('profile_picture').storage
+    pool = []
+    for _ in range(count):
+        portrait = ingest_portrait(_synthetic_photo(rng))
+        name = storage.save(f'profile_pics/{portrait.name}', portrait)
+        store_variants(portrait.photo_hash, portrait.variants)
+        pool.append((name, portrait.photo_hash))
+    return pool
+
+
+def seed_members(count, seed=42, batch_size=2000, photos=(), photo_share=0.85):
+    """
+    Erzeugt `count` synthetische Mitglieder mit realistischen Daten
+
+    Args:
+        photos: (Dateiname, Hash) aus generate_photo_pool - ohne Pool keine Bilder
+        photo_share: Anteil der Mitglieder mit Profilbild
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    types = list(MEMBER_TYPE_WEIGHTS)
+    weights = list(MEMBER_TYPE_WEIGHTS.values())
+
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            member_type = rng.choices(types, weights)[0]
+            issued_date = None
+            valid_until = None
+            # ~80% haben bereits einen Ausweis, ein Teil davon abgelaufen
+            if rng.random() < 0.8:
+                issued_date = today - timedelta(days=rng.randint(0, 6 * 365))
+                valid_until = Member.compute_valid_until(member_type, issued_date)
+
+            batch.append(Member(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                birth_date=today - timedelta(days=rng.randint(15 * 365, 65 * 365)),
+                personnel_number=str(rng.randint(10000, 99999)) if member_type in ('BF', 'STADT') else None,
+                member_type=member_type,
+                card_number_prefix=PREFIX_BY_TYPE.get(member_type, ''),
+                issued_date=issued_date,
+                valid_until=valid_until,
+                manual_validity=member_type in ('EXTERN', 'PRAKTIKANT'),
+                is_active=rng.random() < 0.9,
+            ))
+            if photos and rng.random() < photo_share:
+                batch[-1].profile_picture, batch[-1].photo_hash = rng.choice(photos)
+
+        by_prefix = {}
+        for member in batch:
+            member.set_name_keys()
+            by_prefix.setdefault(member.card_number_prefix, []).append(member)
+        for prefix, members in by_prefix.items():
+            for member, number in zip(members, card_number_allocator.allocate(prefix, len(members))):
+                member.card_number = number
+
+        Member.objects.bulk_create(batch)
+        created += len(batch)
+
+    return created
+
+
+def build_import_csv(count, seed=42):
+    """CSV im Format des Exports (Re-Import) mit `count` synthetischen Zeilen"""
+    from members.utils.export import EXPORT_HEADER
+
+    rng = random.Random(seed)
+    today = date.today()
+    types = list(MEMBER_TYPE_WEIGHTS)
+    weights = list(MEMBER_TYPE_WEIGHTS.values())
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    for _ in range(count):
+        member_type = rng.choices(types, weights)[0]
+        birth_date = today - timedelta(days=rng.randint(15 * 365, 65 * 365))
+        writer.writerow([
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), birth_date.strftime('%d.%m.%Y'),
+            '', member_type, member_type, '', PREFIX_BY_TYPE.get(member_type, ''),
+            '', '', 'Nein', 'Ja', '',
+        ])
+    return ('\ufeff' + output.getvalue()).encode('utf-8')
+
+
+def percentile(values, pct):
+    """Perzentil mit linearer Interpolation (pct in 0..100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _current_rss_kb():
+    """Aktueller Resident Set Size des Prozesses in KB (Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return 0
+
+
+def _measure_child(func, args, queue):
+    connections.close_all()
+    baseline_kb = _current_rss_kb()
+    started = time.perf_counter()
+    try:
+        func(*args)
+        error = None
+    except Exception as e:
+        error = str(e)
+    wall_time = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'wall_time_s': round(wall_time, 3),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'peak_rss_delta_mb': round(max(peak_kb - baseline_kb, 0) / 1024, 1),
+        'error': error,
+    })
+
+
+def measure_in_subprocess(func, *args):
+    """
+    Führt `func` in einem eigenen Prozess aus und misst Laufzeit und Peak-RSS.
+
+    Ein eigener Prozess ist nötig, da ru_maxrss nur wachsen kann - so
+    beeinflussen sich die Messungen nicht gegenseitig.
+    """
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_measure_child, args=(func, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _scenario_child(func, repeat, before_each, queue):
+    from django.test.utils import CaptureQueriesContext
+
+    connections.close_all()
+    baseline_kb = _current_rss_kb()
+    timings = []
+    queries = []
+    error = None
+    try:
+        for _ in range(repeat):
+            if before_each:
+                before_each()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+    except Exception as e:
+        logger.exception("Benchmark-Szenario fehlgeschlagen")
+        error = str(e)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'runs': len(timings),
+        'p50_ms': round(percentile(timings, 50) * 1000, 2) if timings else None,
+        'p95_ms': round(percentile(timings, 95) * 1000, 2) if timings else None,
+        'min_ms': round(min(timings) * 1000, 2) if timings else None,
+        'max_ms': round(max(timings) * 1000, 2) if timings else None,
+        'queries': max(queries) if queries else None,
+        'queries_min': min(queries) if queries else None,
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'peak_rss_delta_mb': round(max(peak_kb - baseline_kb, 0) / 1024, 1),
+        'error': error,
+    })
+
+
+def run_scenario(func, repeat=5, before_each=None):
+    """
+    Führt `func` `repeat`-mal in einem eigenen Prozess aus.
+
+    Gemessen werden Laufzeit (p50/p95) und Anzahl der SQL-Abfragen je
+    Durchlauf sowie der Peak-RSS über alle Durchläufe. `before_each` läuft
+    vor jedem Durchlauf außerhalb der Messung (z.B. Cache leeren).
+    """
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_scenario_child, args=(func, repeat, before_each, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
@@ -0,0 +1,45 @@
+# members/utils/cache.py - Datenversion für Cache-Invalidierung
+
+import time
+import logging
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = 'members:data_version'
+
+
+def get_data_version():
+    """
+    Liefert die aktuelle Datenversion der Mitgliederdaten.
+
+    Jede Änderung an einem Mitglied erzeugt eine neue Version, dadurch
+    werden alle davon abgeleiteten Cache-Einträge automatisch ungültig.
+    """
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        version = str(time.time_ns())
+        # add() statt set(): ein paralleler Worker könnte schneller sein
+        if not cache.add(DATA_VERSION_KEY, version, timeout=None):
+            version = cache.get(DATA_VERSION_KEY, version)
+    return version
+
+
+def bump_data_version():
+    """
+    Setzt eine neue Datenversion - erst nach dem Commit der Transaktion,
+    damit kein anderer Worker veraltete Daten unter der neuen Version cached.
+    """
+    def _bump():
+        # Eindeutiger Wert statt incr(): kein Lost-Update zwischen Workern
+        cache.set(DATA_VERSION_KEY, str(time.time_ns()), timeout=None)
+
+    transaction.on_commit(_bump)
+
+
+def versioned_key(name, *parts):
+    """Baut einen Cache-Key, der an die aktuelle Datenversion gebunden ist"""
+    suffix = ':'.join(str(part) for part in parts)
+    key = f'members:{name}:{get_data_version()}'
+    return f'{key}:{suffix}' if suffix else key
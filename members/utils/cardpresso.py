@@ -1,15 +1,26 @@
 # members/utils/cardpresso.py - Utility-Funktionen für Cardpresso-Integration
 
+import io
 import os
+import json
+import fcntl
 import logging
 import subprocess
+from contextlib import contextmanager
 from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from datetime import datetime
+from members.utils.cardpresso_export import read_export_manifest, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
+# Verzeichnis aller Exporte (neuester zuerst) im CARDPRESSO_OUTPUT_DIR
+EXPORT_INDEX_NAME = 'cardpresso_exports.json'
+EXPORT_INDEX_LIMIT = 100
+
+EXPORT_DIR_PREFIXES = ('cardpresso_', 'cardpresso_export_', 'cardpresso_batch_', 'cardpresso_full_')
+
 class CardpressoManager:
     """Manager-Klasse für Cardpresso-Integration"""
     
@@ -17,13 +28,16 @@ class CardpressoManager:
         self.base_dir = getattr(settings, 'CARDPRESSO_OUTPUT_DIR', '.')
         self.auto_create = getattr(settings, 'CARDPRESSO_AUTO_CREATE', True)
         self.clean_old = getattr(settings, 'CARDPRESSO_CLEAN_OLD', True)
+        self.index_path = os.path.join(self.base_dir, EXPORT_INDEX_NAME)
         
-    def create_database(self, member_ids=None, clean=True, custom_output=None):
+    def create_database(self, member_ids=None, clean=True, custom_output=None, queryset=None, progress=None):
         """
         Erstellt Cardpresso-Datenbank für spezifische Mitglieder oder alle
         
         Args:
             member_ids: Liste von Mitglieder-IDs (None = alle)
+            queryset: Optionales Member-Queryset als Filter (kombinierbar mit member_ids)
+            progress: Optionaler Callback progress(rows=, images=, total=)
             clean: Alte Datenbank löschen
             custom_output: Benutzerdefiniertes Output-Verzeichnis
             
@@ -36,7 +50,7 @@ class CardpressoManager:
                 output_dir = custom_output
             else:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                if member_ids:
+                if member_ids is not None or queryset is not None:
                     output_dir = f"cardpresso_batch_{timestamp}"
                 else:
                     output_dir = f"cardpresso_full_{timestamp}"
@@ -47,16 +61,23 @@ class CardpressoManager:
             logger.info(f"Erstelle Cardpresso-Datenbank: {full_output_path}")
             
             # Management Command mit Parametern aufrufen
-            command_args = [
-                'create_cardpresso_db',
-                f'--output-dir={output_dir}',
-            ]
+            command_options = {
+                'output_dir': full_output_path,
+                'clean': clean,
+                'verbosity': 1,
+                'stdout': io.StringIO(),  # Output nicht in die Konsole des Webservers
+            }
             
-            if clean:
-                command_args.append('--clean')
+            # Nur die ausgewählten Mitglieder exportieren
+            if member_ids is not None:
+                command_options['member_ids'] = [int(member_id) for member_id in member_ids]
+            if queryset is not None:
+                command_options['queryset'] = queryset
+            if progress is not None:
+                command_options['progress'] = progress
             
             # Command ausführen und Output erfassen
-            call_command(*command_args, verbosity=1)
+            call_command('create_cardpresso_db', **command_options)
             
             # Erfolg prüfen
             db_path = os.path.join(full_output_path, 'database', 'cardpresso_indexed.sqlite')
@@ -65,8 +86,9 @@ class CardpressoManager:
             if not os.path.exists(db_path):
                 raise Exception("Datenbank wurde nicht erstellt")
             
-            # Statistiken sammeln
+            # Statistiken aus dem Export-Manifest, Export im Verzeichnis eintragen
             stats = self._collect_stats(full_output_path, db_path, images_path)
+            self._register_export(full_output_path, stats)
             
             logger.info(f"Cardpresso-Datenbank erfolgreich erstellt: {stats}")
             
@@ -96,7 +118,29 @@ class CardpressoManager:
             }
     
     def _collect_stats(self, base_path, db_path, images_path):
-        """Sammelt Statistiken über die erstellte Datenbank"""
+        """
+        Statistiken eines Exports - aus dessen export_manifest.json.
+        
+        Nur Exporte ohne Manifest (ältere Versionen) werden noch gezählt und
+        vermessen.
+        """
+        manifest = read_export_manifest(base_path)
+        if manifest is not None:
+            return self._stats_from_manifest(manifest)
+        return self._scan_stats(base_path, db_path, images_path)
+    
+    @staticmethod
+    def _stats_from_manifest(manifest):
+        stats = dict(manifest)
+        stats.update({
+            'db_size_kb': round(manifest['db_size_bytes'] / 1024, 2),
+            'total_size_kb': round(manifest['total_size_bytes'] / 1024, 2),
+            'has_images': manifest['image_count'] > 0,
+        })
+        return stats
+    
+    def _scan_stats(self, base_path, db_path, images_path):
+        """Sammelt Statistiken über die erstellte Datenbank (Exporte ohne Manifest)"""
         import sqlite3
         
         stats = {
@@ -139,14 +183,82 @@ class CardpressoManager:
         
         return stats
     
+    def read_index(self):
+        """Eingetragene Exporte, neuester zuerst (leer, wenn es noch kein Verzeichnis gibt)"""
+        try:
+            with open(self.index_path, encoding='utf-8') as handle:
+                return json.load(handle).get('exports', [])
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Export-Verzeichnis {self.index_path} nicht lesbar: {e}")
+            return []
+    
+    def _write_index(self, exports):
+        write_json_atomic(self.index_path, {'exports': exports[:EXPORT_INDEX_LIMIT]})
+    
+    @contextmanager
+    def _index_lock(self):
+        """Exklusive Sperre für Lesen-Ändern-Schreiben des Export-Verzeichnisses (Worker, Views)"""
+        with open(f"{self.index_path}.lock", 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+    
+    def _update_index(self, change):
+        """
+        Ändert das Export-Verzeichnis unter der Sperre.
+        
+        Args:
+            change: Funktion(Einträge) -> neue Einträge oder None (keine Änderung)
+        """
+        with self._index_lock():
+            exports = change(self.read_index())
+            if exports is not None:
+                self._write_index(exports)
+    
+    def _register_export(self, path, stats):
+        """Trägt einen fertigen Export vorne im Export-Verzeichnis ein"""
+        path = os.path.abspath(path)
+        
+        def register(exports):
+            exports = [entry for entry in exports if entry['path'] != path]
+            exports.insert(0, {'path': path, 'stats': stats})
+            return exports
+        
+        try:
+            self._update_index(register)
+        except OSError as e:
+            logger.warning(f"Export konnte nicht eingetragen werden: {e}")
+    
+    def _export_dirs(self):
+        """Export-Verzeichnisse im Ausgabeordner (nur für Exporte ohne Eintrag im Verzeichnis)"""
+        return [
+            d for d in os.listdir(self.base_dir) 
+            if d.startswith(EXPORT_DIR_PREFIXES)
+            and os.path.isdir(os.path.join(self.base_dir, d))
+        ]
+    
     def get_latest_database(self):
         """Findet die neueste Cardpresso-Datenbank"""
         try:
-            cardpresso_dirs = [
-                d for d in os.listdir(self.base_dir) 
-                if d.startswith(('cardpresso_', 'cardpresso_export_', 'cardpresso_batch_', 'cardpresso_full_'))
-                and os.path.isdir(os.path.join(self.base_dir, d))
-            ]
+            # Export-Verzeichnis: neuester Eintrag, dessen Datenbank noch existiert
+            for entry in self.read_index():
+                db_file = entry['stats'].get('db_file', os.path.join('database', 'cardpresso_indexed.sqlite'))
+                db_path = os.path.join(entry['path'], db_file)
+                if os.path.exists(db_path):
+                    return {
+                        'path': entry['path'],
+                        'db_path': db_path,
+                        'images_path': os.path.join(entry['path'], 'images'),
+                        'exists': True,
+                        'stats': entry['stats'],
+                    }
+            
+            # Ohne Verzeichnis (ältere Exporte): Ausgabeordner durchsuchen
+            cardpresso_dirs = self._export_dirs()
             
             if not cardpresso_dirs:
                 return None
@@ -177,11 +289,7 @@ class CardpressoManager:
     def cleanup_old_databases(self, keep_count=3):
         """Löscht alte Cardpresso-Datenbanken (behält nur die neuesten)"""
         try:
-            cardpresso_dirs = [
-                d for d in os.listdir(self.base_dir) 
-                if d.startswith(('cardpresso_', 'cardpresso_export_', 'cardpresso_batch_', 'cardpresso_full_'))
-                and os.path.isdir(os.path.join(self.base_dir, d))
-            ]
+            cardpresso_dirs = self._export_dirs()
             
             if len(cardpresso_dirs) <= keep_count:
                 return {'cleaned': 0, 'kept': len(cardpresso_dirs)}
@@ -192,6 +300,7 @@ class CardpressoManager:
             # Alte löschen
             to_delete = cardpresso_dirs[:-keep_count]
             cleaned_count = 0
+            deleted_paths = set()
             
             for dir_name in to_delete:
                 dir_path = os.path.join(self.base_dir, dir_name)
@@ -199,10 +308,19 @@ class CardpressoManager:
                     import shutil
                     shutil.rmtree(dir_path)
                     cleaned_count += 1
+                    deleted_paths.add(os.path.abspath(dir_path))
                     logger.info(f"Alte Cardpresso-Datenbank gelöscht: {dir_path}")
                 except Exception as e:
                     logger.warning(f"Konnte {dir_path} nicht löschen: {e}")
             
+            # Gelöschte Exporte aus dem Verzeichnis austragen
+            if deleted_paths:
+                def unregister(exports):
+                    remaining = [entry for entry in exports if entry['path'] not in deleted_paths]
+                    return remaining if len(remaining) != len(exports) else None
+                
+                self._update_index(unregister)
+            
             return {'cleaned': cleaned_count, 'kept': len(cardpresso_dirs) - cleaned_count}
             
         except Exception as e:
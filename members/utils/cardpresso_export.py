@@ -0,0 +1,511 @@
+# members/utils/cardpresso_export.py - Cardpresso-Export: ein Durchlauf, deklarative Schema-Profile
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from members.models import Member
+from members.utils.cardpresso_writer import CardpressoWriter
+from members.utils.storage import is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+# Projektion - keine Model-Instanzen, nur diese Spalten
+EXPORT_FIELDS = (
+    'id', 'personnel_number', 'first_name', 'last_name', 'birth_date', 'member_type',
+    'card_number_prefix', 'card_number', 'issued_date', 'valid_until', 'is_active',
+    'profile_picture', 'created_at', 'updated_at',
+)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Kennzahlen eines Exports (im Projektverzeichnis, beim Build geschrieben)
+EXPORT_MANIFEST_NAME = 'export_manifest.json'
+EXPORT_MANIFEST_VERSION = 1
+
+MEMBER_TYPE_LABELS = dict(Member.MEMBER_TYPE_CHOICES)
+
+# Baseline-JPEG für Cardpresso (die Master-Passbilder sind progressiv)
+TRANSCODE_SAVE_KWARGS = {
+    'format': 'JPEG',
+    'quality': 92,
+    'dpi': (300, 300),
+    'progressive': False,
+    'subsampling': 0,
+}
+
+
+def _date(value, fmt):
+    return value.strftime(fmt) if value else ''
+
+
+def _card_number(row):
+    return f"{row['card_number_prefix'] or ''}{row['card_number'] or ''}".strip()
+
+
+def _full_name(row):
+    return f"{row['first_name'] or ''} {row['last_name'] or ''}".strip()
+
+
+class CardpressoProfile:
+    """
+    Tabellen-Layout einer Cardpresso-Datenbank.
+
+    columns: (Spalte, SQL-Typ, Wert) - Wert ist eine Funktion (Zeile, Foto)
+    mit der values()-Zeile des Mitglieds und dem exportierten Foto (ExportPhoto
+    oder None).
+    photo_filename: Dateiname des Fotos im Bilder-Verzeichnis
+    name_fallback: Fotos ohne Profilbild über 'vorname.nachname.jpg' suchen
+    """
+
+    def __init__(self, name, columns, indexes=(), photo_filename=None, name_fallback=False, replace=False,
+                 description=''):
+        self.name = name
+        self.columns = columns
+        self.indexes = indexes
+        self.photo_filename = photo_filename or (lambda row, basename: basename)
+        self.name_fallback = name_fallback
+        self.replace = replace
+        self.description = description
+
+    @property
+    def create_sql(self):
+        columns = ',\n'.join(f'    {name} {sql_type}' for name, sql_type, _value in self.columns)
+        return f'CREATE TABLE IF NOT EXISTS members (\n{columns}\n)'
+
+    @property
+    def insert_sql(self):
+        return self._insert_sql(self.replace)
+
+    def _insert_sql(self, replace):
+        names = ', '.join(name for name, _sql_type, _value in self.columns)
+        placeholders = ', '.join('?' for _column in self.columns)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        return f'{verb} INTO members ({names}) VALUES ({placeholders})'
+
+    def build_row(self, row, photo):
+        return tuple(value(row, photo) for _name, _sql_type, value in self.columns)
+
+    def writer(self, db_path, upsert=False, **kwargs):
+        """CardpressoWriter für dieses Layout (upsert: bestehende Zeilen ersetzen)"""
+        insert_sql = self._insert_sql(True) if upsert else self.insert_sql
+        return CardpressoWriter(db_path, self.create_sql, insert_sql, self.indexes, **kwargs)
+
+
+# Layout von create_cardpresso_db (Cardpresso-Vorlagen der Dienstausweise):
+# deutsche Datumsangaben, Foto als Dateiname ohne Endung
+INDEXED_PROFILE = CardpressoProfile(
+    'indexed',
+    columns=[
+        ('id', 'INTEGER PRIMARY KEY', lambda row, photo: row['id']),
+        ('personalnummer', 'TEXT', lambda row, photo: row['personnel_number'] or ''),
+        ('vorname', 'TEXT', lambda row, photo: row['first_name'] or ''),
+        ('nachname', 'TEXT', lambda row, photo: row['last_name'] or ''),
+        ('vollname', 'TEXT', lambda row, photo: _full_name(row)),
+        ('telefon', 'TEXT', lambda row, photo: '123-456-789'),  # Dummy-Telefon - wie im Original
+        ('geburtsdatum', 'TEXT', lambda row, photo: _date(row['birth_date'], '%d.%m.%Y')),
+        ('ausweisnummer', 'TEXT', lambda row, photo: _card_number(row)),
+        ('kartenprefix', 'TEXT', lambda row, photo: row['card_number_prefix'] or ''),
+        ('kartennummer', 'TEXT', lambda row, photo: row['card_number'] or ''),
+        ('ausstellungsdatum', 'TEXT', lambda row, photo: _date(row['issued_date'], '%d.%m.%Y')),
+        ('gueltig_bis', 'TEXT', lambda row, photo: _date(row['valid_until'], '%d.%m.%Y')),
+        ('mitgliedertyp', 'TEXT', lambda row, photo: MEMBER_TYPE_LABELS.get(row['member_type'], row['member_type'])),
+        ('aktiv', 'TEXT', lambda row, photo: 'JA' if row['is_active'] else 'NEIN'),
+        ('photo', 'TEXT', lambda row, photo: os.path.splitext(photo.filename)[0] if photo else ''),
+    ],
+    indexes=(
+        'CREATE INDEX IF NOT EXISTS idx_members_ausweisnummer ON members (ausweisnummer)',
+        'CREATE INDEX IF NOT EXISTS idx_members_name ON members (nachname, vorname)',
+        'CREATE INDEX IF NOT EXISTS idx_members_personalnummer ON members (personalnummer)',
+    ),
+    name_fallback=True,
+    replace=True,
+    description='cardpresso_indexed.sqlite (dd.mm.yyyy, Foto-Name ohne Endung)',
+)
+
+# Layout von export_cardpresso: ISO-Datumsangaben, absoluter Foto-Pfad
+LEGACY_PROFILE = CardpressoProfile(
+    'legacy',
+    columns=[
+        ('id', 'INTEGER PRIMARY KEY', lambda row, photo: row['id']),
+        ('personalnummer', 'TEXT', lambda row, photo: row['personnel_number'] or ''),
+        ('vorname', 'TEXT', lambda row, photo: row['first_name'] or ''),
+        ('nachname', 'TEXT', lambda row, photo: row['last_name'] or ''),
+        ('vollname', 'TEXT', lambda row, photo: _full_name(row)),
+        ('kartenprefix', 'TEXT', lambda row, photo: row['card_number_prefix'] or ''),
+        ('kartennummer', 'TEXT', lambda row, photo: row['card_number'] or ''),
+        ('vollkartennummer', 'TEXT', lambda row, photo: _card_number(row)),
+        ('mitgliedertyp', 'TEXT', lambda row, photo: MEMBER_TYPE_LABELS.get(row['member_type'], row['member_type'])),
+        ('geburtsdatum', 'TEXT', lambda row, photo: _date(row['birth_date'], '%Y-%m-%d')),
+        ('ausstellungsdatum', 'TEXT', lambda row, photo: _date(row['issued_date'], '%Y-%m-%d')),
+        ('gueltig_bis', 'TEXT', lambda row, photo: _date(row['valid_until'], '%Y-%m-%d')),
+        ('aktiv', 'TEXT', lambda row, photo: 'Ja' if row['is_active'] else 'Nein'),
+        ('foto_pfad', 'TEXT', lambda row, photo: os.path.abspath(photo.path) if photo else ''),
+        ('foto_dateiname', 'TEXT', lambda row, photo: photo.filename if photo else ''),
+        ('erstellt_am', 'TEXT', lambda row, photo: _date(row['created_at'], '%Y-%m-%d %H:%M:%S')),
+        ('aktualisiert_am', 'TEXT', lambda row, photo: _date(row['updated_at'], '%Y-%m-%d %H:%M:%S')),
+    ],
+    indexes=(
+        'CREATE INDEX IF NOT EXISTS idx_members_vollkartennummer ON members (vollkartennummer)',
+        'CREATE INDEX IF NOT EXISTS idx_members_name ON members (nachname, vorname)',
+    ),
+    photo_filename=lambda row, basename: f"member_{row['id']}_{basename}",
+    description='cardpresso.sqlite (ISO-Datum, absoluter Foto-Pfad)',
+)
+
+PROFILES = {profile.name: profile for profile in (INDEXED_PROFILE, LEGACY_PROFILE)}
+
+
+class ExportPhoto:
+    """Foto eines Mitglieds im Export: Quelle und Datei, auf die die Zeile verweist"""
+
+    def __init__(self, source, filename, path):
+        self.source = source
+        self.filename = filename
+        self.path = path
+
+
+class PhotoIndex:
+    """
+    Schnappschuss von MEDIA_ROOT/profile_pics aus einem scandir-Durchlauf.
+
+    Ersetzt die os.path.exists-Proben je Mitglied: Profilbilder und die
+    alten Dateinamen 'vorname.nachname.jpg' werden im Speicher nachgeschlagen.
+    """
+
+    def __init__(self, media_root=None, directory='profile_pics'):
+        self.media_root = str(media_root or settings.MEDIA_ROOT)
+        self.entries = {}
+        root = os.path.join(self.media_root, directory)
+        self._scan(root, directory, depth=0)
+
+    def _scan(self, path, relative, depth):
+        try:
+            iterator = os.scandir(path)
+        except FileNotFoundError:
+            return
+        with iterator:
+            for entry in iterator:
+                name = f'{relative}/{entry.name}'
+                if entry.is_file():
+                    self.entries[name] = entry
+                elif depth == 0 and entry.is_dir():
+                    # Inhaltsadressierte Ablage: profile_pics/ab/ab12….jpg
+                    self._scan(entry.path, name, depth + 1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resolve(self, picture_name, first_name, last_name, name_fallback=True):
+        """
+        Quelldatei des Fotos eines Mitglieds.
+
+        Returns:
+            os.DirEntry oder None (stat() des Eintrags wird zwischengespeichert)
+        """
+        if picture_name and picture_name in self.entries:
+            return self.entries[picture_name]
+
+        # Alte Dateinamen vorname.nachname (wie im Original)
+        if name_fallback and first_name and last_name:
+            for base_name in (f"{first_name.lower()}.{last_name.lower()}", f"{first_name}.{last_name}"):
+                for ext in PHOTO_EXTENSIONS:
+                    entry = self.entries.get(f'profile_pics/{base_name}{ext}')
+                    if entry is not None:
+                        return entry
+        return None
+
+
+def file_sha256(path):
+    """SHA-256 einer Datei, blockweise gelesen"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """JSON-Datei über eine temporäre Datei atomar ersetzen"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def write_export_manifest(project_dir, db_path, profile, member_count, member_id_range, image_paths, duration,
+                          **extra):
+    """
+    Schreibt die Kennzahlen eines Exports nach <Projekt>/export_manifest.json.
+
+    Alles wird beim Build erhoben (die Bilder sind gerade geschrieben, die
+    Datenbank ist gerade ausgetauscht) - Status-Abfragen lesen danach nur
+    noch diese Datei statt SQLite zu öffnen und Verzeichnisse zu durchlaufen.
+
+    Returns:
+        dict: Das geschriebene Manifest
+    """
+    db_size = os.path.getsize(db_path)
+    images_size = sum(os.path.getsize(path) for path in image_paths)
+    manifest = {
+        'version': EXPORT_MANIFEST_VERSION,
+        'profile': profile,
+        'created_at': datetime.now().isoformat(),
+        'duration_s': round(duration, 3),
+        'member_count': member_count,
+        'member_id_min': member_id_range[0],
+        'member_id_max': member_id_range[1],
+        'image_count': len(image_paths),
+        'images_size_bytes': images_size,
+        'db_file': os.path.relpath(db_path, project_dir),
+        'db_size_bytes': db_size,
+        'db_sha256': file_sha256(db_path),
+        'total_size_bytes': db_size + images_size,
+    }
+    manifest.update(extra)
+    write_json_atomic(os.path.join(project_dir, EXPORT_MANIFEST_NAME), manifest)
+    return manifest
+
+
+def read_export_manifest(project_dir):
+    """Manifest eines Exports oder None (Exporte von vor dem Manifest)"""
+    try:
+        with open(os.path.join(project_dir, EXPORT_MANIFEST_NAME), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def transcode_photo(task):
+    """
+    Schreibt ein Foto als Baseline-JPEG (300 DPI) - läuft im Prozess-Pool.
+
+    Returns:
+        tuple: (Ziel, Fehlermeldung oder None)
+    """
+    source, target = task
+    try:
+        from PIL import Image
+        from members.utils.images import _to_rgb
+
+        with Image.open(source) as img:
+            img.load()
+            _to_rgb(img).save(target, **TRANSCODE_SAVE_KWARGS)
+        return target, None
+    except Exception as e:
+        return target, str(e)
+
+
+def copy_photo(source, target):
+    """Kopiert ein Foto - gleichnamige inhaltsadressierte Kopien sind identisch und bleiben stehen"""
+    if is_content_addressed(target) and os.path.exists(target):
+        return False
+    shutil.copy2(source, target)
+    return True
+
+
+class CardpressoExporter:
+    """
+    Exportiert Mitglieder in eine Cardpresso-Datenbank nach einem Profil.
+
+    Ein Durchlauf über eine values()-Projektion mit iterator(): je Zeile
+    wird das Foto gegen einen PhotoIndex aufgelöst, ins Bilder-Verzeichnis
+    kopiert oder - mit transcode - im Prozess-Pool in Baseline-JPEG
+    umgewandelt, und die Zeile über den CardpressoWriter geschrieben
+    (Staging-Datei, atomarer Austausch).
+
+    Die Kosten hängen von der Zeilenzahl ab, nicht von Dateisystem-Proben.
+    """
+
+    def __init__(self, profile, db_path, images_dir=None, transcode=False, workers=None, photo_index=None):
+        self.profile = PROFILES[profile] if isinstance(profile, str) else profile
+        self.db_path = db_path
+        self.images_dir = images_dir
+        self.transcode = transcode
+        self.workers = workers or os.cpu_count() or 1
+        self.photo_index = photo_index
+        self.rows = 0
+        self.photos = 0
+        self.copied = 0
+        self.errors = []
+        self.timings = {}
+        self.member_id_range = (None, None)
+        # Geschriebene Dateien im Bilder-Verzeichnis (gemeinsame Fotos einmal)
+        self.image_paths = set()
+        self._failed = set()
+        self._executor = None
+
+    def _timed(self, phase, started):
+        self.timings[phase] = self.timings.get(phase, 0.0) + (time.perf_counter() - started)
+
+    def resolve_photo(self, row):
+        """Quelldatei (os.DirEntry) des Fotos einer values()-Zeile oder None"""
+        if self.photo_index is None:
+            self.photo_index = PhotoIndex()
+        return self.photo_index.resolve(
+            row['profile_picture'], row['first_name'], row['last_name'], self.profile.name_fallback
+        )
+
+    def export_photo(self, row, entry):
+        """ExportPhoto für ein Mitglied ohne Kopie (Kopie/Umwandlung: run bzw. write_photo)"""
+        if entry is None:
+            return None
+        if not self.images_dir:
+            return ExportPhoto(entry.path, entry.name, entry.path)
+        filename = self.profile.photo_filename(row, entry.name)
+        if self.transcode:
+            filename = f'{os.path.splitext(filename)[0]}.jpg'
+        return ExportPhoto(entry.path, filename, os.path.join(self.images_dir, filename))
+
+    def write_photo(self, photo):
+        """Einzelnes Foto sofort kopieren bzw. umwandeln (inkrementeller Abgleich)"""
+        if self.transcode:
+            _target, error = transcode_photo((photo.source, photo.path))
+            if error:
+                raise OSError(error)
+            return True
+        return copy_photo(photo.source, photo.path)
+
+    def _place_photo(self, row, photo, pending):
+        """
+        Legt das Foto einer Zeile im Bilder-Verzeichnis ab.
+
+        Kopien laufen sofort; Umwandlungen gehen an den Prozess-Pool und
+        werden in `pending` (Ziel -> [Future, Mitglieder-IDs]) gesammelt.
+        Gemeinsame Fotos (gleicher Hash) werden nur einmal geschrieben.
+
+        Returns:
+            ExportPhoto oder None, wenn die Kopie fehlgeschlagen ist
+        """
+        if photo.path in self.image_paths:
+            return photo
+        if photo.path in pending:
+            pending[photo.path][1].append(row['id'])
+            return photo
+        if self.transcode:
+            pending[photo.path] = [self._executor.submit(transcode_photo, (photo.source, photo.path)), [row['id']]]
+            return photo
+        if photo.path in self._failed:
+            return None
+        try:
+            if copy_photo(photo.source, photo.path):
+                self.copied += 1
+        except OSError as e:
+            self._failed.add(photo.path)
+            self.errors.append(f"{photo.filename}: {e}")
+            return None
+        self.image_paths.add(photo.path)
+        return photo
+
+    def _finish_transcodes(self, writer, queryset, pending, progress=None):
+        """
+        Wartet auf die Umwandlungen und nimmt Fotos, die nicht umgewandelt
+        werden konnten, wieder aus ihren (bereits geschriebenen) Zeilen.
+        """
+        failed_ids = []
+        for target, (future, member_ids) in pending.items():
+            _target, error = future.result()
+            if error:
+                self.errors.append(f"{os.path.basename(target)}: {error}")
+                failed_ids.extend(member_ids)
+                continue
+            self.copied += 1
+            self.image_paths.add(target)
+            if progress:
+                progress(images=self.copied)
+
+        if failed_ids:
+            # Nur die betroffenen Zeilen erneut lesen und ohne Foto schreiben
+            writer.flush()
+            writer.executemany("DELETE FROM members WHERE id = ?", [(member_id,) for member_id in failed_ids])
+            for row in queryset.filter(id__in=failed_ids).values(*EXPORT_FIELDS).order_by('id'):
+                writer.add(self.profile.build_row(row, None))
+            self.photos -= len(failed_ids)
+
+    def run(self, queryset=None, progress=None, inspect=None):
+        """
+        Führt den Export in einem Durchlauf über die Mitglieder aus.
+
+        Jede Zeile wird einmal gelesen: Foto auflösen, ablegen (Kopie sofort,
+        Umwandlung im Prozess-Pool parallel zum Weiterlesen) und die Zeile
+        schreiben. Nur Mitglieder, deren Foto nicht umgewandelt werden
+        konnte, werden am Ende erneut gelesen.
+
+        Args:
+            progress: Optionaler Callback progress(rows=, images=, total=)
+            inspect: Optionale Funktion(writer), läuft vor dem Austausch auf der
+                fertigen Tabelle (z.B. Statistiken); das Ergebnis steht in self.inspected
+
+        Returns:
+            CardpressoExporter: self mit Zählern, Fehlern und Phasen-Zeiten
+        """
+        total_started = time.perf_counter()
+        queryset = Member.objects.all() if queryset is None else queryset
+        total = queryset.count() if progress else None
+
+        started = time.perf_counter()
+        if self.photo_index is None:
+            self.photo_index = PhotoIndex()
+        if self.images_dir:
+            os.makedirs(self.images_dir, exist_ok=True)
+        self._timed('fotos_index', started)
+
+        started = time.perf_counter()
+        pending = {}
+        self._failed = set()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers) if self.transcode and self.images_dir else None
+        try:
+            with self.profile.writer(self.db_path) as writer:
+                first_id = last_id = None
+                for row in queryset.values(*EXPORT_FIELDS).order_by('id').iterator(chunk_size=2000):
+                    photo = self.export_photo(row, self.resolve_photo(row))
+                    if photo and self.images_dir:
+                        photo = self._place_photo(row, photo, pending)
+                    if photo:
+                        self.photos += 1
+                    writer.add(self.profile.build_row(row, photo))
+                    if first_id is None:
+                        first_id = row['id']
+                    last_id = row['id']
+                    self.rows += 1
+                    if progress and self.rows % 500 == 0:
+                        progress(rows=self.rows, images=self.photos, total=total)
+                self._timed('zeilen', started)
+
+                if pending:
+                    started = time.perf_counter()
+                    self._finish_transcodes(writer, queryset, pending, progress)
+                    self._timed('fotos_umwandeln', started)
+                self.inspected = inspect(writer) if inspect else None
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+        self.member_id_range = (first_id, last_id)
+
+        if progress:
+            progress(rows=self.rows, images=self.photos, total=total)
+
+        self.timings['gesamt'] = time.perf_counter() - total_started
+        logger.info(
+            f"Cardpresso-Export ({self.profile.name}): {self.rows} Zeilen, {self.photos} Fotos, "
+            f"{self.copied} geschrieben, {len(self.errors)} Fehler, Zeiten: {self.format_timings()}"
+        )
+        return self
+
+    def write_manifest(self, project_dir):
+        """Kennzahlen dieses Exports als export_manifest.json ablegen (nach run())"""
+        return write_export_manifest(
+            project_dir, self.db_path, self.profile.name, self.rows, self.member_id_range,
+            sorted(self.image_paths), self.timings.get('gesamt', 0.0),
+            photo_count=self.photos, images_written=self.copied, errors=len(self.errors),
+            timings={phase: round(seconds, 3) for phase, seconds in self.timings.items()},
+        )
+
+    def format_timings(self):
+        return ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
@@ -0,0 +1,158 @@
+# members/utils/cardpresso_writer.py - Cardpresso-SQLite in einer Staging-Datei bauen und atomar austauschen
+
+import os
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Zeilen pro executemany
+DEFAULT_BATCH_SIZE = 1000
+
+# Bulk-Load: kein Journal, kein fsync pro Transaktion, großer Seiten-Cache.
+# Unkritisch, da die Staging-Datei bei einem Abbruch ohnehin verworfen wird.
+BULK_LOAD_PRAGMAS = (
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA cache_size = -32768',  # 32 MB
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA locking_mode = EXCLUSIVE',
+)
+
+
+def _fsync_path(path):
+    """Datei bzw. Verzeichnis auf die SD-Karte schreiben (Verzeichnis: für das Umbenennen)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class CardpressoWriter:
+    """
+    Schreibt eine Cardpresso-Datenbank, ohne die Zieldatei anzufassen,
+    bis sie vollständig ist.
+
+    Gebaut wird in <Ziel>.partial im selben Verzeichnis (Bulk-Load-Pragmas,
+    executemany in Blöcken), Indizes entstehen erst nach dem Laden. Zum
+    Schluss ersetzt os.replace() die Zieldatei atomar - Cardpresso sieht
+    entweder die alte oder die neue Datenbank, nie eine halbe. Eine von
+    Cardpresso geöffnete alte Datei bleibt für Cardpresso bis zum Schließen
+    lesbar.
+
+    Mit from_target=True startet der Build mit einer Kopie der bestehenden
+    Datenbank (für inkrementelle Abgleiche).
+
+    Beispiel:
+        with CardpressoWriter(db_path, CREATE_TABLE_SQL, INSERT_SQL, INDEXES) as writer:
+            for row in rows:
+                writer.add(row)
+
+    Die Tabellen-Layouts liegen in members.utils.cardpresso_export.
+    """
+
+    def __init__(self, target_path, create_sql, insert_sql, indexes=(), batch_size=DEFAULT_BATCH_SIZE,
+                 from_target=False):
+        self.target_path = target_path
+        self.staging_path = f"{target_path}.partial"
+        self.create_sql = create_sql
+        self.insert_sql = insert_sql
+        self.indexes = indexes
+        self.batch_size = batch_size
+        self.from_target = from_target
+        self.connection = None
+        self.rows_written = 0
+        self._batch = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            try:
+                self.commit()
+            except BaseException:
+                # z.B. Index-Fehler oder volle SD-Karte beim Abschließen
+                self.discard()
+                raise
+        else:
+            self.discard()
+        return False
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.target_path)), exist_ok=True)
+        self._remove_staging()
+
+        self.connection = sqlite3.connect(self.staging_path, isolation_level=None)
+        if self.from_target and os.path.exists(self.target_path):
+            # Konsistenter Schnappschuss, auch wenn Cardpresso die Datei gerade liest
+            source = sqlite3.connect(f"file:{self.target_path}?mode=ro", uri=True)
+            try:
+                source.backup(self.connection)
+            finally:
+                source.close()
+
+        for pragma in BULK_LOAD_PRAGMAS:
+            self.connection.execute(pragma)
+        self.connection.execute('BEGIN')
+        self.connection.execute(self.create_sql)
+        return self
+
+    def add(self, row):
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def execute(self, sql, params=()):
+        """Weitere Anweisungen in derselben Transaktion (offene Zeilen werden vorher geschrieben)"""
+        self.flush()
+        return self.connection.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        self.flush()
+        return self.connection.executemany(sql, rows)
+
+    def flush(self):
+        if self._batch:
+            self.connection.executemany(self.insert_sql, self._batch)
+            self.rows_written += len(self._batch)
+            self._batch = []
+
+    def commit(self):
+        """Indizes anlegen, Staging-Datei abschließen und über das Ziel schieben"""
+        self.flush()
+        for index_sql in self.indexes:
+            self.connection.execute(index_sql)
+        self.connection.execute('COMMIT')
+        self.connection.execute('PRAGMA optimize')
+        self.connection.close()
+        self.connection = None
+
+        _fsync_path(self.staging_path)
+        os.replace(self.staging_path, self.target_path)
+        _fsync_path(os.path.dirname(os.path.abspath(self.target_path)))
+        logger.info(f"Cardpresso-Datenbank geschrieben: {self.target_path} ({self.rows_written} Zeilen)")
+
+    def discard(self):
+        """Build abbrechen - die Zieldatei bleibt unverändert"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self._remove_staging()
+        logger.warning(f"Cardpresso-Build verworfen, {self.target_path} unverändert")
+
+    def _remove_staging(self):
+        for path in (self.staging_path, f"{self.staging_path}-journal"):
+            if os.path.exists(path):
+                os.remove(path)
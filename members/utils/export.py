@@ -0,0 +1,148 @@
+# members/utils/export.py - Streaming-Export der Mitgliederdaten
+
+import csv
+import zlib
+import tempfile
+from openpyxl import Workbook
+from members.models import Member
+
+# Spalten des Exports: (Überschrift, Modellfeld)
+EXPORT_COLUMNS = [
+    ('Vorname', 'first_name'),
+    ('Nachname', 'last_name'),
+    ('Geburtsdatum', 'birth_date'),
+    ('Personalnummer', 'personnel_number'),
+    ('Mitarbeitertyp', 'member_type'),
+    ('Mitarbeitertyp_Code', 'member_type'),  # Für Re-Import
+    ('Ausweisnummer', 'card_number'),
+    ('Ausweisnummer_Praefix', 'card_number_prefix'),
+    ('Ausgestellt_am', 'issued_date'),
+    ('Gueltig_bis', 'valid_until'),
+    ('Manuelle_Gueltigkeit', 'manual_validity'),
+    ('Aktiv', 'is_active'),
+    ('Erstellt_am', 'created_at'),
+]
+
+EXPORT_HEADER = [header for header, _field in EXPORT_COLUMNS]
+
+# Nur die benötigten Spalten aus der Datenbank lesen
+EXPORT_FIELDS = [
+    'first_name', 'last_name', 'birth_date', 'personnel_number', 'member_type',
+    'card_number', 'card_number_prefix', 'issued_date', 'valid_until',
+    'manual_validity', 'is_active', 'created_at',
+]
+
+# Zeilen pro Datenbank-Fetch
+EXPORT_CHUNK_SIZE = 2000
+# Puffergröße, ab der ein Block an den Client geht
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def _format_date(value):
+    return value.strftime('%d.%m.%Y') if value else ''
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Liefert die Exportzeilen lazy als Listen - ohne Model-Instanzen,
+    mit konstantem Speicherbedarf unabhängig von der Anzahl Mitglieder.
+    """
+    type_names = dict(Member.MEMBER_TYPE_CHOICES)
+
+    for (first_name, last_name, birth_date, personnel_number, member_type,
+         card_number, card_number_prefix, issued_date, valid_until,
+         manual_validity, is_active, created_at) in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        yield [
+            first_name,
+            last_name,
+            _format_date(birth_date),
+            personnel_number or '',
+            type_names.get(member_type, member_type),
+            member_type,
+            card_number,
+            card_number_prefix or '',
+            _format_date(issued_date),
+            _format_date(valid_until),
+            'Ja' if manual_validity else 'Nein',
+            'Ja' if is_active else 'Nein',
+            created_at.strftime('%d.%m.%Y %H:%M'),
+        ]
+
+
+class _LineBuffer:
+    """Pseudo-Datei für csv.writer, sammelt geschriebene Zeilen"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        self.parts.append(value)
+        self.size += len(value)
+
+    def drain(self):
+        data = ''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def stream_csv(rows, header=EXPORT_HEADER, compress=False):
+    """
+    Erzeugt den CSV-Export blockweise als Bytes (UTF-8 mit BOM für Excel).
+
+    Args:
+        rows: Iterable der Datenzeilen
+        header: Spaltenüberschriften
+        compress: Ausgabe on-the-fly gzip-komprimieren
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.size >= STREAM_BLOCK_SIZE:
+            block = emit(buffer.drain())
+            if block:
+                yield block
+
+    block = emit(buffer.drain())
+    if compressor:
+        block += compressor.flush()
+    if block:
+        yield block
+
+
+def build_xlsx(rows, header=EXPORT_HEADER, sheet_name='Mitglieder'):
+    """
+    Schreibt den Excel-Export mit einer openpyxl write-only Arbeitsmappe.
+
+    Die Zeilen gehen direkt vom Datenbank-Cursor in die Arbeitsmappe,
+    das Ergebnis liegt in einer temporären Datei statt im Speicher.
+
+    Returns:
+        Temporäre Datei (auf Position 0), wird beim Schließen gelöscht
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        workbook.save(output)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output
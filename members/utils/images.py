@@ -0,0 +1,331 @@
+# members/utils/images.py - Passbild-Verarbeitung für den Dienstausweis-Druck
+
+import io
+import math
+import hashlib
+import logging
+from django.core.files.base import ContentFile
+from PIL import Image, ExifTags
+
+logger = logging.getLogger(__name__)
+
+# Zielformat für Dienstausweis (HOCHFORMAT Passbild)
+PORTRAIT_SIZE = (267, 400)
+PORTRAIT_DPI = (300, 300)
+
+# Optimierte JPEG-Einstellungen für Druck
+PORTRAIT_SAVE_KWARGS = {
+    'format': 'JPEG',
+    'quality': 95,  # Höhere Qualität für Druck
+    'optimize': True,
+    'dpi': PORTRAIT_DPI,
+    'progressive': True,  # Progressive JPEG für bessere Kompression
+    'subsampling': 0,  # Keine Farbunterabtastung für beste Qualität
+}
+
+# EXIF-Orientierung -> Rotation gegen den Uhrzeigersinn
+EXIF_ROTATIONS = {3: 180, 6: 270, 8: 90}
+
+ORIENTATION_TAG = next(tag for tag, name in ExifTags.TAGS.items() if name == 'Orientation')
+
+# Formate, die libjpeg schon beim Dekodieren verkleinern kann (1/2, 1/4, 1/8)
+DRAFT_FORMATS = ('JPEG', 'MPO')
+
+# Standard für settings.PHOTO_MAX_PIXELS: 16 MP = ca. 48 MB RGB-Puffer
+DEFAULT_MAX_PIXELS = 16_000_000
+
+
+class ImageTooLarge(ValueError):
+    """Das Bild würde beim Dekodieren das Pixel-Budget überschreiten"""
+
+
+def content_hash(data):
+    """SHA-256 der Bilddaten (Bytes) als Hex-String"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _max_pixels():
+    from django.conf import settings
+    return getattr(settings, 'PHOTO_MAX_PIXELS', DEFAULT_MAX_PIXELS)
+
+
+def _check_budget(size, max_pixels):
+    width, height = size
+    if width * height > max_pixels:
+        raise ImageTooLarge(
+            f"Bild zu groß zum Verarbeiten: {width}x{height}px "
+            f"(maximal {max_pixels / 1_000_000:g} Megapixel)"
+        )
+
+
+def _exif_rotation(img):
+    """Rotation laut EXIF-Orientierung - gelesen aus dem Header, ohne zu dekodieren"""
+    try:
+        exif_dict = img._getexif()
+    except (AttributeError, KeyError, TypeError, OSError) as e:
+        logger.debug(f"EXIF-Verarbeitung übersprungen: {e}")
+        return 0
+
+    if not exif_dict or ORIENTATION_TAG not in exif_dict:
+        logger.debug("Keine EXIF-Orientierungsdaten gefunden")
+        return 0
+
+    value = exif_dict[ORIENTATION_TAG]
+    rotation = EXIF_ROTATIONS.get(value, 0)
+    logger.debug(f"EXIF-Orientierung {value}: Rotation {rotation}°")
+    return rotation
+
+
+def _portrait_scale(size):
+    """
+    Kleinster Faktor, bei dem das Bild nach Drehung und Zuschnitt noch
+    mindestens 267x400 Pixel hat.
+
+    Nach EXIF-Korrektur und Querformat-Drehung ist die kurze Seite immer
+    die Breite - der Faktor hängt daher nicht von der Orientierung ab.
+    """
+    short_side, long_side = sorted(size)
+    return max(PORTRAIT_SIZE[0] / short_side, PORTRAIT_SIZE[1] / long_side)
+
+
+def _draft(img):
+    """JPEG nur in der benötigten Auflösung dekodieren (ändert img.size, dekodiert noch nicht)"""
+    scale = _portrait_scale(img.size)
+    if img.format in DRAFT_FORMATS and scale < 1:
+        img.draft(img.mode, (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    return img
+
+
+def read_image_header(source, max_pixels=None):
+    """
+    Prüft ein Bild anhand des Headers, ohne Pixeldaten zu dekodieren.
+
+    Returns:
+        dict: format, size (Original), portrait_size (ins Hochformat gedreht)
+        und decode_size (tatsächlich zu dekodierende Größe)
+
+    Raises:
+        ImageTooLarge: wenn decode_size das Pixel-Budget überschreitet
+        OSError: wenn die Datei kein lesbares Bild ist
+    """
+    with Image.open(source) as img:
+        info = {
+            'format': (img.format or 'UNKNOWN').upper(),
+            'size': img.size,
+            'portrait_size': (min(img.size), max(img.size)),
+        }
+        info['decode_size'] = _draft(img).size
+
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    _check_budget(info['decode_size'], max_pixels or _max_pixels())
+    return info
+
+
+def _crop_to_ratio(img, target_width, target_height):
+    """Schneidet mittig auf das Seitenverhältnis des Passbilds zu"""
+    original_width, original_height = img.size
+    original_ratio = original_width / original_height
+    target_ratio = target_width / target_height
+
+    if original_ratio > target_ratio:
+        # Bild ist zu breit - an den Seiten beschneiden
+        new_width = int(original_height * target_ratio)
+        left = (original_width - new_width) // 2
+        return img.crop((left, 0, left + new_width, original_height))
+
+    if original_ratio < target_ratio:
+        # Bild ist zu hoch - oben/unten beschneiden
+        new_height = int(original_width / target_ratio)
+        top = (original_height - new_height) // 2
+        return img.crop((0, top, original_width, top + new_height))
+
+    return img
+
+
+def _to_rgb(img):
+    """In RGB konvertieren (für JPEG), Transparenz auf weißem Hintergrund"""
+    if img.mode in ('RGBA', 'P', 'LA'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def render_portrait(source, max_pixels=None):
+    """
+    Erstellt das Passbild für den Dienstausweis-Druck als PIL-Bild - mit
+    genau einem Dekodier-Durchlauf:
+    - JPEG/MPO per draft nahe 267x400 dekodieren, andere Formate per reduce()
+    - EXIF-Orientierung korrigieren, Querformat zu Hochformat drehen
+    - Mittig auf 267x400 Pixel zuschneiden und skalieren (LANCZOS)
+
+    Args:
+        source: Dateipfad oder Datei-Objekt des Originalbilds
+        max_pixels: Budget der dekodierten Größe (Standard: settings.PHOTO_MAX_PIXELS)
+
+    Raises:
+        ImageTooLarge: wenn das Bild das Pixel-Budget überschreitet
+    """
+    target_width, target_height = PORTRAIT_SIZE
+
+    with Image.open(source) as img:
+        logger.debug(f"Originalgröße: {img.size[0]}x{img.size[1]}px")
+        rotation = _exif_rotation(img)
+
+        img = _draft(img)
+        _check_budget(img.size, max_pixels or _max_pixels())
+        img.load()
+
+        # Was draft nicht abdeckt (PNG, TIFF, Rest-Faktor) per Blockmittelung verkleinern
+        factor = int(1 / _portrait_scale(img.size))
+        if factor >= 2 and img.mode not in ('1', 'P'):
+            img = img.reduce(factor)
+        logger.debug(f"Verarbeitet in {img.size[0]}x{img.size[1]}px")
+
+        if rotation:
+            img = img.rotate(rotation, expand=True)
+
+        # Querformat automatisch um 90° drehen
+        if img.width > img.height:
+            logger.debug("Querformat erkannt - drehe zu Hochformat")
+            img = img.rotate(90, expand=True)
+
+        img = _crop_to_ratio(img, target_width, target_height)
+        img = img.resize(PORTRAIT_SIZE, Image.Resampling.LANCZOS)
+        return _to_rgb(img)
+
+
+def encode_portrait(img):
+    """Druck-JPEG des Passbilds (300 DPI, Qualität 95)"""
+    output = io.BytesIO()
+    img.save(output, **PORTRAIT_SAVE_KWARGS)
+    data = output.getvalue()
+    logger.debug(f"Passbild erstellt: {img.width}x{img.height}px, {len(data) // 1024} KB")
+    return data
+
+
+def process_portrait(source, max_pixels=None):
+    """
+    Erstellt das Passbild für den Dienstausweis-Druck (267x400, 300 DPI, JPEG).
+
+    Returns:
+        bytes: Fertiges JPEG
+    """
+    return encode_portrait(render_portrait(source, max_pixels))
+
+
+# Anzeige-Varianten des Passbilds: Name -> (Größe, WebP-Qualität, JPEG-Qualität).
+# Bei Änderungen den Namen ändern (z.B. 'thumb2') - die Dateinamen sind
+# dauerhaft cachebar und dürfen für denselben Inhalt nicht wechseln.
+IMAGE_VARIANTS = {
+    'thumb': ((100, 150), 80, 85),     # Listen (bis 50x75 CSS-Pixel, 2x)
+    'display': ((267, 400), 82, 88),   # Detail- und Formularansicht
+}
+
+VARIANT_DIR = 'variants'
+
+
+def variant_path(photo_hash, variant, ext):
+    """Speicherpfad einer Variante - abgeleitet vom Hash des Druck-Masters"""
+    return f'{VARIANT_DIR}/{photo_hash[:2]}/{photo_hash}_{variant}.{ext}'
+
+
+def render_variants(master):
+    """
+    Erzeugt alle Anzeige-Varianten aus dem fertigen Passbild.
+
+    Args:
+        master: Druck-JPEG (Bytes) oder das bereits dekodierte Passbild (PIL)
+
+    Returns:
+        dict: (Variante, Endung) -> Bytes
+    """
+    if not isinstance(master, Image.Image):
+        with Image.open(io.BytesIO(master)) as img:
+            img.load()
+            return render_variants(img)
+
+    results = {}
+    for variant, (size, webp_quality, jpeg_quality) in IMAGE_VARIANTS.items():
+        resized = master if master.size == size else master.resize(size, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        resized.save(output, format='WEBP', quality=webp_quality, method=4)
+        results[(variant, 'webp')] = output.getvalue()
+
+        output = io.BytesIO()
+        resized.save(output, format='JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+        results[(variant, 'jpg')] = output.getvalue()
+    return results
+
+
+def save_variants(photo_hash, master, storage=None):
+    """
+    Erzeugt und speichert die Anzeige-Varianten unter Hash-Dateinamen.
+
+    Returns:
+        int: Anzahl neu geschriebener Dateien
+    """
+    return store_variants(photo_hash, render_variants(master), storage)
+
+
+def store_variants(photo_hash, variants, storage=None):
+    """Speichert bereits erzeugte Varianten (vorhandene werden übersprungen)"""
+    from django.core.files.storage import default_storage
+
+    storage = storage or default_storage
+    written = 0
+    for (variant, ext), data in variants.items():
+        path = variant_path(photo_hash, variant, ext)
+        if storage.exists(path):
+            continue
+        storage.save(path, ContentFile(data))
+        written += 1
+    logger.debug(f"Bildvarianten für {photo_hash[:12]}: {written} neu")
+    return written
+
+
+def delete_variants(photo_hash, storage=None):
+    """Löscht alle Anzeige-Varianten eines Passbilds (siehe render_variants)"""
+    from django.core.files.storage import default_storage
+
+    storage = storage or default_storage
+    deleted = 0
+    for variant in IMAGE_VARIANTS:
+        for ext in ('webp', 'jpg'):
+            path = variant_path(photo_hash, variant, ext)
+            if storage.exists(path):
+                storage.delete(path)
+                deleted += 1
+    return deleted
+
+
+class ProcessedPortrait(ContentFile):
+    """
+    Fertig verarbeitetes Passbild samt Anzeige-Varianten.
+
+    Als profile_picture zugewiesen erkennt Member.save() die Datei und
+    verarbeitet sie nicht erneut.
+    """
+
+    def __init__(self, data, variants, name='portrait.jpg'):
+        super().__init__(data, name=name)
+        self.photo_hash = content_hash(data)
+        self.variants = variants
+
+
+def ingest_portrait(source, max_pixels=None):
+    """
+    Gemeinsamer Weg aller Passbilder (Formular, Webcam, Foto-Import, Modell):
+    ein Dekodier-Durchlauf, Druck-JPEG und Varianten aus demselben Bild.
+
+    Returns:
+        ProcessedPortrait
+    """
+    img = render_portrait(source, max_pixels)
+    return ProcessedPortrait(encode_portrait(img), render_variants(img))
@@ -0,0 +1,324 @@
+# members/utils/importer.py - Gebündelter CSV-Import für Mitglieder
+
+import codecs
+import csv
+import re
+import time
+import logging
+from datetime import date
+from functools import lru_cache
+from django.db import transaction
+from members.models import Member
+from members.utils.cache import bump_data_version
+from members.utils.card_numbers import card_number_allocator
+from members.utils.names import name_key
+
+logger = logging.getLogger(__name__)
+
+# Spaltenzuordnung: Modellfeld -> mögliche CSV-Spaltennamen
+FIELD_MAPPINGS = {
+    'first_name': ['Vorname', 'vorname', 'First Name', 'FirstName'],
+    'last_name': ['Nachname', 'nachname', 'Last Name', 'LastName'],
+    'birth_date': ['Geburtsdatum', 'geburtsdatum', 'Birth Date', 'BirthDate'],
+    'personnel_number': ['Personalnummer', 'personalnummer', 'Personnel Number', 'PersonnelNumber'],
+    'member_type': ['Mitarbeitertyp_Code', 'Mitarbeitertyp Code', 'Member Type'],
+    'card_number_prefix': ['Ausweisnummer_Praefix', 'Ausweisnummer Praefix', 'Card Number Prefix'],
+    'issued_date': ['Ausgestellt_am', 'Ausgestellt am', 'Issued Date'],
+    'valid_until': ['Gueltig_bis', 'Gueltig bis', 'Valid Until'],
+    'manual_validity': ['Manuelle_Gueltigkeit', 'Manuelle Gueltigkeit', 'Manual Validity'],
+    'is_active': ['Aktiv', 'aktiv', 'Active', 'Is Active'],
+}
+
+# Klartext-Mitarbeitertypen -> Code
+TYPE_MAPPING = {
+    'Berufsfeuerwehr': 'BF',
+    'Freiwillige Feuerwehr': 'FF',
+    'Jugendfeuerwehr': 'JF',
+    'Stadt': 'STADT',
+    'Extern': 'EXTERN',
+    'Praktikant': 'PRAKTIKANT',
+}
+
+EMPTY_VALUES = ['', 'nan', 'none', 'null']
+TRUE_VALUES = ['ja', 'yes', 'true', '1']
+
+# 02.06.1977 / 02.06.77 / 02/06/1977 / 02/06/77
+_DMY_RE = re.compile(r'(\d{1,2})([./])(\d{1,2})\2(\d{4}|\d{2})')
+# 1977-06-02 (ISO)
+_ISO_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+
+def _expand_year(year_str):
+    """2-stellige Jahre wie strptime('%y') auflösen (69-99 -> 19xx, sonst 20xx)"""
+    year = int(year_str)
+    if len(year_str) == 2:
+        year += 1900 if year >= 69 else 2000
+    return year
+
+
+@lru_cache(maxsize=65536)
+def parse_csv_date(date_str):
+    """
+    Robuste Datumskonvertierung - gibt echtes date-Objekt oder None zurück.
+
+    Akzeptiert dieselben Formate wie früher die strptime-Kaskade
+    (deutsch, ISO, US), erkennt sie aber mit einem Regex-Durchlauf.
+    Gecached, da sich Datumswerte in einem Export stark wiederholen.
+    """
+    if not date_str or str(date_str).strip().lower() in EMPTY_VALUES:
+        return None
+
+    date_str = str(date_str).strip()
+    candidates = []
+
+    match = _DMY_RE.fullmatch(date_str)
+    if match:
+        first, separator, second, year_str = match.groups()
+        year = _expand_year(year_str)
+        candidates.append((year, int(second), int(first)))
+        if separator == '/':
+            # US-Format (mm/dd) nur als Fallback
+            candidates.append((year, int(first), int(second)))
+    else:
+        match = _ISO_RE.fullmatch(date_str)
+        if match:
+            candidates.append(tuple(int(part) for part in match.groups()))
+
+    for year, month, day in candidates:
+        try:
+            parsed_date = date(year, month, day)
+
+            # 2-stellige Jahre korrigieren
+            if parsed_date.year < 1950:
+                parsed_date = parsed_date.replace(year=parsed_date.year + 100)
+
+            return parsed_date
+        except ValueError:
+            continue
+
+    return None
+
+
+def detect_encoding(file, chunk_size=1024 * 1024):
+    """
+    Ermittelt die Kodierung einmalig auf den Rohbytes, bevor geparst wird.
+
+    Ist die gesamte Datei gültiges UTF-8, wird UTF-8 verwendet, sonst
+    ISO-8859-1 für die ganze Datei. Geprüft wird blockweise mit einem
+    inkrementellen Decoder, die Datei muss also nicht komplett im Speicher
+    liegen.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    file.seek(0)
+    try:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'iso-8859-1'
+    finally:
+        file.seek(0)
+    return 'utf-8'
+
+
+def iter_decoded_lines(file):
+    """
+    Dekodiert die hochgeladene Datei zeilenweise mit einer einheitlichen
+    Kodierung (siehe detect_encoding). Ein UTF-8-BOM wird entfernt.
+    """
+    encoding = detect_encoding(file)
+    if encoding != 'utf-8':
+        logger.info(f"CSV-Import: Datei ist kein gültiges UTF-8, verwende {encoding}")
+
+    for line_number, raw_line in enumerate(file):
+        if line_number == 0 and encoding == 'utf-8' and raw_line.startswith(codecs.BOM_UTF8):
+            raw_line = raw_line[len(codecs.BOM_UTF8):]
+        yield raw_line.decode(encoding)
+
+
+def identity_key(first_name, last_name, birth_date):
+    """Schlüssel für die Duplikat-Erkennung wie Member.name_key + Geburtsdatum ('Müller' = 'Mueller')"""
+    return (name_key(first_name, last_name), birth_date)
+
+
+class MemberImporter:
+    """Gebündelter CSV-Import: ein Dekodier-Durchlauf, Mengen-Duplikatprüfung, bulk_create"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.successful_imports = 0
+        self.failed_imports = 0
+        self.errors = []
+        self.timings = {}
+
+    def _timed(self, phase, started):
+        self.timings[phase] = self.timings.get(phase, 0.0) + (time.perf_counter() - started)
+
+    def _fail(self, message):
+        self.errors.append(message)
+        self.failed_imports += 1
+
+    def run(self, file):
+        """
+        Importiert alle Zeilen der CSV-Datei.
+
+        Returns:
+            MemberImporter: self mit Zählern, Fehlern und Phasen-Zeiten
+        """
+        total_started = time.perf_counter()
+
+        # 1. Bestehende Identitäten vorladen
+        started = time.perf_counter()
+        # Nur die indizierten Spalten (name_key, birth_date) lesen
+        existing_keys = set(
+            Member.objects.values_list('name_key', 'birth_date').order_by().iterator(chunk_size=2000)
+        )
+        self._timed('duplikate_laden', started)
+
+        # 2. Datei lesen, parsen und validieren
+        started = time.perf_counter()
+        new_members = []
+        for row_number, row in enumerate(csv.DictReader(iter_decoded_lines(file)), start=2):
+            try:
+                member = self._build_member(row, row_number, existing_keys)
+            except Exception as e:
+                logger.exception(f"CSV-Import Fehler in Zeile {row_number}")
+                self._fail(f"Zeile {row_number}: {str(e)}")
+                continue
+            if member is not None:
+                new_members.append(member)
+        self._timed('lesen', started)
+
+        # 3. Ausweisnummern gesammelt vergeben
+        started = time.perf_counter()
+        self._assign_card_numbers(new_members)
+        self._timed('ausweisnummern', started)
+
+        # 4. In Blöcken speichern - alles oder nichts
+        started = time.perf_counter()
+        if new_members:
+            with transaction.atomic():
+                for offset in range(0, len(new_members), self.batch_size):
+                    Member.objects.bulk_create(new_members[offset:offset + self.batch_size])
+                # bulk_create löst keine post_save-Signale aus
+                bump_data_version()
+        self.successful_imports = len(new_members)
+        self._timed('speichern', started)
+
+        self.timings['gesamt'] = time.perf_counter() - total_started
+        logger.info(
+            f"CSV-Import: {self.successful_imports} importiert, {self.failed_imports} fehlerhaft, "
+            f"Zeiten: {self.format_timings()}"
+        )
+        return self
+
+    def format_timings(self):
+        return ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
+
+    def _extract(self, row):
+        """Felder anhand der Spaltenzuordnung aus einer CSV-Zeile holen"""
+        member_data = {}
+        for field, possible_names in FIELD_MAPPINGS.items():
+            for name in possible_names:
+                value = row.get(name)
+                if value and value.strip():
+                    value = value.strip()
+                    if value.lower() not in EMPTY_VALUES:
+                        member_data[field] = value
+                    break
+        return member_data
+
+    def _build_member(self, row, row_number, existing_keys):
+        """Validiert eine Zeile und liefert ein ungespeichertes Member-Objekt (oder None)"""
+        # Spaltennamen ohne Leerzeichen am Rand
+        row = {(key or '').strip(): value for key, value in row.items() if isinstance(value, str)}
+        member_data = self._extract(row)
+
+        # Pflichtfelder prüfen
+        if not member_data.get('first_name') or not member_data.get('last_name'):
+            self._fail(f"Zeile {row_number}: Vor- und Nachname sind Pflichtfelder")
+            return None
+
+        birth_date_str = member_data.get('birth_date')
+        if not birth_date_str:
+            self._fail(f"Zeile {row_number}: Geburtsdatum fehlt")
+            return None
+
+        birth_date = parse_csv_date(birth_date_str)
+        if not birth_date:
+            self._fail(f"Zeile {row_number}: Ungültiges Geburtsdatum: '{birth_date_str}'")
+            return None
+
+        # Geburtsdatum validieren
+        today = date.today()
+        age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+        if age < 14:
+            self._fail(f"Zeile {row_number}: Mitglied muss mindestens 14 Jahre alt sein (Alter: {age})")
+            return None
+
+        if age > 100:
+            self._fail(f"Zeile {row_number}: Unplausibles Alter: {age} Jahre")
+            return None
+
+        if birth_date > today:
+            self._fail(f"Zeile {row_number}: Geburtsdatum kann nicht in der Zukunft liegen")
+            return None
+
+        # Mitarbeitertyp bestimmen (Text zu Code konvertieren falls nötig)
+        member_type = member_data.get('member_type', 'FF')
+        if member_type in TYPE_MAPPING:
+            member_type = TYPE_MAPPING[member_type]
+        elif member_type.upper() in TYPE_MAPPING.values():
+            member_type = member_type.upper()
+        else:
+            member_type = 'FF'  # Standard
+
+        # Duplikat-Prüfung gegen Datenbank und bereits gelesene Zeilen
+        key = identity_key(member_data['first_name'], member_data['last_name'], birth_date)
+        if key in existing_keys:
+            self._fail(
+                f"Zeile {row_number}: Duplikat - {member_data['first_name']} "
+                f"{member_data['last_name']} ({birth_date}) existiert bereits"
+            )
+            return None
+
+        issued_date = parse_csv_date(member_data['issued_date']) if member_data.get('issued_date') else None
+        valid_until = parse_csv_date(member_data['valid_until']) if member_data.get('valid_until') else None
+
+        manual_validity = member_data.get('manual_validity', '').lower() in TRUE_VALUES
+        is_active = True  # Standard
+        if member_data.get('is_active'):
+            is_active = member_data['is_active'].lower() in TRUE_VALUES
+
+        # Gültigkeit wie in Member.save() berechnen (bulk_create ruft save() nicht auf)
+        if issued_date and not manual_validity and not valid_until:
+            valid_until = Member.compute_valid_until(member_type, issued_date)
+
+        existing_keys.add(key)
+        member = Member(
+            first_name=member_data['first_name'],
+            last_name=member_data['last_name'],
+            birth_date=birth_date,
+            member_type=member_type,
+            personnel_number=member_data.get('personnel_number') or None,
+            card_number_prefix=member_data.get('card_number_prefix', ''),
+            issued_date=issued_date,
+            valid_until=valid_until,
+            manual_validity=manual_validity,
+            is_active=is_active,
+        )
+        # bulk_create ruft save() nicht auf
+        member.set_name_keys()
+        return member
+
+    def _assign_card_numbers(self, members):
+        """Vergibt Ausweisnummern blockweise pro Präfix über den zentralen Allocator"""
+        by_prefix = {}
+        for member in members:
+            by_prefix.setdefault(member.card_number_prefix, []).append(member)
+
+        for prefix, prefix_members in by_prefix.items():
+            numbers = card_number_allocator.allocate(prefix, len(prefix_members))
+            for member, card_number in zip(prefix_members, numbers):
+                member.card_number = card_number
@@ -0,0 +1,265 @@
+# members/utils/jobs.py - Lokale Hintergrund-Aufträge ohne externen Broker
+
+import os
+import time
+import socket
+import tempfile
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Lebenszeichen laufender Aufträge: ohne Heartbeat seit STALE_AFTER gilt
+# ein Auftrag als verwaist, auch wenn sein Worker auf einem anderen Host lief
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = timedelta(minutes=5)
+
+# Art -> Handler(job, progress) - Rückgabe ist der Ergebnis-Pfad,
+# weitere Ergebnisse kann der Handler in job.result ablegen
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Registriert eine Funktion als Handler für eine Auftragsart"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue_job(kind, user=None, **params):
+    """Legt einen Auftrag an - der Worker (manage.py run_jobs) arbeitet ihn ab"""
+    from members.models import BackgroundJob
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unbekannte Auftragsart: {kind}")
+
+    job = BackgroundJob.objects.create(
+        kind=kind,
+        params=params,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    logger.info(f"Auftrag angelegt: {job}")
+    return job
+
+
+class JobProgress:
+    """Schreibt den Fortschritt eines Auftrags gedrosselt in die Datenbank"""
+
+    def __init__(self, job, interval=0.5):
+        self.job = job
+        self.interval = interval
+        self._last_write = 0.0
+
+    def __call__(self, rows=None, images=None, total=None, force=False):
+        if rows is not None:
+            self.job.rows_processed = rows
+        if images is not None:
+            self.job.images_processed = images
+        if total is not None:
+            self.job.total_rows = total
+
+        now = time.monotonic()
+        if force or now - self._last_write >= self.interval:
+            self._last_write = now
+            type(self.job).objects.filter(pk=self.job.pk).update(
+                rows_processed=self.job.rows_processed,
+                images_processed=self.job.images_processed,
+                total_rows=self.job.total_rows,
+            )
+
+
+def current_worker():
+    """Kennung dieses Worker-Prozesses ("host:pid")"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job():
+    """Holt den ältesten wartenden Auftrag und markiert ihn atomar als laufend"""
+    from members.models import BackgroundJob
+
+    while True:
+        job = BackgroundJob.objects.filter(
+            status=BackgroundJob.STATUS_PENDING
+        ).order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+
+        # Nur ein Worker gewinnt das UPDATE
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(
+            pk=job.pk, status=BackgroundJob.STATUS_PENDING
+        ).update(
+            status=BackgroundJob.STATUS_RUNNING,
+            started_at=now,
+            worker=current_worker(),
+            heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+@contextmanager
+def heartbeat(job, interval=HEARTBEAT_INTERVAL):
+    """Hält heartbeat_at des Auftrags aktuell, solange der Block läuft"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    type(job).objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+                except Exception:
+                    logger.exception(f"Heartbeat für Auftrag {job.pk} fehlgeschlagen")
+        finally:
+            # Eigene Datenbankverbindung dieses Threads
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Führt einen bereits beanspruchten Auftrag aus und speichert das Ergebnis"""
+    from members.models import BackgroundJob
+
+    handler = JOB_HANDLERS.get(job.kind)
+    progress = JobProgress(job)
+
+    try:
+        if handler is None:
+            raise ValueError(f"Kein Handler für Auftragsart: {job.kind}")
+        with heartbeat(job):
+            result_path = handler(job, progress)
+    except Exception as e:
+        logger.exception(f"Auftrag {job.pk} fehlgeschlagen")
+        job.status = BackgroundJob.STATUS_FAILED
+        job.error = str(e)
+    else:
+        job.status = BackgroundJob.STATUS_DONE
+        job.result_path = result_path or ''
+
+    progress(force=True)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'result_path', 'result', 'finished_at'])
+    logger.info(f"Auftrag beendet: {job}")
+    return job
+
+
+def _worker_gone(worker):
+    """Läuft der Worker-Prozess nicht mehr? Nur auf dem eigenen Host prüfbar"""
+    host, _, pid = worker.rpartition(':')
+    if not host or not pid.isdigit():
+        # Vor Einführung der Worker-Kennung beansprucht
+        return True
+    if host != socket.gethostname():
+        return False
+
+    pid = int(pid)
+    if pid == os.getpid():
+        # Dieser Prozess hat noch nichts beansprucht - die PID gehörte einem
+        # beendeten Worker (z. B. PID 1 nach Neustart eines Containers)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def recover_stale_jobs():
+    """
+    Markiert Aufträge als fehlgeschlagen, deren Worker abgebrochen wurde.
+
+    Betroffen sind laufende Aufträge, deren Worker-Prozess auf diesem Host
+    nicht mehr existiert oder deren Heartbeat älter als STALE_AFTER ist.
+    Aufträge anderer, noch lebender Worker bleiben unberührt. Nur beim Start
+    eines Workers aufrufen, bevor er selbst Aufträge beansprucht.
+    """
+    from members.models import BackgroundJob
+
+    cutoff = timezone.now() - STALE_AFTER
+    running = BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_RUNNING
+    ).values_list('pk', 'worker', 'heartbeat_at', 'started_at')
+
+    stale = [
+        pk for pk, worker, heartbeat_at, started_at in running
+        if _worker_gone(worker) or (heartbeat_at or started_at or cutoff) < cutoff
+    ]
+    if not stale:
+        return 0
+
+    return BackgroundJob.objects.filter(
+        pk__in=stale, status=BackgroundJob.STATUS_RUNNING
+    ).update(
+        status=BackgroundJob.STATUS_FAILED,
+        error='Worker wurde während der Ausführung beendet',
+        finished_at=timezone.now(),
+    )
+
+
+@job_handler('cardpresso_export')
+def run_cardpresso_export(job, progress):
+    """Cardpresso-Export im Hintergrund (Parameter: output_dir, member_ids)"""
+    from members.utils.cardpresso import cardpresso_manager
+
+    result = cardpresso_manager.create_database(
+        member_ids=job.params.get('member_ids'),
+        clean=job.params.get('clean', True),
+        custom_output=job.params.get('output_dir'),
+        progress=progress,
+    )
+    if not result['success']:
+        raise RuntimeError(result['error'])
+
+    # Kennzahlen aus dem Export-Manifest - Status und Übersicht lesen nur den Auftrag
+    job.result = result['stats']
+    return os.path.abspath(result['path'])
+
+
+@job_handler('photo_process')
+def run_photo_process(job, progress):
+    """Passbild-Verarbeitung im Hintergrund (Parameter: member_id)"""
+    from members.models import Member
+
+    member = Member.objects.filter(pk=job.params['member_id']).first()
+    if member is None or not member.profile_picture:
+        return ''
+
+    progress(rows=0, images=0, total=1)
+    processed = member.resize_image()
+    progress(rows=1, images=int(processed), total=1)
+    return member.profile_picture.path
+
+
+@job_handler('photo_import')
+def run_photo_import(job, progress):
+    """Foto-Import aus einem hochgeladenen ZIP-Archiv (Parameter: zip_path)"""
+    from members.utils.photo_import import PhotoImporter, extract_photo_zip
+
+    zip_path = job.params['zip_path']
+    try:
+        with tempfile.TemporaryDirectory(prefix='photo_import_') as tmp_dir:
+            paths, skipped = extract_photo_zip(zip_path, tmp_dir)
+            importer = PhotoImporter()
+            importer.skipped = skipped
+            importer.run(paths, progress=progress)
+    finally:
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+
+    job.result = importer.to_report()
+    return ''
@@ -0,0 +1,325 @@
+# members/utils/metrics.py - Request-Metriken je View (Prometheus-Textformat)
+
+import os
+import json
+import time
+import fcntl
+import atexit
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Feste Bucket-Grenzen je Histogramm (Obergrenzen, +Inf kommt dazu)
+HISTOGRAMS = {
+    'members_http_request_duration_seconds': (
+        'Laufzeit der Requests je View',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'members_db_queries_per_request': (
+        'SQL-Abfragen je Request',
+        (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'members_db_duration_seconds': (
+        'Datenbankzeit je Request',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'members_http_response_size_bytes': (
+        'Größe der Antwort je Request',
+        (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024),
+    ),
+}
+
+COUNTERS = {
+    'members_http_requests_total': ('Requests je View, Methode und Status', ('view', 'method', 'status')),
+    'members_query_budget_exceeded_total': ('Requests über dem Abfrage-Budget der View', ('view',)),
+}
+
+# Trenner der Label-Werte in den Schlüsseln (kommt in View-Namen nicht vor)
+LABEL_SEPARATOR = '\t'
+
+FILE_PREFIX = 'metrics_'
+
+# Summe aller beendeten Worker (statt einer Datei je jemals gelaufenem Prozess)
+RETIRED_FILE = f'{FILE_PREFIX}retired.json'
+LOCK_FILE = '.metrics.lock'
+
+
+def _metrics_dir():
+    return str(getattr(settings, 'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'members_metrics')))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Zähler und Histogramme eines Prozesses.
+
+    Jeder gunicorn-Worker schreibt seinen Stand regelmäßig nach
+    METRICS_DIR/metrics_<pid>.json, der Metrik-Endpoint summiert alle
+    Dateien. Werte beendeter Worker bleiben erhalten - die Zähler sinken
+    nicht, wenn gunicorn Worker austauscht (max_requests).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        # PID, unter der dieser Stand zuletzt geschrieben wurde
+        self._file_pid = None
+        self._dirty = False
+        self.counters = {name: {} for name in COUNTERS}
+        # Name -> View -> [Bucket-Zähler..., Summe, Anzahl]
+        self.histograms = {name: {} for name in HISTOGRAMS}
+
+    def inc(self, name, *labels):
+        key = LABEL_SEPARATOR.join(str(label) for label in labels)
+        with self._lock:
+            self.counters[name][key] = self.counters[name].get(key, 0) + 1
+            self._dirty = True
+
+    def observe(self, name, view, value):
+        bounds = HISTOGRAMS[name][1]
+        with self._lock:
+            series = self.histograms[name].get(view)
+            if series is None:
+                series = self.histograms[name][view] = [0] * len(bounds) + [0, 0]
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': {name: dict(values) for name, values in self.counters.items()},
+                'histograms': {
+                    name: {view: list(series) for view, series in views.items()}
+                    for name, views in self.histograms.items()
+                },
+            }
+
+    def flush(self, force=False):
+        """Schreibt den Stand dieses Prozesses (höchstens alle METRICS_FLUSH_INTERVAL Sekunden)"""
+        directory = _metrics_dir()
+        path = os.path.join(directory, f'{FILE_PREFIX}{os.getpid()}.json')
+        if self._file_pid != os.getpid():
+            self._claim(directory, path)
+
+        now = time.monotonic()
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if not self._dirty or (not force and now - self._last_flush < interval):
+            return
+        self._last_flush = now
+        self._dirty = False
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Atomar ersetzen - der Endpoint liest nie eine halbe Datei
+            with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as tmp:
+                json.dump(self.snapshot(), tmp)
+            os.replace(tmp.name, path)
+        except OSError as e:
+            logger.warning(f"Metriken konnten nicht geschrieben werden: {e}")
+
+    def _claim(self, directory, path):
+        """
+        Übernimmt die Datei dieser PID. Gibt es sie schon, stammt sie von
+        einem beendeten Worker mit derselben (wiederverwendeten) PID - sie
+        wird in metrics_retired.json übernommen statt überschrieben, sonst
+        sänken die Zähler.
+        """
+        try:
+            if os.path.exists(path):
+                with _directory_lock(directory):
+                    _fold_into_retired(directory, [path])
+        except OSError as e:
+            logger.warning(f"Metriken konnten nicht zusammengefasst werden: {e}")
+            return
+        self._file_pid = os.getpid()
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush, force=True)
+
+
+def _empty_totals():
+    return {name: {} for name in COUNTERS}, {name: {} for name in HISTOGRAMS}
+
+
+def _merge(counters, histograms, data):
+    """Addiert den Stand einer Metrik-Datei auf die Summen"""
+    for name, values in data.get('counters', {}).items():
+        if name in counters:
+            for key, value in values.items():
+                counters[name][key] = counters[name].get(key, 0) + value
+    for name, views in data.get('histograms', {}).items():
+        if name in histograms:
+            for view, series in views.items():
+                total = histograms[name].setdefault(view, [0] * len(series))
+                if len(total) == len(series):
+                    histograms[name][view] = [a + b for a, b in zip(total, series)]
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Metrik-Datei {path} übersprungen: {e}")
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+@contextmanager
+def _directory_lock(directory):
+    """Exklusive Sperre für metrics_retired.json und das Löschen von Worker-Dateien"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _fold_into_retired(directory, paths):
+    """
+    Addiert die Worker-Dateien auf metrics_retired.json und löscht sie
+    (nur unter _directory_lock aufrufen).
+
+    Die Signaturen der übernommenen Dateien stehen mit in der Summe: bricht
+    der Prozess zwischen Schreiben und Löschen ab, werden sie beim nächsten
+    Mal nur gelöscht, nicht doppelt gezählt.
+
+    Returns:
+        int: Anzahl neu übernommener Dateien
+    """
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    retired = _read(retired_path) or {}
+    already_folded = set(retired.get('folded', []))
+    counters, histograms = _empty_totals()
+    _merge(counters, histograms, retired)
+
+    folded = []
+    added = 0
+    for path in paths:
+        signature = _signature(path)
+        if signature in already_folded:
+            folded.append(signature)
+            continue
+        data = _read(path)
+        if data is not None:
+            _merge(counters, histograms, data)
+            folded.append(signature)
+            added += 1
+
+    tmp_path = f'{retired_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'counters': counters, 'histograms': histograms, 'folded': folded}, f)
+    os.replace(tmp_path, retired_path)
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return added
+
+
+def retire_dead_workers(directory=None):
+    """
+    Fasst die Dateien beendeter Worker in metrics_retired.json zusammen und
+    löscht sie - sonst wächst das Verzeichnis mit jedem von gunicorn
+    ausgetauschten Worker (max_requests) und jeder Abruf liest alle Dateien.
+
+    Returns:
+        int: Anzahl übernommener Dateien
+    """
+    directory = directory or _metrics_dir()
+    try:
+        with _directory_lock(directory):
+            dead = []
+            for filename in os.listdir(directory):
+                pid = filename[len(FILE_PREFIX):-len('.json')]
+                if filename.startswith(FILE_PREFIX) and filename.endswith('.json') and pid.isdigit():
+                    if int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                        dead.append(os.path.join(directory, filename))
+            return _fold_into_retired(directory, dead) if dead else 0
+    except OSError as e:
+        logger.warning(f"Metriken konnten nicht zusammengefasst werden: {e}")
+        return 0
+
+
+def collect():
+    """Summiert die Stände aller Worker-Prozesse (beendete: metrics_retired.json)"""
+    registry.flush(force=True)
+    directory = _metrics_dir()
+    retire_dead_workers(directory)
+
+    counters, histograms = _empty_totals()
+    try:
+        filenames = [name for name in os.listdir(directory) if name.startswith(FILE_PREFIX) and name.endswith('.json')]
+    except FileNotFoundError:
+        filenames = []
+
+    for filename in filenames:
+        data = _read(os.path.join(directory, filename))
+        if data is not None:
+            _merge(counters, histograms, data)
+    return counters, histograms
+
+
+def render_prometheus():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)"""
+    counters, histograms = collect()
+    lines = []
+
+    for name, (help_text, label_names) in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(counters[name].items()):
+            labels = _format_labels(label_names, key.split(LABEL_SEPARATOR))
+            lines.append(f'{name}{labels} {value}')
+
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for view, series in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(("view",), (view,), [("le", bound)])} {cumulative}')
+            count = series[-1]
+            lines.append(f'{name}_bucket{_format_labels(("view",), (view,), [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(("view",), (view,))} {_format_number(series[-2])}')
+            lines.append(f'{name}_count{_format_labels(("view",), (view,))} {count}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,47 @@
+# members/utils/names.py - Normalisierte Namensschlüssel für Duplikat-Erkennung und Sortierung
+
+import re
+import unicodedata
+
+# DIN 5007 Variante 2 ("Telefonbuch-Sortierung", üblich für Namenslisten)
+GERMAN_TRANSLIT = str.maketrans({
+    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
+    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue', 'ẞ': 'ss',
+})
+
+NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+SEPARATOR_RE = re.compile(r'[\s\-]+')
+
+# Trennt Nachname und Vorname im Sortierschlüssel - sortiert vor allen Buchstaben
+SORT_SEPARATOR = '\t'
+
+
+def transliterate(text):
+    """
+    'Weiß-Müller' -> 'weiss-mueller'
+
+    Deutsche Umlaute und ß werden umschrieben, alle übrigen diakritischen
+    Zeichen entfernt (é -> e), Groß-/Kleinschreibung gefaltet.
+    """
+    text = (text or '').strip().translate(GERMAN_TRANSLIT)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def name_key(first_name, last_name):
+    """
+    Identitätsschlüssel für die Duplikat-Erkennung.
+
+    'Müller', 'Mueller' und 'MÜLLER' ergeben denselben Schlüssel,
+    Leer- und Sonderzeichen werden ignoriert ('Weiß-Müller' = 'Weiss Mueller').
+    """
+    first = NON_ALNUM_RE.sub('', transliterate(first_name))
+    last = NON_ALNUM_RE.sub('', transliterate(last_name))
+    return f'{last}|{first}'
+
+
+def sort_key(first_name, last_name):
+    """Sortierschlüssel nach DIN 5007-2: Nachname, dann Vorname (ä = ae, ß = ss)"""
+    first = SEPARATOR_RE.sub(' ', transliterate(first_name))
+    last = SEPARATOR_RE.sub(' ', transliterate(last_name))
+    return f'{last}{SORT_SEPARATOR}{first}'
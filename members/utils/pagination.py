@@ -0,0 +1,207 @@
+# members/utils/pagination.py - Keyset-Pagination (Seek-Methode) für Mitgliederlisten
+
+import hashlib
+import logging
+from datetime import date
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+from members.utils.cache import versioned_key
+
+logger = logging.getLogger(__name__)
+
+# Sortierung -> Schlüsselspalten, die letzte Spalte macht die Reihenfolge eindeutig
+SORT_KEYS = {
+    'name': ('sort_key', 'id'),
+    'valid_until': ('valid_until', 'id'),
+    'created': ('-created_at', 'id'),
+    'card_number': ('card_number',),
+}
+
+DEFAULT_SORT = 'name'
+PAGE_SIZE = 25
+CURSOR_PARAM = 'cursor'
+CURSOR_SALT = 'members.pagination'
+
+# Gesamtanzahl je Filter, zusätzlich an die Datenversion gebunden
+COUNT_CACHE_TIMEOUT = 10 * 60
+
+
+def _parse_keys(sort):
+    """'-created_at' -> ('created_at', True)"""
+    return [(key.lstrip('-'), key.startswith('-')) for key in SORT_KEYS[sort]]
+
+
+def _after(field, descending, value):
+    """
+    Bedingung für Zeilen, die in der Sortierung NACH `value` kommen.
+
+    NULL gilt als kleinster Wert (Verhalten von SQLite): aufsteigend stehen
+    NULL-Werte vorne, absteigend hinten.
+    """
+    if not descending:
+        if value is None:
+            return Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__gt': value})
+    if value is None:
+        return Q(pk__in=[])
+    return Q(**{f'{field}__lt': value}) | Q(**{f'{field}__isnull': True})
+
+
+def _equal(field, value):
+    if value is None:
+        return Q(**{f'{field}__isnull': True})
+    return Q(**{field: value})
+
+
+def seek_filter(keys, values):
+    """
+    (a, b, c) > (x, y, z) als Q-Objekt - auch für gemischte Sortierrichtungen:
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    """
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (field, descending), value in zip(keys, values):
+        condition |= prefix & _after(field, descending, value)
+        prefix &= _equal(field, value)
+    return condition
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def approximate_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """
+    Anzahl der Zeilen eines Querysets aus dem Cache.
+
+    Der Key enthält das SQL des Querysets und die Datenversion - nach
+    Änderungen an Mitgliedern wird neu gezählt, sonst höchstens alle
+    `timeout` Sekunden.
+    """
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+    key = versioned_key('count', digest)
+
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPage:
+    """Eine Seite einer Keyset-Pagination - im Template iterierbar wie eine Liste"""
+
+    def __init__(self, object_list, total, has_next, has_previous, next_url, previous_url, first_url):
+        self.object_list = object_list
+        self.total = total
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_url = next_url
+        self.previous_url = previous_url
+        self.first_url = first_url
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Blättert über ein Queryset mit WHERE (Schlüssel) > (Cursor) statt OFFSET.
+
+    Jede Seite kostet eine Abfrage mit LIMIT, unabhängig von der Tiefe.
+    Die Cursor sind signiert und für den Client undurchsichtig.
+    """
+
+    def __init__(self, queryset, sort=DEFAULT_SORT, per_page=PAGE_SIZE):
+        self.sort = sort if sort in SORT_KEYS else DEFAULT_SORT
+        self.keys = _parse_keys(self.sort)
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def make_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, field)) for field, _descending in self.keys]
+        return signing.dumps({'s': self.sort, 'd': direction, 'k': values}, salt=CURSOR_SALT, compress=True)
+
+    def read_cursor(self, token):
+        """Gibt (Richtung, Werte) zurück - None bei ungültigem oder fremdem Cursor"""
+        try:
+            data = signing.loads(token, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            logger.debug("Ungültiger Pagination-Cursor ignoriert")
+            return None
+        if data.get('s') != self.sort or len(data.get('k', ())) != len(self.keys):
+            return None
+
+        model = self.queryset.model
+        values = [
+            None if value is None else model._meta.get_field(field).to_python(value)
+            for (field, _descending), value in zip(self.keys, data['k'])
+        ]
+        return data.get('d'), values
+
+    def page(self, token=None):
+        """Lädt die Seite zum Cursor (None = erste Seite)"""
+        cursor = self.read_cursor(token) if token else None
+        backwards = cursor is not None and cursor[0] == 'prev'
+
+        # Rückwärts blättern = vorwärts in umgekehrter Sortierung
+        keys = [(field, descending != backwards) for field, descending in self.keys]
+        ordering = [f"{'-' if descending else ''}{field}" for field, descending in keys]
+
+        queryset = self.queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(seek_filter(keys, cursor[1]))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        return rows, has_next, has_previous
+
+    def make_page(self, params, token=None):
+        """
+        Seite inkl. Links; `params` sind die übrigen GET-Parameter (QueryDict),
+        die in den Links erhalten bleiben.
+        """
+        rows, has_next, has_previous = self.page(token)
+
+        def url(cursor_token=None):
+            query = params.copy()
+            query.pop(CURSOR_PARAM, None)
+            query.pop('page', None)
+            if cursor_token:
+                query[CURSOR_PARAM] = cursor_token
+            return f'?{query.urlencode()}' if query else '?'
+
+        return KeysetPage(
+            object_list=rows,
+            total=approximate_count(self.queryset),
+            has_next=has_next,
+            has_previous=has_previous,
+            next_url=url(self.make_cursor(rows[-1], 'next')) if has_next and rows else None,
+            previous_url=url(self.make_cursor(rows[0], 'prev')) if has_previous and rows else None,
+            first_url=url(),
+        )
+
+
+def paginate_members(request, queryset, sort=DEFAULT_SORT, per_page=PAGE_SIZE):
+    """Keyset-Seite für eine Mitgliederliste anhand des ?cursor=-Parameters"""
+    paginator = KeysetPaginator(queryset, sort, per_page)
+    return paginator.make_page(request.GET, request.GET.get(CURSOR_PARAM))
@@ -0,0 +1,293 @@
+# members/utils/photo_import.py - Massen-Import von Passbildern (z.B. nach dem Fototag)
+
+import os
+import re
+import time
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from members.models import Member
+from members.utils.cache import bump_data_version
+from members.utils.images import ProcessedPortrait, ingest_portrait, store_variants
+from members.utils.names import name_key
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Trenner zwischen Vor- und Nachname im Dateinamen: vorname.nachname.jpg
+NAME_SEPARATOR_RE = re.compile(r'[._]')
+
+
+def process_photo_file(path):
+    """
+    Verarbeitet eine Bilddatei in einem Worker-Prozess.
+
+    Läuft im ProcessPoolExecutor - nur Bytes zurückgeben, keine Datenbankzugriffe.
+
+    Returns:
+        tuple: (Pfad, Druck-JPEG, Varianten, Fehlermeldung)
+    """
+    try:
+        portrait = ingest_portrait(path)
+        return path, portrait.read(), portrait.variants, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+def collect_photo_files(directory):
+    """Alle Bilddateien eines Verzeichnisses (ohne Unterverzeichnisse), sortiert"""
+    return sorted(
+        entry.path for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.lower().endswith(PHOTO_EXTENSIONS)
+        and not entry.name.startswith('.')
+    )
+
+
+class PhotoArchiveTooLarge(ValueError):
+    """Das ZIP-Archiv überschreitet die Grenzen für Bildanzahl oder entpackte Größe"""
+
+
+def _is_photo_entry(info):
+    filename = os.path.basename(info.filename)
+    return not (info.is_dir() or '__MACOSX' in info.filename or filename.startswith('.')
+                or not filename.lower().endswith(PHOTO_EXTENSIONS))
+
+
+def photo_entries(archive, max_files=None, max_size=None):
+    """
+    Bild-Einträge eines geöffneten ZIP-Archivs nach Prüfung der Grenzen.
+
+    Geprüft werden Anzahl und die im Archiv angegebene entpackte Größe
+    (PHOTO_IMPORT_MAX_FILES, PHOTO_IMPORT_MAX_UNCOMPRESSED) - ohne etwas
+    zu entpacken.
+
+    Raises:
+        PhotoArchiveTooLarge
+    """
+    max_files = settings.PHOTO_IMPORT_MAX_FILES if max_files is None else max_files
+    max_size = settings.PHOTO_IMPORT_MAX_UNCOMPRESSED if max_size is None else max_size
+
+    entries = [info for info in archive.infolist() if _is_photo_entry(info)]
+    if len(entries) > max_files:
+        raise PhotoArchiveTooLarge(f"Zu viele Bilder im Archiv: {len(entries)} (höchstens {max_files})")
+    declared = sum(info.file_size for info in entries)
+    if declared > max_size:
+        raise PhotoArchiveTooLarge(
+            f"Archiv zu groß: {declared // (1024 * 1024)}MB entpackt (höchstens {max_size // (1024 * 1024)}MB)"
+        )
+    return entries
+
+
+def extract_photo_zip(zip_path, target_dir, max_files=None, max_size=None):
+    """
+    Entpackt die Bilder eines ZIP-Archivs flach nach target_dir.
+
+    Verzeichnisse im Archiv werden ignoriert (nur der Dateiname zählt),
+    dadurch kann kein Eintrag außerhalb von target_dir landen. Gleichnamige
+    Bilder aus verschiedenen Verzeichnissen überschreiben sich nicht - nur
+    das erste wird entpackt, die übrigen als übersprungen gemeldet.
+
+    Die Grenzen werden vorab geprüft (photo_entries); weil die Größenangaben
+    im Archiv gefälscht sein können, bricht das Entpacken zusätzlich ab,
+    sobald mehr Bytes geschrieben würden.
+
+    Returns:
+        tuple: (Pfade der entpackten Bilder, übersprungene Einträge)
+
+    Raises:
+        PhotoArchiveTooLarge
+    """
+    max_size = settings.PHOTO_IMPORT_MAX_UNCOMPRESSED if max_size is None else max_size
+    paths = []
+    skipped = []
+    extracted = {}
+    written = 0
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in photo_entries(archive, max_files, max_size):
+            filename = os.path.basename(info.filename)
+            if filename in extracted:
+                skipped.append(f"{info.filename}: gleicher Dateiname wie {extracted[filename]}")
+                continue
+            extracted[filename] = info.filename
+
+            target_path = os.path.join(target_dir, filename)
+            with archive.open(info) as source, open(target_path, 'wb') as target:
+                while True:
+                    block = source.read(1024 * 1024)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > max_size:
+                        raise PhotoArchiveTooLarge(
+                            f"Archiv zu groß: mehr als {max_size // (1024 * 1024)}MB entpackt"
+                        )
+                    target.write(block)
+            paths.append(target_path)
+    return sorted(paths), skipped
+
+
+class PhotoImporter:
+    """
+    Ordnet Bilddateien Mitgliedern zu und verarbeitet sie parallel.
+
+    Zuordnung über den Dateinamen: Personalnummer ('12345.jpg') oder
+    normalisierter Name ('vorname.nachname.jpg', 'Müller' = 'mueller').
+    Zuschnitt, Skalierung und EXIF-Korrektur laufen in einem Prozess-Pool
+    über alle Kerne, die Ergebnisse werden in einer Transaktion zugewiesen.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.matched = 0
+        self.attached = 0
+        self.unmatched = []
+        self.ambiguous = []
+        # Beim Entpacken übersprungene Einträge (extract_photo_zip)
+        self.skipped = []
+        self.errors = []
+        self.timings = {}
+
+    def _timed(self, phase, started):
+        self.timings[phase] = self.timings.get(phase, 0.0) + (time.perf_counter() - started)
+
+    def _load_lookup(self):
+        """Personalnummer -> ID und Namensschlüssel -> [IDs] in einer Abfrage"""
+        by_personnel_number = {}
+        by_name_key = {}
+        pictures = {}
+        rows = Member.objects.values_list('id', 'personnel_number', 'name_key', 'profile_picture').order_by()
+        for member_id, personnel_number, key, picture in rows.iterator(chunk_size=2000):
+            if personnel_number:
+                by_personnel_number[personnel_number.strip().lower()] = member_id
+            by_name_key.setdefault(key, []).append(member_id)
+            pictures[member_id] = picture or ''
+        return by_personnel_number, by_name_key, pictures
+
+    def match(self, paths):
+        """
+        Ordnet Dateien Mitgliedern zu.
+
+        Returns:
+            dict: Mitglieder-ID -> Dateipfad (nicht zuordenbare Dateien
+            landen in unmatched, mehrdeutige Namen in ambiguous)
+        """
+        by_personnel_number, by_name_key, self._pictures = self._load_lookup()
+        matches = {}
+
+        for path in paths:
+            filename = os.path.basename(path)
+            stem = os.path.splitext(filename)[0].strip()
+
+            candidates = []
+            if stem.lower() in by_personnel_number:
+                candidates = [by_personnel_number[stem.lower()]]
+            else:
+                parts = NAME_SEPARATOR_RE.split(stem, maxsplit=1)
+                if len(parts) == 2:
+                    candidates = by_name_key.get(name_key(parts[0], parts[1]), [])
+
+            if not candidates:
+                self.unmatched.append(filename)
+            elif len(candidates) > 1:
+                self.ambiguous.append(filename)
+            elif candidates[0] in matches:
+                self.errors.append(
+                    f"{filename}: Mitglied bereits über {os.path.basename(matches[candidates[0]])} zugeordnet"
+                )
+            else:
+                matches[candidates[0]] = path
+
+        self.matched = len(matches)
+        return matches
+
+    def run(self, paths, progress=None, dry_run=False):
+        """
+        Importiert die Bilder.
+
+        Returns:
+            PhotoImporter: self mit Zählern, Listen und Phasen-Zeiten
+        """
+        total_started = time.perf_counter()
+
+        started = time.perf_counter()
+        matches = self.match(paths)
+        self._timed('zuordnen', started)
+
+        if dry_run or not matches:
+            self.timings['gesamt'] = time.perf_counter() - total_started
+            return self
+
+        # 1. Parallel verarbeiten - die Kerne des Pi statt eines Requests pro Bild
+        started = time.perf_counter()
+        member_by_path = {path: member_id for member_id, path in matches.items()}
+        results = []
+        if progress:
+            progress(rows=0, images=0, total=len(matches))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for done, (path, processed, variants, error) in enumerate(
+                    executor.map(process_photo_file, list(member_by_path)), start=1):
+                if error:
+                    self.errors.append(f"{os.path.basename(path)}: {error}")
+                else:
+                    results.append((member_by_path[path], processed, variants))
+                if progress:
+                    progress(rows=done, images=len(results))
+        self._timed('verarbeiten', started)
+
+        # 2. Dateien ablegen (inhaltsadressiert, vorhandene werden nicht überschrieben)
+        started = time.perf_counter()
+        storage = Member._meta.get_field('profile_picture').storage
+        updates = []
+        for member_id, processed, variants in results:
+            portrait = ProcessedPortrait(processed, variants)
+            name = storage.save(f'profile_pics/{portrait.name}', portrait)
+            photo_hash = portrait.photo_hash
+            store_variants(photo_hash, variants)
+            updates.append((member_id, name, photo_hash))
+        self._timed('speichern', started)
+
+        # 3. Zuweisen - alles oder nichts
+        started = time.perf_counter()
+        replaced = []
+        with transaction.atomic():
+            now = timezone.now()
+            for member_id, name, photo_hash in updates:
+                Member.objects.filter(pk=member_id).update(
+                    profile_picture=name, photo_hash=photo_hash, updated_at=now,
+                )
+                if self._pictures.get(member_id) and self._pictures[member_id] != name:
+                    replaced.append(self._pictures[member_id])
+            # update() löst keine post_save-Signale aus
+            bump_data_version()
+            transaction.on_commit(lambda: [Member.release_photo(old_name) for old_name in replaced])
+        self.attached = len(updates)
+        self._timed('zuweisen', started)
+
+        if progress:
+            progress(rows=len(matches), images=self.attached, force=True)
+
+        self.timings['gesamt'] = time.perf_counter() - total_started
+        logger.info(
+            f"Foto-Import: {self.attached} zugewiesen, {len(self.unmatched)} ohne Zuordnung, "
+            f"{len(self.ambiguous)} mehrdeutig, {len(self.errors)} Fehler, Zeiten: {self.format_timings()}"
+        )
+        return self
+
+    def format_timings(self):
+        return ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
+
+    def to_report(self):
+        """Ergebnis als JSON-fähiges dict (für Auftrag und Oberfläche)"""
+        return {
+            'matched': self.matched,
+            'attached': self.attached,
+            'unmatched': self.unmatched,
+            'ambiguous': self.ambiguous,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'timings': {phase: round(seconds, 2) for phase, seconds in self.timings.items()},
+        }
@@ -0,0 +1,119 @@
+# members/utils/search.py - Mitgliedersuche über den FTS5-Index (Migration 0010)
+#
+# Der Index wird per Trigger auf members_member gepflegt. Migrationen, nach
+# denen SQLite die Tabelle neu aufbaut (AddField mit Default, AlterField),
+# löschen diese Trigger - ensure_search_index legt den Index nach jedem
+# migrate neu an, falls ein Trigger fehlt (post_migrate in members.signals).
+
+import re
+import logging
+from importlib import import_module
+from django.db import connections, transaction
+from django.db.utils import OperationalError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'members_member_fts'
+FTS_TRIGGERS = (
+    'members_member_fts_insert',
+    'members_member_fts_update',
+    'members_member_fts_delete',
+)
+
+# Suchbegriffe: zusammenhängende Buchstaben/Ziffern
+TOKEN_RE = re.compile(r'\w+')
+
+_fts_available = {}
+
+
+def fts_available(using='default'):
+    """Ist der FTS5-Index in dieser Datenbank vorhanden? (pro Prozess gemerkt)"""
+    if using not in _fts_available:
+        connection = connections[using]
+        _fts_available[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[using]
+
+
+def ensure_search_index(using='default'):
+    """
+    Legt den FTS5-Index samt Triggern neu an, wenn einer der Trigger fehlt.
+
+    Gibt True zurück, wenn der Index neu aufgebaut wurde.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if 'members_member' not in connection.introspection.table_names():
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'members_member'"
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    if present.issuperset(FTS_TRIGGERS):
+        return False
+
+    # SQL aus der Migration, die den Index ursprünglich angelegt hat
+    search_index = import_module('members.migrations.0010_member_search_index')
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.members_fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.members_fts5_probe")
+        except OperationalError:
+            # Kein FTS5 - es bleibt bei der icontains-Suche
+            return False
+        for sql in search_index.DROP_SQL + search_index.CREATE_SQL:
+            cursor.execute(sql)
+
+    _fts_available.pop(using, None)
+    logger.info("Suchindex %s neu aufgebaut (Trigger fehlten)", FTS_TABLE)
+    return True
+
+
+def build_match_query(term):
+    """
+    Wandelt die Benutzereingabe in einen FTS5-MATCH-Ausdruck um.
+
+    Jedes Wort wird als Präfix gesucht, alle Wörter müssen vorkommen:
+    'mül ja' -> '"mül"* "ja"*'. Sonderzeichen der FTS5-Syntax werden
+    dabei verworfen.
+    """
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(term))
+
+
+def icontains_filter(term):
+    """Bisherige Suche als Fallback (ohne FTS5)"""
+    return (
+        Q(first_name__icontains=term) |
+        Q(last_name__icontains=term) |
+        Q(personnel_number__icontains=term) |
+        Q(card_number__icontains=term)
+    )
+
+
+def search_members(queryset, term):
+    """
+    Filtert ein Member-Queryset nach einem Suchbegriff.
+
+    Sucht über Vorname, Nachname, Personalnummer und Ausweisnummer
+    (auch ohne Präfix). Umlaute werden ignoriert bzw. umschrieben:
+    'muller', 'müller' und 'mueller' finden alle 'Müller'.
+    """
+    term = (term or '').strip()
+    if not term:
+        return queryset
+
+    match_query = build_match_query(term)
+    if not match_query or not fts_available(queryset.db):
+        return queryset.filter(icontains_filter(term))
+
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_query],
+    ))
@@ -0,0 +1,70 @@
+# members/utils/sqlite.py - SQLite-Betriebsprofil für mehrere gunicorn-Worker
+
+import sqlite3
+import logging
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TEMP_STORE_MODES = ('DEFAULT', 'FILE', 'MEMORY')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def _choice(name, default, choices):
+    value = str(getattr(settings, name, default)).upper()
+    if value not in choices:
+        raise ImproperlyConfigured(f"{name} muss einer von {', '.join(choices)} sein, nicht {value!r}")
+    return value
+
+
+def transaction_mode():
+    """BEGIN-Modus für transaction.atomic() (settings.SQLITE_TRANSACTION_MODE)"""
+    return _choice('SQLITE_TRANSACTION_MODE', 'DEFERRED', TRANSACTION_MODES)
+
+
+def sqlite_pragmas():
+    """
+    PRAGMA-Anweisungen des Profils aus den Einstellungen.
+
+    busy_timeout steht vorne: das Umstellen auf WAL braucht kurz einen
+    exklusiven Lock und soll warten statt fehlschlagen.
+    """
+    return [
+        f"PRAGMA busy_timeout = {int(getattr(settings, 'SQLITE_BUSY_TIMEOUT', 5000))}",
+        f"PRAGMA journal_mode = {_choice('SQLITE_JOURNAL_MODE', 'WAL', JOURNAL_MODES)}",
+        f"PRAGMA synchronous = {_choice('SQLITE_SYNCHRONOUS', 'NORMAL', SYNCHRONOUS_MODES)}",
+        f"PRAGMA cache_size = {int(getattr(settings, 'SQLITE_CACHE_SIZE', -8192))}",
+        f"PRAGMA mmap_size = {int(getattr(settings, 'SQLITE_MMAP_SIZE', 67108864))}",
+        f"PRAGMA temp_store = {_choice('SQLITE_TEMP_STORE', 'MEMORY', TEMP_STORE_MODES)}",
+    ]
+
+
+def apply_sqlite_profile(connection):
+    """
+    Wendet das Profil auf eine frisch geöffnete Django-Verbindung an.
+
+    WAL: Leser sehen den letzten bestätigten Stand und werden von einer
+    laufenden Schreib-Transaktion (Ausweis-Erstellung, Import) nicht
+    blockiert. synchronous=NORMAL ist im WAL-Modus absturzsicher, nur die
+    letzten Transaktionen vor einem Stromausfall können fehlen.
+
+    Die Anweisungen laufen direkt auf der sqlite3-Verbindung - sie zählen
+    nicht als Abfragen des Requests (Metriken, Abfrage-Budget).
+    """
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_TUNING', True):
+        return
+
+    raw = connection.connection
+    for pragma in sqlite_pragmas():
+        try:
+            row = raw.execute(pragma).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite-Profil: {pragma} fehlgeschlagen: {e}")
+            continue
+        if pragma.startswith('PRAGMA journal_mode') and not connection.is_in_memory_db():
+            expected = pragma.rsplit('=', 1)[1].strip().lower()
+            if row and str(row[0]).lower() != expected:
+                logger.warning(f"SQLite-Profil: journal_mode ist {row[0]} statt {expected}")
@@ -0,0 +1,74 @@
+# members/utils/stats.py - Aggregierte Statistiken für das Dashboard
+
+import logging
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.db.models import Count, Q
+from members.models import Member
+from members.utils.cache import versioned_key
+
+logger = logging.getLogger(__name__)
+
+# Gültig bis zur nächsten Änderung an einem Mitglied (Version im Key)
+DASHBOARD_STATS_TIMEOUT = 24 * 60 * 60
+
+
+def get_dashboard_stats(today=None):
+    """
+    Liefert alle Dashboard-Zähler aus dem Cache oder berechnet sie neu.
+
+    Returns:
+        tuple: (stats, member_type_counts) - member_type_counts ist eine Liste
+               von (Typ-Code, Anzahl), absteigend nach Anzahl sortiert
+    """
+    today = today or date.today()
+    key = versioned_key('dashboard_stats', today.isoformat())
+
+    result = cache.get(key)
+    if result is None:
+        result = compute_dashboard_stats(today)
+        cache.set(key, result, DASHBOARD_STATS_TIMEOUT)
+    return result
+
+
+def compute_dashboard_stats(today):
+    """Berechnet alle Dashboard-Zähler mit einer einzigen Aggregations-Abfrage"""
+    expiry_threshold = today + timedelta(days=30)
+
+    active = Q(is_active=True)
+    has_picture = Q(profile_picture__isnull=False) & ~Q(profile_picture='')
+
+    aggregates = {
+        'total_members': Count('id'),
+        'active_members': Count('id', filter=active),
+        'inactive_members': Count('id', filter=Q(is_active=False)),
+        'valid_cards': Count('id', filter=active & Q(valid_until__gt=today)),
+        'expiring_soon': Count('id', filter=active & Q(
+            valid_until__gt=today,
+            valid_until__lte=expiry_threshold,
+        )),
+        'expired_cards': Count('id', filter=active & Q(valid_until__lte=today)),
+        'members_with_cards': Count('id', filter=~Q(card_number='')),
+        'manual_validity_count': Count('id', filter=Q(manual_validity=True)),
+        'members_with_pictures': Count('id', filter=active & has_picture),
+        'pending_cards': Count('id', filter=active & has_picture & Q(issued_date__isnull=True)),
+        'cards_created_today': Count('id', filter=Q(issued_date=today)),
+        'cards_created_this_week': Count('id', filter=Q(issued_date__gte=today - timedelta(days=7))),
+        'cards_created_this_month': Count('id', filter=Q(issued_date__gte=today.replace(day=1))),
+    }
+
+    # Mitarbeitertypen im selben Durchlauf zählen
+    for code, _label in Member.MEMBER_TYPE_CHOICES:
+        aggregates[f'type_{code}'] = Count('id', filter=Q(member_type=code))
+
+    values = Member.objects.aggregate(**aggregates)
+
+    type_counts = []
+    for code, _label in Member.MEMBER_TYPE_CHOICES:
+        count = values.pop(f'type_{code}')
+        if count:
+            type_counts.append((code, count))
+    type_counts.sort(key=lambda item: item[1], reverse=True)
+
+    logger.debug(f"Dashboard-Statistiken neu berechnet: {values}")
+    return values, type_counts
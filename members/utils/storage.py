@@ -0,0 +1,94 @@
+# members/utils/storage.py - Inhaltsadressierte Ablage der Profilbilder
+
+import os
+import re
+import time
+import fcntl
+import hashlib
+import logging
+from contextlib import contextmanager
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+# Dateiname (ohne Endung) = SHA-256 des Inhalts
+HASH_NAME_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Sperrdatei im Ablageverzeichnis: Speichern und Freigeben schließen sich aus
+LOCK_NAME = '.storage.lock'
+
+# Frisch gespeicherte oder wiederverwendete Dateien bleiben so lange stehen,
+# auch ohne Verweis - der Datensatz dazu ist evtl. noch nicht committed
+RELEASE_GRACE_SECONDS = 10 * 60
+
+
+def file_digest(content):
+    """SHA-256 eines Django-File-Objekts, blockweise gelesen"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(directory, digest, ext):
+    """'profile_pics', 'ab12…', '.jpg' -> 'profile_pics/ab/ab12….jpg'"""
+    return f'{directory}/{digest[:2]}/{digest}{ext}'
+
+
+def is_content_addressed(name):
+    """Stammt der Dateiname aus der inhaltsadressierten Ablage?"""
+    stem = os.path.splitext(os.path.basename(name or ''))[0]
+    return bool(HASH_NAME_RE.match(stem))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Speichert Dateien unter dem SHA-256 ihres Inhalts.
+
+    Aus upload_to werden nur Verzeichnis und Endung übernommen, der
+    Dateiname ist der Hash, verteilt auf Unterverzeichnisse nach den ersten
+    zwei Zeichen. Gleicher Inhalt landet in derselben Datei (Deduplizierung),
+    ein Dateiname steht immer für denselben Inhalt - URLs sind dauerhaft
+    cachebar und vorhandene Dateien werden nie überschrieben.
+
+    Mehrere Mitglieder können auf dieselbe Datei verweisen, gelöscht wird
+    daher nur über Member.release_photo(). Trifft ein Speichern auf eine
+    vorhandene Datei, wird deren Zeitstempel aufgefrischt - so erkennt die
+    Freigabe eine Wiederverwendung, deren Datensatz noch nicht committed ist.
+    """
+
+    @contextmanager
+    def lock(self):
+        """Exklusive Sperre der Ablage (prozess- und threadübergreifend, flock)"""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, LOCK_NAME), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def recently_saved(self, name, grace=RELEASE_GRACE_SECONDS):
+        """Wurde die Datei in den letzten `grace` Sekunden gespeichert oder wiederverwendet?"""
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < grace
+        except OSError:
+            return False
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory = os.path.dirname(name).replace('\\', '/')
+        ext = os.path.splitext(name)[1].lower()
+        name = hashed_name(directory, file_digest(content), ext)
+
+        with self.lock():
+            if self.exists(name):
+                os.utime(self.path(name))
+                logger.debug(f"Datei bereits vorhanden, nicht erneut gespeichert: {name}")
+                return name
+            return super().save(name, content, max_length=max_length)
@@ -1,81 +1,46 @@
-import base64
 from django.urls import reverse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
 from django.utils import timezone
 from datetime import date, datetime, timedelta 
-import pandas as pd
 import csv
 import tempfile
-from django.core.management import call_command
-from django.core.management.base import CommandError
 from django.conf import settings
 import os
 import re
 import logging 
-from django.core.files.base import ContentFile
-from io import BytesIO
-from PIL import Image
-from .models import Member
-from .forms import MemberForm, ImportForm
+from .models import BackgroundJob, Member
+from .forms import MemberForm, ImportForm, PhotoImportForm, WebcamPhotoForm
+from .utils.export import build_xlsx, iter_export_rows, stream_csv
+from .utils.importer import MemberImporter
+from .utils.jobs import enqueue_job
+from .utils.metrics import render_prometheus
+from .utils.pagination import approximate_count, paginate_members
+from .utils.stats import get_dashboard_stats
 from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
+GZIP_RE = re.compile(r'\bgzip\b')
+
+# Webcam-Aufnahme als Request-Body: Content-Type -> Endung
+WEBCAM_CONTENT_TYPES = {'image/jpeg': 'jpg', 'image/png': 'png'}
+
 
 @login_required
 def dashboard(request):
     today = date.today()
     expiry_threshold = today + timedelta(days=30)
     
-    # Basis-Statistiken
-    stats = {
-        'total_members': Member.objects.count(),
-        'active_members': Member.objects.filter(is_active=True).count(),
-        'inactive_members': Member.objects.filter(is_active=False).count(),
-        'valid_cards': Member.objects.filter(is_active=True, valid_until__gt=today).count(),
-        'expiring_soon': Member.objects.filter(
-            is_active=True, 
-            valid_until__gt=today,
-            valid_until__lte=expiry_threshold
-        ).count(),
-        'expired_cards': Member.objects.filter(is_active=True, valid_until__lte=today).count(),
-        'members_with_cards': Member.objects.exclude(card_number='').count(),
-        'manual_validity_count': Member.objects.filter(manual_validity=True).count(),
-        
-        # NEUE AUSWEIS-STATISTIKEN
-        'members_with_pictures': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False
-        ).exclude(profile_picture__exact='').count(),
-        
-        'pending_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
-            issued_date__isnull=True
-        ).exclude(profile_picture__exact='').count(),
-        
-        'cards_created_today': Member.objects.filter(
-            issued_date=today
-        ).count(),
-        
-        'cards_created_this_week': Member.objects.filter(
-            issued_date__gte=today - timedelta(days=7)
-        ).count(),
-        
-        'cards_created_this_month': Member.objects.filter(
-            issued_date__gte=today.replace(day=1)
-        ).count(),
-    }
-    
-    # Mitarbeitertypen-Statistiken
-    member_types_data = Member.objects.values('member_type').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    # Alle Zähler aus einer Aggregations-Abfrage (versioniert gecached)
+    stats, member_type_counts = get_dashboard_stats(today)
     
     # Icons für Mitarbeitertypen
     type_icons = {
@@ -87,21 +52,12 @@ def dashboard(request):
         'PRAKTIKANT': '🎓',
     }
     
-    type_names = {
-        'BF': 'Berufsfeuerwehr',
-        'FF': 'Freiwillige Feuerwehr',
-        'JF': 'Jugendfeuerwehr',
-        'STADT': 'Stadt',
-        'EXTERN': 'Extern',
-        'PRAKTIKANT': 'Praktikant',
-    }
+    type_names = dict(Member.MEMBER_TYPE_CHOICES)
     
     total_active = stats['active_members']
     member_types_stats = []
     
-    for type_data in member_types_data:
-        member_type = type_data['member_type']
-        count = type_data['count']
+    for member_type, count in member_type_counts:
         percentage = round((count / total_active * 100), 1) if total_active > 0 else 0
         
         member_types_stats.append({
@@ -136,12 +92,7 @@ def member_list(request):
     # Suche (erweitert um Ausweisnummer)
     search = request.GET.get('search')
     if search:
-        members = members.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(personnel_number__icontains=search) |
-            Q(card_number__icontains=search)
-        )
+        members = members.search(search)
     
     # Mitarbeitertyp Filter
     member_type = request.GET.get('member_type')
@@ -162,21 +113,9 @@ def member_list(request):
         expiry_threshold = today + timedelta(days=30)
         members = members.filter(valid_until__gt=today, valid_until__lte=expiry_threshold)
     
-    # Sortierung
+    # Sortierung und Keyset-Pagination (gleiche Kosten für jede Seite)
     sort = request.GET.get('sort', 'name')
-    if sort == 'name':
-        members = members.order_by('last_name', 'first_name')
-    elif sort == 'created':
-        members = members.order_by('-created_at')
-    elif sort == 'valid_until':
-        members = members.order_by('valid_until')
-    elif sort == 'card_number':
-        members = members.order_by('card_number')
-    
-    # Pagination
-    paginator = Paginator(members, 25)
-    page = request.GET.get('page')
-    members = paginator.get_page(page)
+    members = paginate_members(request, members, sort)
     
     return render(request, 'members/member_list.html', {'object_list': members})
 
@@ -185,21 +124,7 @@ def member_add(request):
     if request.method == 'POST':
         form = MemberForm(request.POST, request.FILES)
         if form.is_valid():
-            member = form.save(commit=False)
-            
-            # Webcam-Daten verarbeiten falls vorhanden
-            webcam_data = request.POST.get('webcam_data')
-            if webcam_data and webcam_data.startswith('data:image'):
-                try:
-                    # Base64 zu Bilddatei konvertieren
-                    image_file = process_webcam_image(webcam_data, member.first_name, member.last_name)
-                    member.profile_picture = image_file
-                    print(f"✅ Webcam-Bild verarbeitet für {member.full_name}")
-                except Exception as e:
-                    print(f"❌ Webcam-Bildverarbeitung fehlgeschlagen: {str(e)}")
-                    messages.warning(request, f'Webcam-Bild konnte nicht verarbeitet werden: {str(e)}')
-            
-            member.save()
+            member = form.save()
             messages.success(request, f'Mitglied {member.full_name} wurde erfolgreich erstellt.')
             return redirect('members:member_detail', pk=member.pk)
     else:
@@ -223,21 +148,7 @@ def member_edit(request, pk):
     if request.method == 'POST':
         form = MemberForm(request.POST, request.FILES, instance=member)
         if form.is_valid():
-            member = form.save(commit=False)
-            
-            # Webcam-Daten verarbeiten falls vorhanden
-            webcam_data = request.POST.get('webcam_data')
-            if webcam_data and webcam_data.startswith('data:image'):
-                try:
-                    # Base64 zu Bilddatei konvertieren
-                    image_file = process_webcam_image(webcam_data, member.first_name, member.last_name)
-                    member.profile_picture = image_file
-                    print(f"✅ Webcam-Bild aktualisiert für {member.full_name}")
-                except Exception as e:
-                    print(f"❌ Webcam-Bildverarbeitung fehlgeschlagen: {str(e)}")
-                    messages.warning(request, f'Webcam-Bild konnte nicht verarbeitet werden: {str(e)}')
-            
-            member.save()
+            member = form.save()
             messages.success(request, f'Mitglied {member.full_name} wurde aktualisiert.')
             return redirect('members:member_detail', pk=member.pk)
     else:
@@ -250,62 +161,47 @@ def member_edit(request, pk):
         'submit_text': 'Änderungen speichern'
     })
 
-def process_webcam_image(data_url, first_name, last_name):
+@login_required
+def member_webcam_photo(request, pk):
     """
-    Konvertiert Base64 Webcam-Daten zu Django-Bilddatei
-    
-    Args:
-        data_url: Base64 data URL vom Webcam-Capture
-        first_name: Vorname für Dateinamen
-        last_name: Nachname für Dateinamen
+    Webcam-Aufnahme eines Mitglieds speichern (Foto-Station)
     
-    Returns:
-        ContentFile: Django-kompatible Bilddatei
+    Erwartet die Aufnahme binär - als Multipart-Feld 'photo' oder als
+    Request-Body mit Content-Type image/jpeg bzw. image/png. Die Seite
+    schneidet schon beim Aufnehmen auf das Passbild-Format zu
+    (canvas.toBlob), hier wird genau einmal verarbeitet.
     """
-    try:
-        # Data URL aufteilen (data:image/jpeg;base64,...)
-        header, data = data_url.split(',', 1)
-        
-        # Base64 dekodieren
-        image_data = base64.b64decode(data)
-        
-        # PIL Image erstellen
-        image = Image.open(BytesIO(image_data))
-        
-        # Sicherstellen dass es RGB ist (für JPEG)
-        if image.mode in ('RGBA', 'P', 'LA'):
-            # Weißer Hintergrund für Transparenz
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-        elif image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Auf Dienstausweis-Format optimieren (267x400px)
-        target_width = 267
-        target_height = 400
-        
-        # Bereits die richtige Größe vom JavaScript, aber sicherheitshalber prüfen
-        if image.size != (target_width, target_height):
-            # Resize mit hochwertiger Interpolation
-            image = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
-        
-        # In BytesIO speichern
-        output = BytesIO()
-        image.save(output, format='JPEG', quality=95, optimize=True, dpi=(300, 300))
-        output.seek(0)
-        
-        # Dateiname generieren
-        filename = f"{first_name.lower()}.{last_name.lower()}.webcam.jpg"
-        
-        # Django ContentFile erstellen
-        return ContentFile(output.read(), name=filename)
-        
-    except Exception as e:
-        print(f"❌ Fehler bei Webcam-Bildverarbeitung: {str(e)}")
-        raise Exception(f"Webcam-Bild konnte nicht verarbeitet werden: {str(e)}")
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Nur POST erlaubt'}, status=405)
+    
+    member = get_object_or_404(Member, pk=pk)
+    
+    if request.content_type in WEBCAM_CONTENT_TYPES:
+        try:
+            body = request.body
+        except RequestDataTooBig:
+            return JsonResponse({'success': False, 'error': 'Aufnahme ist zu groß'}, status=413)
+        ext = WEBCAM_CONTENT_TYPES[request.content_type]
+        files = {'photo': SimpleUploadedFile(f'webcam.{ext}', body, content_type=request.content_type)}
+    else:
+        files = request.FILES
+    
+    form = WebcamPhotoForm(files=files)
+    if not form.is_valid():
+        errors = form.errors.get('photo') or ['Keine Aufnahme übermittelt']
+        return JsonResponse({'success': False, 'error': errors[0]}, status=400)
+    
+    member.profile_picture = form.cleaned_data['photo']
+    member.save()
+    logger.info(f"Webcam-Bild gespeichert für {member.full_name} ({member.photo_hash[:12]})")
+    
+    return JsonResponse({
+        'success': True,
+        'photo_hash': member.photo_hash,
+        'url': member.profile_picture.url,
+        'display_url': default_storage.url(member.photo_variant_name('display', 'jpg')),
+        'message': f'Webcam-Bild für {member.full_name} gespeichert',
+    })
 
 @login_required
 def member_delete(request, pk):
@@ -328,257 +224,71 @@ def import_data(request):
     else:
         form = ImportForm()
     
-    return render(request, 'members/import.html', {'form': form})
+    return render(request, 'members/import.html', _import_context(request, form=form))
 
-def process_import(request, file):
-    """CSV-Only Import - Einfach und zuverlässig mit korrigierter Datumsbehandlung"""
-    from datetime import datetime, date
-    import csv
-    import io
+def _import_context(request, **context):
+    """Kontext der Import-Seite inkl. Foto-Import und ggf. laufendem Auftrag (?photo_job=)"""
+    context.setdefault('form', ImportForm())
+    context.setdefault('photo_form', PhotoImportForm())
+    photo_job = request.GET.get('photo_job')
+    if photo_job and photo_job.isdigit():
+        context['photo_job'] = BackgroundJob.objects.filter(pk=int(photo_job), kind='photo_import').first()
+    return context
+
+@login_required
+def photo_import(request):
+    """
+    Foto-Import: ZIP mit Passbildern hochladen
     
+    Das Archiv wird abgelegt und vom Worker verarbeitet (Auftrag
+    'photo_import'), der Fortschritt ist über job_status abrufbar.
+    """
+    if request.method != 'POST':
+        return redirect('members:import_data')
+    
+    photo_form = PhotoImportForm(request.POST, request.FILES)
+    if not photo_form.is_valid():
+        return render(request, 'members/import.html', _import_context(request, photo_form=photo_form))
+    
+    os.makedirs(settings.PHOTO_IMPORT_DIR, exist_ok=True)
+    timestamp = timezone.localtime().strftime("%Y%m%d_%H%M%S")
+    with tempfile.NamedTemporaryFile(
+        dir=settings.PHOTO_IMPORT_DIR, prefix=f"fotos_{timestamp}_", suffix='.zip', delete=False
+    ) as target:
+        for chunk in photo_form.cleaned_data['archive'].chunks():
+            target.write(chunk)
+    
+    job = enqueue_job('photo_import', user=request.user, zip_path=target.name)
+    messages.info(request, f'Foto-Import wurde gestartet (Auftrag #{job.pk}).')
+    return redirect(f"{reverse('members:import_data')}?photo_job={job.pk}")
+
+def process_import(request, file):
+    """CSV-Import - gebündelt: ein Dekodier-Durchlauf, Mengen-Duplikatprüfung, bulk_create"""
     try:
         # NUR CSV-Dateien verarbeiten
         if not file.name.endswith('.csv'):
             messages.error(request, 'Nur CSV-Dateien werden unterstützt. Bitte konvertieren Sie Ihre Excel-Datei zu CSV.')
             return redirect('members:import_data')
         
-        # CSV mit verschiedenen Kodierungen probieren
-        file_content = None
-        encodings_to_try = ['utf-8-sig', 'utf-8', 'iso-8859-1', 'cp1252']
-        
-        for encoding in encodings_to_try:
-            try:
-                file.seek(0)  # Zurück zum Anfang
-                file_content = file.read().decode(encoding)
-                print(f"✅ Erfolgreich gelesen mit Kodierung: {encoding}")
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if not file_content:
-            messages.error(request, 'Datei konnte nicht gelesen werden. Bitte prüfen Sie die Kodierung.')
-            return redirect('members:import_data')
-        
-        # CSV parsen
-        csv_reader = csv.DictReader(io.StringIO(file_content))
-        
-        # Spalten normalisieren
-        fieldnames = [col.strip() for col in csv_reader.fieldnames]
-        
-        successful_imports = 0
-        failed_imports = 0
-        errors = []
-        
-        print(f"CSV Import gestartet. Gefundene Spalten: {fieldnames}")
-        
-        # Verbesserte Datums-Konvertierung für CSV
-        def parse_csv_date(date_str):
-            """Robuste Datumskonvertierung - gibt echtes date-Objekt zurück"""
-            if not date_str or str(date_str).strip() in ['', 'nan', 'None', 'null']:
-                return None
-            
-            date_str = str(date_str).strip()
-            print(f"    Datums-String: '{date_str}'")
-            
-            # Deutsche Formate probieren (häufigste in CSV)
-            formats_to_try = [
-                '%d.%m.%Y',      # 02.06.1977
-                '%d.%m.%y',      # 02.06.77
-                '%d/%m/%Y',      # 02/06/1977
-                '%d/%m/%y',      # 02/06/77
-                '%Y-%m-%d',      # 1977-06-02 (ISO)
-                '%m/%d/%Y',      # 06/02/1977 (US)
-                '%m/%d/%y',      # 06/02/77 (US)
-            ]
-            
-            for fmt in formats_to_try:
-                try:
-                    parsed_date = datetime.strptime(date_str, fmt).date()
-                    
-                    # 2-stellige Jahre korrigieren
-                    if parsed_date.year < 1950:
-                        parsed_date = parsed_date.replace(year=parsed_date.year + 100)
-                    
-                    print(f"    ✅ Erfolgreich geparst mit Format {fmt}: {parsed_date}")
-                    return parsed_date
-                except ValueError:
-                    continue
-            
-            print(f"    ❌ Konnte nicht geparst werden")
-            return None
-        
-        row_number = 1  # Header ist Zeile 1
-        
-        for row in csv_reader:
-            row_number += 1
-            try:
-                print(f"\n=== ZEILE {row_number} ===")
-                
-                # Daten aus CSV extrahieren
-                member_data = {}
-                
-                # Erweiterte Spaltenzuordnung für deine CSV
-                field_mappings = {
-                    'first_name': ['Vorname', 'vorname', 'First Name', 'FirstName'],
-                    'last_name': ['Nachname', 'nachname', 'Last Name', 'LastName'],
-                    'birth_date': ['Geburtsdatum', 'geburtsdatum', 'Birth Date', 'BirthDate'],
-                    'personnel_number': ['Personalnummer', 'personalnummer', 'Personnel Number', 'PersonnelNumber'],
-                    'member_type': ['Mitarbeitertyp_Code', 'Mitarbeitertyp Code', 'Member Type'],
-                    'card_number_prefix': ['Ausweisnummer_Praefix', 'Ausweisnummer Praefix', 'Card Number Prefix'],
-                    'issued_date': ['Ausgestellt_am', 'Ausgestellt am', 'Issued Date'],
-                    'valid_until': ['Gueltig_bis', 'Gueltig bis', 'Valid Until'],
-                    'manual_validity': ['Manuelle_Gueltigkeit', 'Manuelle Gueltigkeit', 'Manual Validity'],
-                    'is_active': ['Aktiv', 'aktiv', 'Active', 'Is Active'],
-                }
-                
-                # Felder zuordnen
-                for field, possible_names in field_mappings.items():
-                    for name in possible_names:
-                        if name in row and row[name] and str(row[name]).strip():
-                            value = str(row[name]).strip()
-                            if value.lower() not in ['', 'nan', 'none', 'null']:
-                                member_data[field] = value
-                            break
-                
-                print(f"Gefundene Daten: {member_data}")
-                
-                # Pflichtfelder prüfen
-                if not member_data.get('first_name') or not member_data.get('last_name'):
-                    errors.append(f"Zeile {row_number}: Vor- und Nachname sind Pflichtfelder")
-                    failed_imports += 1
-                    continue
-                
-                # Geburtsdatum konvertieren - WICHTIG: Als date-Objekt speichern
-                birth_date_str = member_data.get('birth_date')
-                if not birth_date_str:
-                    errors.append(f"Zeile {row_number}: Geburtsdatum fehlt")
-                    failed_imports += 1
-                    continue
-                
-                print(f"  Geburtsdatum roh: '{birth_date_str}'")
-                birth_date = parse_csv_date(birth_date_str)
-                
-                if not birth_date:
-                    errors.append(f"Zeile {row_number}: Ungültiges Geburtsdatum: '{birth_date_str}'")
-                    failed_imports += 1
-                    continue
-                
-                # Geburtsdatum validieren
-                today = date.today()
-                age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-                
-                if age < 14:
-                    errors.append(f"Zeile {row_number}: Mitglied muss mindestens 14 Jahre alt sein (Alter: {age})")
-                    failed_imports += 1
-                    continue
-                
-                if age > 100:
-                    errors.append(f"Zeile {row_number}: Unplausibles Alter: {age} Jahre")
-                    failed_imports += 1
-                    continue
-                
-                if birth_date > today:
-                    errors.append(f"Zeile {row_number}: Geburtsdatum kann nicht in der Zukunft liegen")
-                    failed_imports += 1
-                    continue
-                
-                # Mitarbeitertyp bestimmen
-                member_type = member_data.get('member_type', 'FF')
-                
-                # Text zu Code konvertieren falls nötig
-                type_mapping = {
-                    'Berufsfeuerwehr': 'BF',
-                    'Freiwillige Feuerwehr': 'FF',
-                    'Jugendfeuerwehr': 'JF',
-                    'Stadt': 'STADT',
-                    'Extern': 'EXTERN',
-                    'Praktikant': 'PRAKTIKANT'
-                }
-                
-                if member_type in type_mapping:
-                    member_type = type_mapping[member_type]
-                elif member_type.upper() in ['BF', 'FF', 'JF', 'STADT', 'EXTERN', 'PRAKTIKANT']:
-                    member_type = member_type.upper()
-                else:
-                    member_type = 'FF'  # Standard
-                
-                # Duplikat-Prüfung
-                existing = Member.objects.filter(
-                    first_name__iexact=member_data['first_name'],
-                    last_name__iexact=member_data['last_name'],
-                    birth_date=birth_date
-                ).first()
-                
-                if existing:
-                    errors.append(f"Zeile {row_number}: Duplikat - {member_data['first_name']} {member_data['last_name']} ({birth_date}) existiert bereits")
-                    failed_imports += 1
-                    continue
-                
-                # Optional: Andere Datumsfelder konvertieren
-                issued_date = None
-                if member_data.get('issued_date'):
-                    issued_date = parse_csv_date(member_data['issued_date'])
-                
-                valid_until = None
-                if member_data.get('valid_until'):
-                    valid_until = parse_csv_date(member_data['valid_until'])
-                
-                # Boolean-Felder konvertieren
-                manual_validity = False
-                if member_data.get('manual_validity'):
-                    manual_validity = member_data['manual_validity'].lower() in ['ja', 'yes', 'true', '1']
-                
-                is_active = True  # Standard
-                if member_data.get('is_active'):
-                    is_active = member_data['is_active'].lower() in ['ja', 'yes', 'true', '1']
-                
-                # Member-Objekt erstellen mit ALLEN verfügbaren Daten
-                final_data = {
-                    'first_name': member_data['first_name'],
-                    'last_name': member_data['last_name'],
-                    'birth_date': birth_date,  # ✅ Echtes date-Objekt!
-                    'member_type': member_type,
-                    'personnel_number': member_data.get('personnel_number') or None,
-                    'card_number_prefix': member_data.get('card_number_prefix', ''),
-                    'issued_date': issued_date,  # ✅ Echtes date-Objekt oder None!
-                    'valid_until': valid_until,  # ✅ Echtes date-Objekt oder None!
-                    'manual_validity': manual_validity,
-                    'is_active': is_active,
-                }
-                
-                print(f"  Finale Daten: {final_data}")
-                print(f"  Geburtsdatum Typ: {type(final_data['birth_date'])}")
-                
-                # In Datenbank speichern
-                new_member = Member.objects.create(**final_data)
-                print(f"  ✅ Erfolgreich erstellt: {new_member}")
-                
-                successful_imports += 1
-                
-            except Exception as e:
-                import traceback
-                print(f"❌ FEHLER in Zeile {row_number}: {str(e)}")
-                print(traceback.format_exc())
-                errors.append(f"Zeile {row_number}: {str(e)}")
-                failed_imports += 1
+        result = MemberImporter().run(file)
         
         # Ergebnisse anzeigen
-        if successful_imports > 0:
-            messages.success(request, f'{successful_imports} Mitglieder erfolgreich importiert.')
-        
-        if failed_imports > 0:
-            error_msg = f'{failed_imports} Einträge konnten nicht importiert werden:\n'
-            error_msg += '\n'.join(errors[:10])
-            if len(errors) > 10:
-                error_msg += f'\n... und {len(errors) - 10} weitere Fehler'
+        if result.successful_imports > 0:
+            messages.success(request, f'{result.successful_imports} Mitglieder erfolgreich importiert.')
+        
+        if result.failed_imports > 0:
+            error_msg = f'{result.failed_imports} Einträge konnten nicht importiert werden:\n'
+            error_msg += '\n'.join(result.errors[:10])
+            if len(result.errors) > 10:
+                error_msg += f'\n... und {len(result.errors) - 10} weitere Fehler'
             messages.error(request, error_msg)
         
+        messages.info(request, f'Importdauer: {result.format_timings()}')
+        
         return redirect('members:import_data')
         
     except Exception as e:
-        import traceback
-        print(f"❌ KRITISCHER FEHLER beim CSV-Import: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Kritischer Fehler beim CSV-Import")
         messages.error(request, f'Kritischer Fehler beim Import: {str(e)}')
         return redirect('members:import_data')
 
@@ -588,17 +298,12 @@ def export_data(request):
     format_type = request.GET.get('format', 'csv')
     
     # Filter aus Request übernehmen
-    members = Member.objects.all().order_by('last_name', 'first_name')
+    members = Member.objects.all().order_by('sort_key', 'id')
     
     # Suchfilter anwenden wenn vorhanden
     search = request.GET.get('search')
     if search:
-        members = members.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(personnel_number__icontains=search) |
-            Q(card_number__icontains=search)
-        )
+        members = members.search(search)
     
     member_type = request.GET.get('member_type')
     if member_type:
@@ -617,52 +322,30 @@ def export_data(request):
         expiry_threshold = today + timedelta(days=30)
         members = members.filter(valid_until__gt=today, valid_until__lte=expiry_threshold)
     
-    # Daten für Export vorbereiten
-    export_data = []
-    for member in members:
-        export_data.append({
-            'Vorname': member.first_name,
-            'Nachname': member.last_name,
-            'Geburtsdatum': member.birth_date.strftime('%d.%m.%Y'),
-            'Personalnummer': member.personnel_number or '',
-            'Mitarbeitertyp': member.get_member_type_display(),
-            'Mitarbeitertyp_Code': member.member_type,  # Für Re-Import
-            'Ausweisnummer': member.card_number,
-            'Ausweisnummer_Praefix': member.card_number_prefix or '',
-            'Ausgestellt_am': member.issued_date.strftime('%d.%m.%Y') if member.issued_date else '',
-            'Gueltig_bis': member.valid_until.strftime('%d.%m.%Y') if member.valid_until else '',
-            'Manuelle_Gueltigkeit': 'Ja' if member.manual_validity else 'Nein',
-            'Aktiv': 'Ja' if member.is_active else 'Nein',
-            'Erstellt_am': member.created_at.strftime('%d.%m.%Y %H:%M'),
-        })
-    
     today_str = date.today().strftime('%Y%m%d')
     
     if format_type == 'excel':
-        # Excel Export
-        df = pd.DataFrame(export_data)
-        response = HttpResponse(
+        # Excel Export: write-only Arbeitsmappe, über temporäre Datei gestreamt
+        response = FileResponse(
+            build_xlsx(iter_export_rows(members)),
+            as_attachment=True,
+            filename=f'mitglieder_{today_str}.xlsx',
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename="mitglieder_{today_str}.xlsx"'
-        
-        with pd.ExcelWriter(response, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Mitglieder', index=False)
         
         return response
     
     else:
-        # CSV Export mit korrekter UTF-8 Kodierung
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        # CSV Export gestreamt: konstanter Speicher, erstes Byte sofort
+        compress = bool(GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        response = StreamingHttpResponse(
+            stream_csv(iter_export_rows(members), compress=compress),
+            content_type='text/csv; charset=utf-8'
+        )
         response['Content-Disposition'] = f'attachment; filename="mitglieder_{today_str}.csv"'
-        
-        # UTF-8 BOM hinzufügen für Excel-Kompatibilität
-        response.write('\ufeff')
-        
-        if export_data:
-            writer = csv.DictWriter(response, fieldnames=export_data[0].keys())
-            writer.writeheader()
-            writer.writerows(export_data)
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
         
         return response
 
@@ -716,11 +399,7 @@ def download_template(request):
 @login_required
 def member_list_valid(request):
     """Zeigt nur Mitglieder mit gültigen Ausweisen"""
-    today = date.today()
-    members = Member.objects.filter(
-        is_active=True,
-        valid_until__gt=today
-    )
+    members = Member.objects.valid()
     
     context = _get_filtered_member_context(
         request, 
@@ -734,14 +413,7 @@ def member_list_valid(request):
 @login_required
 def member_list_expiring(request):
     """Zeigt nur Mitglieder deren Ausweise bald ablaufen"""
-    today = date.today()
-    expiry_threshold = today + timedelta(days=30)
-    
-    members = Member.objects.filter(
-        is_active=True,
-        valid_until__gt=today,
-        valid_until__lte=expiry_threshold
-    )
+    members = Member.objects.expiring()
     
     context = _get_filtered_member_context(
         request,
@@ -755,11 +427,7 @@ def member_list_expiring(request):
 @login_required
 def member_list_expired(request):
     """Zeigt nur Mitglieder mit abgelaufenen Ausweisen"""
-    today = date.today()
-    members = Member.objects.filter(
-        is_active=True,
-        valid_until__lte=today
-    )
+    members = Member.objects.expired()
     
     context = _get_filtered_member_context(
         request,
@@ -773,7 +441,7 @@ def member_list_expired(request):
 @login_required
 def member_list_active(request):
     """Zeigt nur aktive Mitglieder"""
-    members = Member.objects.filter(is_active=True)
+    members = Member.objects.active()
     
     context = _get_filtered_member_context(
         request,
@@ -806,40 +474,23 @@ def _get_filtered_member_context(request, base_queryset, title, icon, descriptio
     # Suche (erweitert um Ausweisnummer)
     search = request.GET.get('search')
     if search:
-        members = members.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(personnel_number__icontains=search) |
-            Q(card_number__icontains=search)
-        )
+        members = members.search(search)
     
     # Mitarbeitertyp Filter
     member_type = request.GET.get('member_type')
     if member_type:
         members = members.filter(member_type=member_type)
     
-    # Sortierung
+    # Sortierung und Keyset-Pagination (gleiche Kosten für jede Seite)
     sort = request.GET.get('sort', 'name')
-    if sort == 'name':
-        members = members.order_by('last_name', 'first_name')
-    elif sort == 'created':
-        members = members.order_by('-created_at')
-    elif sort == 'valid_until':
-        members = members.order_by('valid_until')
-    elif sort == 'card_number':
-        members = members.order_by('card_number')
-    
-    # Pagination
-    paginator = Paginator(members, 25)
-    page = request.GET.get('page')
-    members_page = paginator.get_page(page)
+    members_page = paginate_members(request, members, sort)
     
     return {
         'object_list': members_page,
         'title': title,
         'icon': icon,
         'description': description,
-        'total_count': base_queryset.count(),
+        'total_count': approximate_count(base_queryset),
         'search_value': search or '',
         'member_type_value': member_type or '',
         'sort_value': sort,
@@ -873,12 +524,7 @@ def card_creation_list(request):
     (haben Profilbild und sind aktiv)
     """
     # Nur aktive Mitglieder mit Profilbild
-    eligible_members = Member.objects.filter(
-        is_active=True,
-        profile_picture__isnull=False
-    ).exclude(
-        profile_picture__exact=''
-    ).order_by('last_name', 'first_name')
+    eligible_members = Member.objects.eligible_for_card().order_by('sort_key', 'id')
     
     # Filter nach Mitarbeitertyp
     member_type = request.GET.get('member_type')
@@ -913,40 +559,19 @@ def card_creation_list(request):
     # Suche
     search = request.GET.get('search')
     if search:
-        eligible_members = eligible_members.filter(
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(personnel_number__icontains=search) |
-            Q(card_number__icontains=search)
-        )
+        eligible_members = eligible_members.search(search)
     
     # Statistiken für die Anzeige
+    eligible = Member.objects.eligible_for_card()
     stats = {
-        'total_eligible': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False
-        ).exclude(profile_picture__exact='').count(),
-        'new_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
-            issued_date__isnull=True
-        ).exclude(profile_picture__exact='').count(),
-        'renewal_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
-            issued_date__isnull=False
-        ).exclude(profile_picture__exact='').count(),
-        'expired_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
-            valid_until__lte=today
-        ).exclude(profile_picture__exact='').count(),
-        'expiring_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
+        'total_eligible': eligible.count(),
+        'new_cards': eligible.filter(issued_date__isnull=True).count(),
+        'renewal_cards': eligible.filter(issued_date__isnull=False).count(),
+        'expired_cards': eligible.filter(valid_until__lte=today).count(),
+        'expiring_cards': eligible.filter(
             valid_until__gt=today,
             valid_until__lte=today + timedelta(days=30)
-        ).exclude(profile_picture__exact='').count(),
+        ).count(),
     }
     
     context = {
@@ -985,46 +610,25 @@ def card_creation_process(request):
     issue_date = date.today()
     
     # Mitglieder laden und validieren
-    members_to_update = Member.objects.filter(
-        id__in=selected_member_ids,
-        is_active=True,
-        profile_picture__isnull=False
-    ).exclude(profile_picture__exact='')
+    members_to_update = Member.objects.eligible_for_card().filter(id__in=selected_member_ids)
     
     if not members_to_update.exists():
         messages.error(request, 'Keine gültigen Mitglieder für die Ausweis-Erstellung gefunden.')
         return redirect('members:card_creation_list')
     
-    # Batch-Update mit Transaktion
-    updated_count = 0
-    updated_members = []
-    cardpresso_success = False
-    cardpresso_path = None
+    cardpresso_job = None
     
     try:
+        # Set-basierte Ausstellung: ein UPDATE für alle ausgewählten Mitglieder
         with transaction.atomic():
-            for member in members_to_update:
-                # Ausstellungsdatum setzen
-                member.issued_date = issue_date
-                
-                # Gültigkeitsdatum automatisch berechnen (falls nicht manuell gesetzt)
-                if not member.manual_validity:
-                    if member.member_type in ['EXTERN', 'PRAKTIKANT']:
-                        # Externe und Praktikanten: 1 Jahr
-                        member.valid_until = issue_date + timedelta(days=365)
-                    else:
-                        # Reguläre Mitarbeiter: 5 Jahre
-                        member.valid_until = issue_date + timedelta(days=5*365)
-                
-                member.save()
-                updated_members.append(member)
-                updated_count += 1
+            updated_ids = list(members_to_update.values_list('id', flat=True))
+            updated_count = Member.objects.filter(id__in=updated_ids).issue_cards(issue_date)
         
         # Erfolgsmeldung für Ausweis-Erstellung
         if updated_count == 1:
             messages.success(
                 request, 
-                f'Ausweis für {updated_members[0].full_name} wurde erfolgreich erstellt.'
+                f'Ausweis für {Member.objects.get(pk=updated_ids[0]).full_name} wurde erfolgreich erstellt.'
             )
         else:
             messages.success(
@@ -1032,54 +636,27 @@ def card_creation_process(request):
                 f'{updated_count} Ausweise wurden erfolgreich erstellt.'
             )
         
-        # Cardpresso-Datenbank erstellen wenn gewünscht
+        # Cardpresso-Datenbank im Hintergrund erstellen wenn gewünscht
         if create_cardpresso or request.POST.get('auto_cardpresso', True):  # Auto-Erstellung
-            try:
-                logger.info("Starte Cardpresso-Datenbank Erstellung...")
-                
-                # Eindeutiges Ausgabeverzeichnis erstellen
-                timestamp = issue_date.strftime("%Y%m%d_%H%M%S")
-                output_dir = f"cardpresso_export_{timestamp}"
-                
-                # Management Command aufrufen
-                call_command(
-                    'create_cardpresso_db',
-                    output_dir=output_dir,
-                    clean=True,
-                    verbosity=1,  # Logging-Level
-                    stdout=open(os.devnull, 'w'),  # Output unterdrücken für Web-Interface
-                )
-                
-                cardpresso_path = os.path.abspath(output_dir)
-                cardpresso_success = True
-                
-                logger.info(f"Cardpresso-Datenbank erfolgreich erstellt: {cardpresso_path}")
-                
-                messages.success(
-                    request,
-                    f'✅ Cardpresso-Datenbank wurde erfolgreich erstellt!\n'
-                    f'📁 Pfad: {cardpresso_path}\n'
-                    f'💾 {updated_count} Mitglieder exportiert'
-                )
-                
-            except CommandError as e:
-                logger.error(f"Cardpresso Command Fehler: {e}")
-                messages.warning(
-                    request,
-                    f'Ausweise wurden erstellt, aber Cardpresso-Export fehlgeschlagen: {str(e)}'
-                )
-                
-            except Exception as e:
-                logger.error(f"Unerwarteter Cardpresso Fehler: {e}")
-                messages.warning(
-                    request,
-                    f'Ausweise wurden erstellt, aber Cardpresso-Export hatte Probleme: {str(e)}'
-                )
+            # Eindeutiges Ausgabeverzeichnis erstellen
+            timestamp = timezone.localtime().strftime("%Y%m%d_%H%M%S")
+            
+            # Nur die gerade ausgestellten Mitglieder exportieren
+            cardpresso_job = enqueue_job(
+                'cardpresso_export',
+                user=request.user,
+                member_ids=updated_ids,
+                output_dir=f"cardpresso_export_{timestamp}",
+            )
+            messages.info(
+                request,
+                f'Cardpresso-Export wurde gestartet (Auftrag #{cardpresso_job.pk}).'
+            )
         
         # Zur Übersicht weiterleiten mit zusätzlichen Parametern
-        redirect_params = f"member_ids={','.join(str(m.id) for m in updated_members)}"
-        if cardpresso_success and cardpresso_path:
-            redirect_params += f"&cardpresso_path={cardpresso_path}"
+        redirect_params = f"member_ids={','.join(str(member_id) for member_id in updated_ids)}"
+        if cardpresso_job:
+            redirect_params += f"&job_id={cardpresso_job.pk}"
         
         return redirect(f"{reverse('members:card_creation_summary')}?{redirect_params}")
     
@@ -1096,7 +673,7 @@ def card_creation_summary(request):
     Zeigt eine Zusammenfassung der erstellten Ausweise mit Cardpresso-Info
     """
     member_ids = request.GET.get('member_ids', '')
-    cardpresso_path = request.GET.get('cardpresso_path', '')
+    job_id = request.GET.get('job_id', '')
     
     if not member_ids:
         messages.error(request, 'Keine Mitglieder-IDs gefunden.')
@@ -1104,33 +681,27 @@ def card_creation_summary(request):
     
     try:
         member_id_list = [int(id.strip()) for id in member_ids.split(',') if id.strip()]
-        created_members = Member.objects.filter(id__in=member_id_list).order_by('last_name', 'first_name')
+        created_members = Member.objects.filter(id__in=member_id_list).order_by('sort_key', 'id')
         
         if not created_members.exists():
             messages.error(request, 'Keine Mitglieder gefunden.')
             return redirect('members:card_creation_list')
         
-        # Cardpresso-Info vorbereiten
+        # Cardpresso-Info aus dem Auftrag - kein Verzeichnis-Scan
+        cardpresso_job = None
         cardpresso_info = None
-        if cardpresso_path and os.path.exists(cardpresso_path):
-            # Statistiken aus dem Verzeichnis lesen
-            db_path = os.path.join(cardpresso_path, 'database', 'cardpresso_indexed.sqlite')
-            images_path = os.path.join(cardpresso_path, 'images')
-            
-            cardpresso_info = {
-                'path': cardpresso_path,
-                'db_path': db_path,
-                'images_path': images_path,
-                'db_exists': os.path.exists(db_path),
-                'images_count': len([f for f in os.listdir(images_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]) if os.path.exists(images_path) else 0,
-                'ready_for_cardpresso': os.path.exists(db_path)
-            }
+        if job_id:
+            cardpresso_job = BackgroundJob.objects.filter(pk=int(job_id), kind='cardpresso_export').first()
+        
+        if cardpresso_job and cardpresso_job.status == BackgroundJob.STATUS_DONE:
+            cardpresso_info = _cardpresso_info_from_job(cardpresso_job)
         
         context = {
             'created_members': created_members,
             'creation_date': timezone.now().date(),
             'total_count': created_members.count(),
             'cardpresso_info': cardpresso_info,
+            'cardpresso_job': cardpresso_job,
         }
         
         return render(request, 'members/card_creation_summary.html', context)
@@ -1140,72 +711,115 @@ def card_creation_summary(request):
         return redirect('members:card_creation_list')
 
 
-# Neue AJAX-View für Cardpresso-Status
+def _cardpresso_db_path(job):
+    db_file = job.result.get('db_file', os.path.join('database', 'cardpresso_indexed.sqlite'))
+    return os.path.join(job.result_path, db_file)
+
+
+def _cardpresso_info_from_job(job):
+    """Pfade und Statistiken eines fertigen Cardpresso-Exports (aus dem Export-Manifest im Auftrag)"""
+    return {
+        'path': job.result_path,
+        'db_path': _cardpresso_db_path(job),
+        'images_path': os.path.join(job.result_path, 'images'),
+        'db_exists': True,
+        'images_count': job.result.get('photo_count', job.images_processed),
+        'stats': job.result,
+        'ready_for_cardpresso': True,
+    }
+
+
+# AJAX-View für Cardpresso-Status
 @login_required
 def cardpresso_status(request):
     """
-    AJAX-Endpoint für Cardpresso-Datenbank Status
+    AJAX-Endpoint für den Status eines Cardpresso-Exports
+    
+    Mit ?job_id=... wird ein bestimmter Auftrag abgefragt,
+    sonst der zuletzt angelegte Cardpresso-Export.
     """
     if request.method != 'GET':
         return JsonResponse({'error': 'Nur GET erlaubt'}, status=405)
     
-    try:
-        # Letztes Cardpresso-Verzeichnis finden
-        cardpresso_dirs = [d for d in os.listdir('.') if d.startswith('cardpresso_export_')]
-        
-        if not cardpresso_dirs:
+    jobs = BackgroundJob.objects.filter(kind='cardpresso_export')
+    job_id = request.GET.get('job_id')
+    
+    if job_id:
+        if not job_id.isdigit():
+            return JsonResponse({'error': 'Ungültige Auftrags-ID'}, status=400)
+        job = jobs.filter(pk=int(job_id)).first()
+        if job is None:
+            return JsonResponse({'error': 'Auftrag nicht gefunden'}, status=404)
+    else:
+        job = jobs.order_by('-created_at', '-pk').first()
+        if job is None:
             return JsonResponse({
                 'exists': False,
                 'message': 'Keine Cardpresso-Datenbank gefunden'
             })
-        
-        # Neuestes Verzeichnis
-        latest_dir = sorted(cardpresso_dirs)[-1]
-        db_path = os.path.join(latest_dir, 'database', 'cardpresso_indexed.sqlite')
-        images_path = os.path.join(latest_dir, 'images')
-        
-        return JsonResponse({
-            'exists': os.path.exists(db_path),
-            'path': os.path.abspath(latest_dir),
-            'db_path': os.path.abspath(db_path) if os.path.exists(db_path) else None,
-            'images_count': len([f for f in os.listdir(images_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]) if os.path.exists(images_path) else 0,
-            'created': os.path.getctime(latest_dir) if os.path.exists(latest_dir) else None
-        })
-        
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    
+    # Kennzahlen stehen im Auftrag (Export-Manifest) - kein Zugriff auf das Export-Verzeichnis
+    done = job.status == BackgroundJob.STATUS_DONE
+    status = job.to_status_dict()
+    status.update({
+        'exists': done,
+        'db_path': _cardpresso_db_path(job) if done else None,
+        'images_count': job.result.get('photo_count', job.images_processed) if done else job.images_processed,
+        'stats': job.result if done else None,
+    })
+    return JsonResponse(status)
+
+
+def metrics(request):
+    """
+    Request-Metriken im Prometheus-Textformat
+    
+    Nur für Staff-Benutzer oder mit "Authorization: Bearer <METRICS_TOKEN>"
+    (für den Prometheus-Scraper ohne Sitzung).
+    """
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if not authorized and token:
+        authorized = constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    if not authorized:
+        return HttpResponseForbidden('Nur für Staff-Benutzer')
+    
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+def job_status(request, pk):
+    """AJAX-Endpoint für den Status eines Hintergrund-Auftrags"""
+    job = get_object_or_404(BackgroundJob, pk=pk)
+    return JsonResponse(job.to_status_dict())
 
 
-# Neue View für manuellen Cardpresso-Export
+# View für manuellen Cardpresso-Export
 @login_required 
 def create_cardpresso_manual(request):
     """
     Manuelle Cardpresso-Datenbank Erstellung (ohne Ausweis-Update)
+    
+    Der Export läuft im Hintergrund, der Status ist über
+    cardpresso_status?job_id=... abrufbar.
     """
     if request.method != 'POST':
         return JsonResponse({'error': 'Nur POST erlaubt'}, status=405)
     
     try:
         # Eindeutiges Ausgabeverzeichnis
-        from django.utils import timezone
-        timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = f"cardpresso_manual_{timestamp}"
-        
-        # Command aufrufen
-        call_command(
-            'create_cardpresso_db',
-            output_dir=output_dir,
-            clean=True,
-            verbosity=1
+        timestamp = timezone.localtime().strftime("%Y%m%d_%H%M%S")
+        job = enqueue_job(
+            'cardpresso_export',
+            user=request.user,
+            output_dir=f"cardpresso_manual_{timestamp}",
         )
         
-        cardpresso_path = os.path.abspath(output_dir)
-        
         return JsonResponse({
             'success': True,
-            'path': cardpresso_path,
-            'message': f'Cardpresso-Datenbank erfolgreich erstellt: {cardpresso_path}'
-        })
+            'job_id': job.pk,
+            'status_url': f"{reverse('members:cardpresso_status')}?job_id={job.pk}",
+            'message': f'Cardpresso-Export wurde gestartet (Auftrag #{job.pk})'
+        }, status=202)
         
     except Exception as e:
         logger.error(f"Manueller Cardpresso-Export Fehler: {e}")
@@ -1254,97 +868,3 @@ def check_member_eligibility(request, pk):
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
-
-# ERWEITERE AUCH DEINE BESTEHENDE dashboard VIEW:
-@login_required
-def dashboard(request):
-    today = date.today()
-    expiry_threshold = today + timedelta(days=30)
-    
-    # Erweiterte Statistiken
-    stats = {
-        'total_members': Member.objects.count(),
-        'active_members': Member.objects.filter(is_active=True).count(),
-        'inactive_members': Member.objects.filter(is_active=False).count(),
-        'valid_cards': Member.objects.filter(is_active=True, valid_until__gt=today).count(),
-        'expiring_soon': Member.objects.filter(
-            is_active=True, 
-            valid_until__gt=today,
-            valid_until__lte=expiry_threshold
-        ).count(),
-        'expired_cards': Member.objects.filter(is_active=True, valid_until__lte=today).count(),
-        'members_with_cards': Member.objects.exclude(card_number='').count(),
-        'manual_validity_count': Member.objects.filter(manual_validity=True).count(),
-        
-        # ✨ NEUE AUSWEIS-STATISTIKEN
-        'members_with_pictures': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False
-        ).exclude(profile_picture__exact='').count(),
-        
-        'pending_cards': Member.objects.filter(
-            is_active=True,
-            profile_picture__isnull=False,
-            issued_date__isnull=True
-        ).exclude(profile_picture__exact='').count(),
-    }
-    
-    # Rest deiner bestehenden Dashboard-Logik...
-    # (member_types_data, recent_members, expiring_members, etc.)
-    
-    # Mitarbeitertypen-Statistiken
-    member_types_data = Member.objects.values('member_type').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Icons für Mitarbeitertypen
-    type_icons = {
-        'BF': '🚒',
-        'FF': '🔥',
-        'JF': '👦',
-        'STADT': '🏛️',
-        'EXTERN': '🏢',
-        'PRAKTIKANT': '🎓',
-    }
-    
-    type_names = {
-        'BF': 'Berufsfeuerwehr',
-        'FF': 'Freiwillige Feuerwehr',
-        'JF': 'Jugendfeuerwehr',
-        'STADT': 'Stadt',
-        'EXTERN': 'Extern',
-        'PRAKTIKANT': 'Praktikant',
-    }
-    
-    total_active = stats['active_members']
-    member_types_stats = []
-    
-    for type_data in member_types_data:
-        member_type = type_data['member_type']
-        count = type_data['count']
-        percentage = round((count / total_active * 100), 1) if total_active > 0 else 0
-        
-        member_types_stats.append({
-            'type': member_type,
-            'display_name': type_names.get(member_type, member_type),
-            'icon': type_icons.get(member_type, '👤'),
-            'count': count,
-            'percentage': percentage
-        })
-    
-    # Neueste Mitglieder
-    recent_members = Member.objects.filter(is_active=True).order_by('-created_at')[:5]
-    
-    # Ablaufende Ausweise
-    expiring_members = Member.objects.filter(
-        is_active=True,
-        valid_until__lte=expiry_threshold
-    ).order_by('valid_until')[:10]
-    
-    context = {
-        'stats': stats,
-        'member_types_stats': member_types_stats,
-        'recent_members': recent_members,
-        'expiring_members': expiring_members,
-    }
-    return render(request, 'dashboard.html', context)
@@ -5,10 +5,15 @@ Django settings for mitgliederverwaltung project.
 from pathlib import Path
 from decouple import config, Csv
 import os
+import sys
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Läuft gerade "manage.py test"?
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-change-this-key')
 
@@ -37,6 +42,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'members.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,11 +74,36 @@ WSGI_APPLICATION = 'mitgliederverwaltung.wsgi.application'
 # Database
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 mit einstellbarem BEGIN-Modus (SQLITE_TRANSACTION_MODE)
+        'ENGINE': 'members.db_backend',
         'NAME': BASE_DIR / config('DATABASE_NAME', default='db.sqlite3'),
     }
 }
 
+# SQLite-Betriebsprofil je Verbindung (members.utils.sqlite): im WAL-Modus
+# blockieren Ausweis-Erstellung und Import die lesenden gunicorn-Worker nicht
+SQLITE_TUNING = config('SQLITE_TUNING', default=True, cast=bool)
+SQLITE_JOURNAL_MODE = config('SQLITE_JOURNAL_MODE', default='WAL')
+SQLITE_SYNCHRONOUS = config('SQLITE_SYNCHRONOUS', default='NORMAL')
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # ms
+SQLITE_CACHE_SIZE = config('SQLITE_CACHE_SIZE', default=-8192, cast=int)  # negativ: KiB je Verbindung
+SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=67108864, cast=int)  # 64 MB
+SQLITE_TEMP_STORE = config('SQLITE_TEMP_STORE', default='MEMORY')
+# Schreib-Lock schon bei Beginn von transaction.atomic() holen (wartet bis busy_timeout)
+SQLITE_TRANSACTION_MODE = config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE')
+
+# Cache (dateibasiert, damit alle Gunicorn-Worker denselben Cache teilen)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+    }
+}
+# Unter "manage.py test" nie den Cache der laufenden Anwendung verwenden:
+# Testdaten würden sonst unter der echten Datenversion landen
+if TESTING:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,6 +173,42 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = config('MAX_UPLOAD_SIZE', default=10485760, cast=i
 ALLOWED_IMAGE_TYPES = config('ALLOWED_IMAGE_TYPES', default='jpg,jpeg,png', cast=Csv())
 ALLOWED_IMPORT_TYPES = config('ALLOWED_IMPORT_TYPES', default='csv,xlsx,xls', cast=Csv())
 
+# Passbild-Verarbeitung im Hintergrund-Worker statt im Request (manage.py run_jobs)
+PHOTO_PROCESSING_ASYNC = config('PHOTO_PROCESSING_ASYNC', default=False, cast=bool)
+
+# Obergrenze der dekodierten Pixel pro Passbild (JPEG wird vorher per draft verkleinert)
+PHOTO_MAX_PIXELS = config('PHOTO_MAX_PIXELS', default=16000000, cast=int)
+
+# Foto-Import (ZIP): Ablage bis zur Verarbeitung durch den Worker
+PHOTO_IMPORT_DIR = config('PHOTO_IMPORT_DIR', default=str(BASE_DIR / 'photo_imports'))
+PHOTO_IMPORT_MAX_SIZE = config('PHOTO_IMPORT_MAX_SIZE', default=524288000, cast=int)
+# Grenzen beim Entpacken (Schutz vor ZIP-Bomben): Anzahl Bilder, Summe der entpackten Bytes
+PHOTO_IMPORT_MAX_FILES = config('PHOTO_IMPORT_MAX_FILES', default=5000, cast=int)
+PHOTO_IMPORT_MAX_UNCOMPRESSED = config('PHOTO_IMPORT_MAX_UNCOMPRESSED', default=2147483648, cast=int)
+
+# Request-Metriken je View (Prometheus unter /metrics/, nur für Staff oder mit METRICS_TOKEN)
+# Unter "manage.py test" aus - die Tests sollen keine Metrik-Dateien hinterlassen
+METRICS_ENABLED = config('METRICS_ENABLED', default=not TESTING, cast=bool)
+# Gemeinsames Verzeichnis aller gunicorn-Worker, wird beim Abruf summiert
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'members_metrics'))
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Abfrage-Budget je View: darüber wird eine Warnung geloggt
+METRICS_QUERY_BUDGETS = {
+    'members:dashboard': 10,
+    'members:member_list': 8,
+    'members:member_list_valid': 8,
+    'members:member_list_expiring': 8,
+    'members:member_list_expired': 8,
+    'members:member_list_active': 8,
+    'members:member_list_inactive': 8,
+    'members:member_detail': 5,
+    'members:card_creation_list': 12,
+    'members:card_creation_process': 40,
+    'members:export_data': 5,
+}
+
 # Logging
 LOGGING = {
     'version': 1,